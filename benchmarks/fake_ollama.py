@@ -0,0 +1,87 @@
+# fake_ollama.py
+"""
+A local stand-in for the Ollama HTTP API: /api/tags for health checks and a
+streaming /api/generate that sends canned tokens with configurable latency.
+The canned answer is followed by chatter, as real models often add, so the
+early-stop path of the stream parser is exercised too. Requests whose
+options carry a seed from ``bad_seeds`` get SQL naming a table that does
+not exist, for the speculative-generation path.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def tokenize(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeOllama:
+    def __init__(self, sql="SELECT kind, COUNT(*) FROM events GROUP BY kind",
+                 first_token_seconds=0.2, token_seconds=0.01, trailing_tokens=20, bad_seeds=()):
+        chatter = [" Hope this helps!"] * trailing_tokens
+        self.tokens = tokenize(json.dumps({"sql": sql})) + chatter
+        self.bad_tokens = tokenize(json.dumps({"sql": "SELECT kind FROM no_such_table"})) + chatter
+        self.bad_seeds = set(bad_seeds)
+        self.first_token_seconds = first_token_seconds
+        self.token_seconds = token_seconds
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like the real server
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = b'{"models": []}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                fake.requests += 1
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                seed = body.get("options", {}).get("seed")
+                tokens = fake.bad_tokens if seed in fake.bad_seeds else fake.tokens
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    time.sleep(fake.first_token_seconds)
+                    for token in tokens:
+                        self._chunk({"response": token, "done": False})
+                        time.sleep(fake.token_seconds)
+                    self._chunk({"response": "", "done": True, "prompt_eval_duration": 0})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass    # the client hung up early on purpose
+
+            def _chunk(self, obj):
+                data = (json.dumps(obj) + "\n").encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
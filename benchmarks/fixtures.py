@@ -0,0 +1,72 @@
+# fixtures.py
+"""
+Synthetic SQLite databases for the benchmarks. Files are cached under the
+work directory and only rebuilt when missing.
+"""
+import os
+import random
+import sqlite3
+
+EVENT_KINDS = ["click", "view", "purchase", "signup", "refund", "login"]
+
+
+def schema_db(work_dir, n_tables, n_columns=8):
+    """A database with ``n_tables`` empty tables of ``n_columns`` columns each."""
+    path = os.path.join(work_dir, f"schema_{n_tables}.sqlite3")
+    if os.path.exists(path):
+        return path
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    words = ["customer", "order", "invoice", "product", "region", "payment", "shipment", "account"]
+    for i in range(n_tables):
+        name = f"{words[i % len(words)]}_{i}"
+        columns = ["id INTEGER PRIMARY KEY"]
+        columns += [f"{words[(i + j) % len(words)]}_attr_{j} TEXT" for j in range(1, n_columns - 1)]
+        if i:
+            # Foreign-key style column so the schema index finds neighbours
+            columns.append(f"{words[(i - 1) % len(words)]}_id INTEGER")
+        conn.execute(f"CREATE TABLE {name} ({', '.join(columns)})")
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def rows_db(work_dir, n_rows, batch=50_000):
+    """A database with one ``events`` table holding ``n_rows`` rows."""
+    path = os.path.join(work_dir, f"rows_{n_rows}.sqlite3")
+    if os.path.exists(path):
+        return path
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("""
+        CREATE TABLE events (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            kind TEXT,
+            amount REAL,
+            created_at TEXT,
+            note TEXT
+        )
+    """)
+    rng = random.Random(42)
+    for start in range(0, n_rows, batch):
+        conn.executemany(
+            "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (i, rng.randrange(100_000), rng.choice(EVENT_KINDS), round(rng.random() * 500, 2),
+                 f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:00:00",
+                 None if i % 7 else f"note {i}")
+                for i in range(start, min(n_rows, start + batch))
+            ),
+        )
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,93 @@
+# import_budget.py
+"""
+Import-time budget for the app's cold start.
+
+Starts a fresh interpreter with ``-X importtime`` that imports what main.py
+imports before the login window draws, and checks that
+
+- the cumulative import time of that module stays under --budget-ms
+  (median of --repeat runs), and
+- none of the heavy modules the login window must not wait for (pandas,
+  the DB drivers, SQLAlchemy, ...) were imported.
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 150 --repeat 7
+
+Exits with status 1 when the budget is broken, so it can run in CI.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "nl_to_sql_desktop")
+
+# Loaded in the background after first paint (warmup.py) or on connect, never before
+DEFERRED = ("pandas", "numpy", "pyarrow", "sqlalchemy", "psycopg2", "mysql", "sqlparse", "requests",
+            "db_connector", "connector_group", "ui.home_window")
+
+# "import time: self [us] | cumulative | imported package"
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module):
+    """One cold import of ``module``: [(name, depth, self_us, cumulative_us)] in import order."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=APP_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, len(indent) // 2, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def subtree(entries, module):
+    """The entries ``module`` itself imported: the block of nested lines ending at its own line."""
+    end = next(i for i, (name, depth, _, _) in enumerate(entries) if name == module and depth == 0)
+    start = end
+    while start > 0 and entries[start - 1][1] > 0:
+        start -= 1
+    return entries[start:end + 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="ui.login_window", help="what main.py imports before first paint")
+    parser.add_argument("--budget-ms", type=float, default=200.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args()
+
+    runs = [subtree(measure(args.module), args.module) for _ in range(args.repeat)]
+    total_ms = statistics.median(run[-1][3] for run in runs) / 1000
+    last = runs[-1]
+
+    print(f"import {args.module}: {total_ms:.1f} ms (median of {args.repeat}; budget {args.budget_ms:.0f} ms)")
+    print("Slowest modules (self time, last run):")
+    for name, _, self_us, cumulative_us in sorted(last, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  (cumulative {cumulative_us / 1000:7.1f} ms)  {name}")
+
+    loaded = sorted({name for name, *_ in last
+                     if any(name == d or name.startswith(d + ".") for d in DEFERRED)})
+    failed = False
+    if loaded:
+        roots = sorted({next(d for d in DEFERRED if name == d or name.startswith(d + ".")) for name in loaded})
+        print(f"FAIL: imported before first paint: {', '.join(roots)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+# run.py
+"""
+Headless benchmarks for the hot paths of the app.
+
+Nothing external is needed: SQLite files stand in for the database server
+(see fixtures.py) and FakeOllama serves canned tokens for the LLM. Caches
+and metrics go to the work directory, never to the user's ~/.nl_to_sql.
+
+    python benchmarks/run.py                          # default sizes
+    python benchmarks/run.py --suite query export --full
+    python benchmarks/run.py --compare benchmarks/results/<older run>.json
+
+Each run is written as JSON (--output) so runs can be compared later.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "nl_to_sql_desktop"))
+
+SUITES = ["schema", "query", "render", "export", "e2e"]
+SCHEMA_SIZES = [10, 1_000, 10_000]
+ROW_SIZES = {"quick": [10_000, 100_000], "default": [10_000, 100_000, 1_000_000],
+             "full": [10_000, 100_000, 1_000_000, 10_000_000]}
+XLSX_MAX_ROWS = {"quick": 10_000, "default": 100_000, "full": 1_000_000}
+QUESTION = "how many events of each kind"
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, suite, name, fn, repeat=None, **params):
+        """Time ``fn`` ``repeat`` times. ``fn`` may return a dict of details to keep."""
+        seconds, details = [], None
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            details = fn()
+            seconds.append(time.perf_counter() - started)
+        result = {
+            "suite": suite,
+            "name": name,
+            "params": params,
+            "seconds": [round(s, 6) for s in seconds],
+            "median": round(statistics.median(seconds), 6),
+            "min": round(min(seconds), 6),
+        }
+        rows = details.get("rows") if isinstance(details, dict) else None
+        rows = rows if rows is not None else params.get("rows")
+        if rows is not None:
+            result["rows_per_sec"] = round(rows / max(result["median"], 1e-9))
+        if isinstance(details, dict):
+            result["details"] = details
+        self.results.append(result)
+        label = " ".join(f"{k}={v:,}" if isinstance(v, int) else f"{k}={v}" for k, v in params.items())
+        rate = f"  {result['rows_per_sec']:>12,} rows/s" if "rows_per_sec" in result else ""
+        print(f"{suite:>7} {name:<24} {label:<28} {result['median'] * 1000:>10.1f} ms{rate}", flush=True)
+        return result
+
+    def skip(self, suite, name, reason, **params):
+        self.results.append({"suite": suite, "name": name, "params": params, "skipped": reason})
+        print(f"{suite:>7} {name:<24} skipped: {reason}", flush=True)
+
+
+def sqlite_connector(path):
+    from db_connector import DBConnector
+
+    connector = DBConnector("sqlite", "", "", path, "", "")
+    connector.connect()
+    return connector
+
+
+def run_schema(bench, args):
+    from config import PROMPT_TOKEN_BUDGET, PROMPT_TOP_K_TABLES
+    from fixtures import schema_db
+    from schema_cache import SchemaCache
+    from schema_index import SchemaIndex
+    from schema_search import SchemaSearch
+
+    for n in SCHEMA_SIZES:
+        connector = sqlite_connector(schema_db(args.work_dir, n))
+        try:
+            bench.measure("schema", "get_schema", connector.get_schema, tables=n)
+            bench.measure("schema", "get_schema_version", connector.get_schema_version, tables=n)
+            cache = SchemaCache(cache_dir=os.path.join(args.work_dir, "schema_cache"))
+            cache.get(connector, refresh=True)
+            bench.measure("schema", "schema_cache_warm", lambda: cache.get(connector), tables=n)
+            schema = connector.get_schema()
+            bench.measure("schema", "index_build", lambda: SchemaIndex(schema), tables=n)
+            index = SchemaIndex(schema)
+            bench.measure("schema", "prompt_schema",
+                          lambda: index.prompt_schema("total payment amount per customer region",
+                                                      PROMPT_TOP_K_TABLES, PROMPT_TOKEN_BUDGET),
+                          tables=n)
+            # Sidebar search box: a narrow query and a one-letter one
+            bench.measure("schema", "search_build", lambda: SchemaSearch(schema), tables=n)
+            search = SchemaSearch(schema)
+            bench.measure("schema", "search_narrow", lambda: search.search("payment_1"), tables=n)
+            bench.measure("schema", "search_broad", lambda: search.search("e"), tables=n)
+        finally:
+            connector.close()
+
+
+def run_query(bench, args):
+    from compaction import compact_store
+    from config import PREVIEW_ROWS
+    from fixtures import rows_db
+    from result_store import ResultStore
+    from sql_rewrite import limit_sql
+
+    sql = "SELECT * FROM events"
+    for n in ROW_SIZES[args.size]:
+        connector = sqlite_connector(rows_db(args.work_dir, n))
+        try:
+            bench.measure("query", "execute_query", lambda: {"rows": len(connector.execute_query(sql))}, rows=n)
+            bench.measure("query", "iter_rows",
+                          lambda: {"rows": sum(len(rows) for _, rows in connector.iter_rows(sql))}, rows=n)
+            bench.measure("query", "iter_query",
+                          lambda: {"rows": sum(len(df) for df in connector.iter_query(sql))}, rows=n)
+            store = ResultStore()
+            for chunk in connector.iter_query(sql):
+                store.append(chunk)
+
+            def compact():
+                _, before, after = compact_store(store)
+                return {"mb_before": round(before / 2 ** 20, 1), "mb_after": round(after / 2 ** 20, 1)}
+
+            bench.measure("query", "compact_store", compact, rows=n)
+            # Preview mode: the LIMITed statement plus the COUNT(*) run next to it
+            preview = limit_sql(sql, PREVIEW_ROWS)
+            bench.measure("query", "preview_rows",
+                          lambda: {"rows": sum(len(rows) for _, rows in connector.iter_rows(preview))},
+                          rows=n, limit=PREVIEW_ROWS)
+            bench.measure("query", "count_rows", lambda: {"total": connector.count_rows(sql)}, rows=n)
+        finally:
+            connector.close()
+
+
+def _numeric_chunks(n, chunk_rows):
+    """Synthetic result chunks (numbers only, so 10M rows still fit in memory)."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(42)
+    for start in range(0, n, chunk_rows):
+        size = min(chunk_rows, n - start)
+        yield pd.DataFrame({
+            "id": np.arange(start, start + size),
+            "user_id": rng.integers(0, 100_000, size),
+            "amount": rng.random(size) * 500,
+            "score": rng.random(size),
+        })
+
+
+def _tk_root():
+    try:
+        import tkinter as tk
+
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+
+def run_render(bench, args):
+    from config import FETCH_CHUNK_ROWS
+    from result_store import ResultStore
+    from result_view import ResultView
+    from spill_store import SpillStore
+
+    root = _tk_root()
+    for n in ROW_SIZES[args.size]:
+        chunks = list(_numeric_chunks(n, FETCH_CHUNK_ROWS))
+
+        def fill():
+            store = ResultStore()
+            for chunk in chunks:
+                store.append(chunk)
+            return store
+
+        bench.measure("render", "store_append", lambda: {"rows": len(fill())}, rows=n)
+        store = fill()
+        rng = random.Random(1)
+        positions = [rng.randrange(max(1, n - 40)) for _ in range(1000)]
+        bench.measure("render", "viewport_reads",
+                      lambda: {"rows": sum(len(store.rows(p, p + 40)) for p in positions)},
+                      rows=n, reads=1000)
+
+        view = ResultView(store)
+
+        def order(sort=None, filters=None):
+            view.invalidate()
+            view.sort, view.filters = sort, filters or {}
+            return {"shown": len(view.order())}
+
+        bench.measure("render", "sort_column", lambda: order(sort=(2, False)), rows=n)
+        bench.measure("render", "filter_range", lambda: order(filters={2: ("range", "100..200")}), rows=n)
+
+        # The same reads against a result moved to disk
+        def spill():
+            spilled = SpillStore(chunks[0].columns)
+            for chunk in chunks:
+                spilled.append(chunk)
+            spilled.finish()
+            return spilled
+
+        bench.measure("render", "spill_append", lambda: {"rows": len(spill())}, rows=n)
+        spilled = spill()
+        bench.measure("render", "spill_viewport_reads",
+                      lambda: {"rows": sum(len(spilled.rows(p, p + 40)) for p in positions)},
+                      rows=n, reads=1000)
+        spilled_view = ResultView(spilled)
+
+        def spilled_order():
+            spilled_view.invalidate()
+            spilled_view.sort = (2, False)
+            return {"shown": len(spilled_view.order())}
+
+        bench.measure("render", "spill_sort_column", spilled_order, rows=n)
+        spilled.close()
+
+        if root is None:
+            bench.skip("render", "grid_scroll", "no display", rows=n)
+            continue
+        from ui.result_view_frame import VirtualResultGrid
+
+        root.deiconify()
+        root.geometry("1000x700")
+        grid = VirtualResultGrid(root)
+        grid.pack(fill="both", expand=True)
+        root.update()
+        grid.set_source(store)
+        root.update()
+
+        def scroll():
+            for p in positions[:200]:
+                grid.yview("moveto", p / n)
+                root.update_idletasks()
+
+        bench.measure("render", "grid_scroll", scroll, rows=n, redraws=200)
+        grid.destroy()
+        root.withdraw()
+    if root is not None:
+        root.destroy()
+
+
+def run_export(bench, args):
+    from exporter import export_rows, frame_rows
+    from fixtures import rows_db
+    from result_store import ResultStore
+
+    sql = "SELECT * FROM events"
+    out_dir = os.path.join(args.work_dir, "export")
+    os.makedirs(out_dir, exist_ok=True)
+    for n in ROW_SIZES[args.size]:
+        connector = sqlite_connector(rows_db(args.work_dir, n))
+        try:
+            store = ResultStore()
+            for chunk in connector.iter_query(sql):
+                store.append(chunk)
+            csv_path = os.path.join(out_dir, "out.csv")
+            bench.measure("export", "csv_from_store",
+                          lambda: {"rows": export_rows(frame_rows(store.iter_chunks()), csv_path, "csv")}, rows=n)
+            bench.measure("export", "csv_from_db",
+                          lambda: {"rows": export_rows(connector.iter_rows(sql), csv_path, "csv")}, rows=n)
+            if n <= XLSX_MAX_ROWS[args.size]:
+                xlsx_path = os.path.join(out_dir, "out.xlsx")
+                bench.measure("export", "xlsx_from_store",
+                              lambda: {"rows": export_rows(frame_rows(store.iter_chunks()), xlsx_path, "excel")},
+                              repeat=1, rows=n)
+            else:
+                bench.skip("export", "xlsx_from_store", f"over {XLSX_MAX_ROWS[args.size]:,} rows", rows=n)
+        finally:
+            connector.close()
+
+
+def run_e2e(bench, args):
+    from fake_ollama import FakeOllama
+    from fixtures import rows_db
+    from generation_cache import GenerationCache
+    from job_executor import Job
+    from metrics import Metrics
+    from ollama_client import OllamaClient
+    from schema_cache import SchemaCache
+    from sql_generator import SqlGenerator
+
+    # Seed 1 is the first speculative candidate: it gets an answer that fails validation
+    with FakeOllama(first_token_seconds=args.ttft, token_seconds=args.token_latency, bad_seeds={1}) as fake:
+        connector = sqlite_connector(rows_db(args.work_dir, 100_000))
+        ollama = OllamaClient(fake.url, model="fake")
+        generator = SqlGenerator(connector, ollama,
+                                 schema_cache=SchemaCache(cache_dir=os.path.join(args.work_dir, "schema_cache")),
+                                 generation_cache=GenerationCache(db_path=None))
+        try:
+            def generate(use_cache):
+                metrics = Metrics("generate")
+                sql, _ = generator.generate(Job(0, "benchmark", None), QUESTION, use_cache, metrics)
+                metrics.finish()
+                return {"sql": sql, "stages": {k: round(v, 6) for k, v in metrics.stages.items()}}
+
+            def candidates():
+                stats = generator.generate(Job(0, "benchmark", None), QUESTION, False, candidates=3)[1]
+                return {"candidates": 3, "rejected": stats["candidates_rejected"],
+                        "sequential_seconds": round(stats["sequential_seconds"], 6)}
+
+            def nl_to_rows():
+                sql = generate(use_cache=False)["sql"]
+                return {"result_rows": len(connector.execute_query(sql))}
+
+            params = {"ttft": args.ttft, "token_latency": args.token_latency}
+            bench.measure("e2e", "generate_cold", lambda: generate(use_cache=False), **params)
+            generate(use_cache=True)
+            bench.measure("e2e", "generate_cached", lambda: generate(use_cache=True), **params)
+            bench.measure("e2e", "nl_to_rows", nl_to_rows, **params)
+            # First valid of 3 concurrent answers, vs. retrying after the bad one (sequential_seconds)
+            bench.measure("e2e", "generate_candidates", candidates, **params)
+        finally:
+            ollama.close()
+            connector.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result):
+    return result["suite"], result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results, baseline_path, threshold=0.10):
+    """Print median time against a previous run; flags changes beyond ``threshold``."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {_key(r): r for r in json.load(f)["results"] if "median" in r}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        old = baseline.get(_key(result))
+        if old is None or "median" not in result:
+            continue
+        ratio = result["median"] / max(old["median"], 1e-9)
+        flag = "  SLOWER" if ratio > 1 + threshold else "  faster" if ratio < 1 - threshold else ""
+        print(f"{result['suite']:>7} {result['name']:<24} {json.dumps(result['params']):<40} "
+              f"{old['median'] * 1000:>9.1f} -> {result['median'] * 1000:>9.1f} ms  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=SUITES)
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--quick", dest="size", action="store_const", const="quick",
+                      help="smallest sizes, one repetition")
+    size.add_argument("--full", dest="size", action="store_const", const="full", help="up to 10M rows")
+    parser.set_defaults(size="default")
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--ttft", type=float, default=0.2, help="fake Ollama time to first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="fake Ollama seconds per token")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "nl2sql-bench"),
+                        help="fixtures are built here once and reused")
+    parser.add_argument("--output", default=None, help="JSON results file")
+    parser.add_argument("--compare", default=None, help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    # Must be set before the app's config module is imported
+    os.environ["NL2SQL_CACHE_DIR"] = os.path.join(args.work_dir, "cache")
+    os.environ["NL2SQL_METRICS_FILE"] = ""
+
+    bench = Bench(args.repeat or (1 if args.size == "quick" else 3))
+    started = time.time()
+    for suite in SUITES:
+        if suite in args.suite:
+            globals()[f"run_{suite}"](bench, args)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         time.strftime("%Y%m%d-%H%M%S", time.localtime(started)) + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    report = {
+        "meta": {
+            "started": started,
+            "seconds": round(time.time() - started, 3),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": bench.results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(bench.results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
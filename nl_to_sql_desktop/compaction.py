@@ -0,0 +1,162 @@
+# compaction.py
+"""
+Shrinks a fetched result before it is shown, cached or exported.
+
+Drivers hand rows over as Python objects, so a DataFrame built from them is
+mostly object columns: every Decimal, date and repeated string is a separate
+Python object. compact_store() converts column by column, and only where no
+value changes:
+
+- integers are downcast to the smallest width that holds the column's range,
+  integer columns that turned float because of NULLs become nullable
+  integers, floats become float32 when every value survives the round trip;
+- text columns with few distinct values become categoricals;
+- Decimal columns with at most 15 significant digits become float64 (same
+  values, though trailing zeros such as 10.50 are no longer shown);
+- with COMPACT_ARROW_DTYPES, remaining text, wider Decimals and dates become
+  Arrow-backed columns (string, decimal128, date32).
+
+Each column is converted once over the whole result and handed back to the
+chunks as slices, so every chunk ends up with the same dtypes (the Parquet
+spill of the result cache relies on that).
+"""
+import decimal
+import logging
+
+import numpy as np
+import pandas as pd
+
+from config import COMPACT_ARROW_DTYPES, COMPACT_CATEGORY_MAX_PERCENT
+from result_store import ResultStore
+
+logger = logging.getLogger(__name__)
+
+# float64 represents any decimal of up to 15 significant digits exactly
+FLOAT64_DIGITS = 15
+# Distinct values are counted on this many rows before factorizing a whole text column
+CARDINALITY_SAMPLE = 10_000
+
+
+def _int_dtype(low, high):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def _decimal_array(values):
+    """The Decimals as an Arrow decimal128 array at the column's scale, or None."""
+    import pyarrow as pa
+
+    sample = [d for d in values.iloc[:1000] if isinstance(d, decimal.Decimal) and d.is_finite()]
+    scale = max([-d.as_tuple().exponent for d in sample] + [0])
+    # The scale comes from a sample; a value with more decimals makes the conversion fail
+    for scale in dict.fromkeys([scale, 18]):
+        try:
+            return pa.array(values, type=pa.decimal128(38, scale), from_pandas=True)
+        except (pa.ArrowException, TypeError, ValueError):
+            continue
+    return None
+
+
+def compact_column(values, integer=False, arrow_dtypes=COMPACT_ARROW_DTYPES,
+                   category_percent=COMPACT_CATEGORY_MAX_PERCENT):
+    """
+    ``values`` converted to a smaller lossless dtype, or None when there is
+    none. ``integer``: the column is an integer one that came back as float
+    because of NULLs.
+    """
+    dtype = values.dtype
+    if not len(values) or not isinstance(dtype, np.dtype):
+        return None
+    if dtype.kind in "iu":
+        target = _int_dtype(values.min(), values.max())
+        return values.astype(target) if np.dtype(target).itemsize < dtype.itemsize else None
+    if dtype == np.float64:
+        data = values.to_numpy()
+        present = data[~np.isnan(data)]
+        if integer and len(present) and np.array_equal(present, np.round(present)) \
+                and np.abs(present).max() < 2 ** 53:
+            # Nullable integers: shows 3 instead of 3.0 and <NA> instead of nan
+            target = _int_dtype(present.min(), present.max())
+            return values.astype(pd.api.types.pandas_dtype(np.dtype(target).name.capitalize()))
+        narrow = data.astype(np.float32)
+        if np.array_equal(narrow.astype(np.float64), data, equal_nan=True):
+            return pd.Series(narrow)
+        return None
+    if dtype != object:
+        return None
+
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind == "string":
+        sample = values.iloc[:CARDINALITY_SAMPLE]
+        if sample.nunique() * 100 <= len(sample) * category_percent:
+            codes, uniques = pd.factorize(values, sort=True)
+            if len(uniques) * 100 <= len(values) * category_percent:
+                return pd.Series(pd.Categorical.from_codes(codes, categories=uniques))
+        if arrow_dtypes:
+            import pyarrow as pa
+
+            return values.astype(pd.ArrowDtype(pa.string()))
+        return None
+    if kind == "decimal":
+        import pyarrow.compute as pc
+
+        array = _decimal_array(values)
+        if array is None:
+            return None     # NaN/Infinity, or more digits than a decimal128 holds
+        bounds = pc.min_max(array)
+        low, high = bounds["min"].as_py(), bounds["max"].as_py()
+        if low is None or max(abs(low), abs(high)) < 10 ** (FLOAT64_DIGITS - array.type.scale):
+            # At most 15 significant digits; float() rounds correctly where Arrow's cast may not
+            return values.astype(np.float64)
+        if arrow_dtypes:
+            return pd.Series(pd.arrays.ArrowExtensionArray(array))
+        return None
+    if kind == "date" and arrow_dtypes:
+        import pyarrow as pa
+
+        return values.astype(pd.ArrowDtype(pa.date32()))
+    return None
+
+
+def compact_store(store, before=None):
+    """
+    (compacted copy of ``store``, bytes before, bytes after). Same rows in the
+    same order; ``store`` itself is returned when nothing could be saved.
+    ``before`` skips re-measuring when the caller already knows the size.
+    """
+    before = before if before is not None else store.nbytes()
+    if not store.chunks:
+        return store, before, before
+    converted = {}
+    for i, name in enumerate(store.columns):
+        values = store.column(i)
+        dtypes = {chunk.dtypes.iloc[i] for chunk in store.chunks}
+        integer = any(isinstance(d, np.dtype) and d.kind in "iu" for d in dtypes)
+        try:
+            compact = compact_column(values, integer)
+        except Exception as e:
+            logger.warning(f"Could not compact column {name}: {e}")
+            compact = None
+        if compact is None and len(dtypes) > 1:
+            compact = values    # chunks disagree (e.g. NULLs only in later ones): give them one dtype
+        if compact is not None:
+            converted[i] = compact.reset_index(drop=True)
+    if not converted:
+        return store, before, before
+
+    result = ResultStore(store.columns)
+    start = 0
+    for chunk in store.chunks:
+        stop = start + len(chunk)
+        chunk = chunk.copy(deep=False)
+        for i, values in converted.items():
+            chunk.isetitem(i, pd.Series(values.array[start:stop]))
+        result.append(chunk)
+        start = stop
+    after = result.nbytes()
+    logger.info(f"Compacted result of {len(store):,} rows from {before / 2 ** 20:.1f} MB "
+                f"to {after / 2 ** 20:.1f} MB")
+    return result, before, after
@@ -0,0 +1,96 @@
+# config.py
+"""
+Application-wide tunables. Every value can be overridden with an
+environment variable of the same name prefixed with ``NL2SQL_``.
+"""
+import os
+
+
+def _env_str(name, default):
+    return os.environ.get(f"NL2SQL_{name}", default)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(f"NL2SQL_{name}", default))
+    except ValueError:
+        return default
+
+
+# Background jobs
+JOB_WORKERS = _env_int("JOB_WORKERS", 4)
+JOB_POLL_MS = _env_int("JOB_POLL_MS", 50)
+
+# Result streaming
+FETCH_CHUNK_ROWS = _env_int("FETCH_CHUNK_ROWS", 5000)
+# Rows held in memory; past this (or SPILL_AFTER_MB) a result moves to disk, or is cut off when SPILL_AFTER_MB=0
+MAX_RESULT_ROWS = _env_int("MAX_RESULT_ROWS", 1_000_000)
+# Preview mode runs queries with this LIMIT and counts the total in the background (0 = off)
+PREVIEW_ROWS = _env_int("PREVIEW_ROWS", 500)
+# Time limit for one query, in seconds (0 = no limit). The server enforces it per statement; for
+# streamed results, where PostgreSQL runs every chunk as a separate FETCH, a client-side deadline
+# from the first execute cancels the query as a whole.
+QUERY_TIMEOUT_SECONDS = _env_int("QUERY_TIMEOUT_SECONDS", 300)
+
+# EXPLAIN before running (see cost_guard.py). Rows: largest planner row estimate of any plan step;
+# cost: in the database's own planner units. 0 turns a threshold off.
+GUARD_ENABLED = _env_int("GUARD_ENABLED", 1)
+GUARD_TIMEOUT_SECONDS = _env_int("GUARD_TIMEOUT_SECONDS", 5)
+GUARD_WARN_ROWS = _env_int("GUARD_WARN_ROWS", 1_000_000)
+GUARD_PREVIEW_ROWS = _env_int("GUARD_PREVIEW_ROWS", 10_000_000)
+GUARD_CONFIRM_ROWS = _env_int("GUARD_CONFIRM_ROWS", 100_000_000)
+GUARD_WARN_COST = _env_int("GUARD_WARN_COST", 0)
+GUARD_PREVIEW_COST = _env_int("GUARD_PREVIEW_COST", 0)
+GUARD_CONFIRM_COST = _env_int("GUARD_CONFIRM_COST", 0)
+
+# Local caches
+CACHE_DIR = os.environ.get("NL2SQL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".nl_to_sql"))
+SCHEMA_CHECK_SECONDS = _env_int("SCHEMA_CHECK_SECONDS", 30)
+
+# Prompt building
+PROMPT_TOKEN_BUDGET = _env_int("PROMPT_TOKEN_BUDGET", 2000)
+PROMPT_TOP_K_TABLES = _env_int("PROMPT_TOP_K_TABLES", 8)
+
+# NL -> SQL generation cache
+GENERATION_CACHE_SIZE = _env_int("GENERATION_CACHE_SIZE", 256)
+GENERATION_CACHE_PERSIST = _env_int("GENERATION_CACHE_PERSIST", 1)
+# Speculative generation: this many answers at once, first valid one wins (1 = off)
+GENERATION_CANDIDATES = _env_int("GENERATION_CANDIDATES", 1)
+CANDIDATE_TEMPERATURES = [float(t) for t in _env_str("CANDIDATE_TEMPERATURES", "0,0.4,0.8,1.0").split(",")]
+
+# Ollama
+OLLAMA_MODEL = _env_str("OLLAMA_MODEL", "llama3")
+OLLAMA_KEEP_ALIVE = _env_str("OLLAMA_KEEP_ALIVE", "10m")
+OLLAMA_CONNECT_TIMEOUT = _env_int("OLLAMA_CONNECT_TIMEOUT", 5)
+OLLAMA_READ_TIMEOUT = _env_int("OLLAMA_READ_TIMEOUT", 30)
+OLLAMA_HEALTH_TTL = _env_int("OLLAMA_HEALTH_TTL", 30)
+OLLAMA_POOL_SIZE = _env_int("OLLAMA_POOL_SIZE", 4)
+
+# Database connection pool (DB_POOL_MAX=0 keeps a single shared connection)
+DB_POOL_MIN = _env_int("DB_POOL_MIN", 1)
+DB_POOL_MAX = _env_int("DB_POOL_MAX", 4)
+DB_POOL_RECYCLE_SECONDS = _env_int("DB_POOL_RECYCLE_SECONDS", 1800)
+DB_POOL_TIMEOUT_SECONDS = _env_int("DB_POOL_TIMEOUT_SECONDS", 30)
+
+# Query result cache
+RESULT_CACHE_MEMORY_MB = _env_int("RESULT_CACHE_MEMORY_MB", 256)
+RESULT_CACHE_DISK_MB = _env_int("RESULT_CACHE_DISK_MB", 2048)
+RESULT_CACHE_TTL_SECONDS = _env_int("RESULT_CACHE_TTL_SECONDS", 600)
+
+# Compaction of fetched results (see compaction.py)
+COMPACT_RESULTS = _env_int("COMPACT_RESULTS", 1)
+# Text columns with at most this share of distinct values become categoricals
+COMPACT_CATEGORY_MAX_PERCENT = _env_int("COMPACT_CATEGORY_MAX_PERCENT", 50)
+# Arrow-backed dtypes for the remaining text, wide Decimals and dates
+COMPACT_ARROW_DTYPES = _env_int("COMPACT_ARROW_DTYPES", 0)
+
+# Results larger than memory, kept in memory-mapped Arrow files (see spill_store.py)
+SPILL_AFTER_MB = _env_int("SPILL_AFTER_MB", 512)
+SPILL_MAX_MB = _env_int("SPILL_MAX_MB", 20480)
+SPILL_SEGMENT_MB = _env_int("SPILL_SEGMENT_MB", 64)
+SPILL_DIR = os.environ.get("NL2SQL_SPILL_DIR", os.path.join(CACHE_DIR, "spill"))
+
+# Per-operation timing records, one JSON object per line ("" disables)
+METRICS_FILE = os.environ.get("NL2SQL_METRICS_FILE", os.path.join(CACHE_DIR, "metrics.jsonl"))
+# Past this size the file moves to <file>.1, replacing the older backup (0 = no limit)
+METRICS_MAX_MB = _env_int("METRICS_MAX_MB", 10)
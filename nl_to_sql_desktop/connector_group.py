@@ -0,0 +1,213 @@
+# connector_group.py
+"""
+Several DBConnectors with the same schema (e.g. regional shards) behind the
+DBConnector interface.
+
+Schema reads and queries run on every shard at once in a thread pool, so a
+call takes as long as the slowest shard rather than the sum of all of them.
+Query results are merged into one result set with an extra ``source_db``
+column naming the shard each row came from. Rows are concatenated in
+arrival order: ORDER BY, LIMIT and aggregates apply per shard, not globally.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from config import FETCH_CHUNK_ROWS, GUARD_TIMEOUT_SECONDS, QUERY_TIMEOUT_SECONDS
+from db_connector import DBConnector
+
+logger = logging.getLogger(__name__)
+
+SOURCE_COLUMN = "source_db"
+_DONE = object()
+
+
+class ShardError(Exception):
+    """An operation failed on one shard of a ConnectorGroup."""
+
+    def __init__(self, connector, error):
+        super().__init__(f"{connector.label}: {error}")
+        self.connector = connector
+        self.error = error
+
+
+def parse_shards(host_field, db_type, port, db_name):
+    """
+    'eu.example.com, us.example.com:3307, postgresql://ap.example.com/sales'
+    -> [(db_type, host, port, db_name), ...]; anything left out of an entry
+    is taken from the other login fields.
+    """
+    shards = []
+    for entry in host_field.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        shard_type, shard_port, shard_db = db_type, port, db_name
+        if "://" in entry:
+            shard_type, entry = entry.split("://", 1)
+        if "/" in entry:
+            entry, shard_db = entry.split("/", 1)
+        if ":" in entry:
+            entry, shard_port = entry.rsplit(":", 1)
+        shards.append((shard_type, entry, shard_port, shard_db))
+    return shards
+
+
+class ConnectorGroup:
+    def __init__(self, connectors):
+        self.connectors = list(connectors)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.connectors)),
+                                        thread_name_prefix="shard")
+
+    @classmethod
+    def from_login(cls, db_type, host_field, port, db_name, username, password):
+        """One connector per comma-separated entry of the Host field."""
+        return cls(DBConnector(t, h, p, d, username, password)
+                   for t, h, p, d in parse_shards(host_field, db_type, port, db_name))
+
+    def _fan_out(self, fn):
+        """fn(connector) on every shard concurrently; results in shard order."""
+        futures = [self._pool.submit(fn, connector) for connector in self.connectors]
+        results = []
+        for connector, future in zip(self.connectors, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                raise ShardError(connector, e) from e
+        return results
+
+    def connect(self):
+        try:
+            self._fan_out(lambda c: c.connect())
+        except Exception:
+            self.close()
+            raise
+        logger.info(f"Connected to {len(self.connectors)} databases: "
+                    f"{', '.join(c.label for c in self.connectors)}")
+
+    @property
+    def label(self):
+        return f"{len(self.connectors)} databases"
+
+    @property
+    def identity(self):
+        return ("group",) + tuple(part for c in self.connectors for part in c.identity)
+
+    @property
+    def username(self):
+        return ",".join(sorted({c.username for c in self.connectors}))
+
+    def get_schema_version(self):
+        return "/".join(self._fan_out(lambda c: c.get_schema_version()))
+
+    def get_schema(self):
+        """Union of the shards' schemas (they are expected to be the same); row counts add up."""
+        merged = None
+        for connector, schema in zip(self.connectors, self._fan_out(lambda c: c.get_schema())):
+            if merged is None:
+                merged = schema
+                continue
+            if set(schema) != set(merged):
+                logger.warning(f"Schema of {connector.label} differs from the first shard")
+            merged.merge(schema)
+        return merged
+
+    def get_primary_key(self, table):
+        return self.connectors[0].get_primary_key(table)
+
+    def execute_query(self, sql, timeout=QUERY_TIMEOUT_SECONDS):
+        frames = self._fan_out(lambda c: c.execute_query(sql, timeout).assign(**{SOURCE_COLUMN: c.label}))
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_rows(self, sql, chunk_size=FETCH_CHUNK_ROWS, timeout=QUERY_TIMEOUT_SECONDS, cancel_hook=None):
+        """
+        Same contract as DBConnector.iter_rows(). Each shard streams on its own
+        thread into a small bounded queue, so a fast shard's rows show up
+        while a slow one is still running; closing the generator stops them all.
+        """
+        events = queue.Queue(maxsize=2 * len(self.connectors))
+        stop = threading.Event()
+        cancellers = []
+
+        def register(cancel):
+            cancellers.append(cancel)
+            if cancel_hook is not None:
+                cancel_hook(cancel)
+
+        def stream(connector):
+            rows_iter = connector.iter_rows(sql, chunk_size, timeout=timeout, cancel_hook=register)
+            try:
+                for columns, rows in rows_iter:
+                    label = (connector.label,)
+                    if not self._put(events, stop, (connector, columns, [row + label for row in map(tuple, rows)])):
+                        return
+            except Exception as e:
+                self._put(events, stop, (connector, e, None))
+            finally:
+                rows_iter.close()
+                self._put(events, stop, (connector, _DONE, None))
+
+        # Plain threads: a stream lasts as long as its consumer, it must not hold up _fan_out()
+        for connector in self.connectors:
+            threading.Thread(target=stream, args=(connector,), daemon=True,
+                             name=f"shard-{connector.label}").start()
+
+        columns, running = None, len(self.connectors)
+        try:
+            while running:
+                connector, shard_columns, rows = events.get()
+                if shard_columns is _DONE:
+                    running -= 1
+                    continue
+                if isinstance(shard_columns, Exception):
+                    raise ShardError(connector, shard_columns) from shard_columns
+                shard_columns = list(shard_columns) + [SOURCE_COLUMN]
+                if columns is None:
+                    columns = shard_columns
+                elif len(shard_columns) != len(columns):
+                    raise ValueError(f"{connector.label} returned columns {shard_columns[:-1]}, "
+                                     f"expected {columns[:-1]}")
+                yield columns, rows
+        finally:
+            stop.set()
+            if running:
+                # Stopped early (error, row cap, closed): don't let the other shards run on
+                for cancel in list(cancellers):
+                    cancel()
+
+    @staticmethod
+    def _put(events, stop, item):
+        """Queue ``item`` unless the consumer has gone away. Returns False once it has."""
+        while not stop.is_set():
+            try:
+                events.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def count_rows(self, sql, timeout=QUERY_TIMEOUT_SECONDS, cancel_hook=None):
+        """Rows over all shards."""
+        return sum(self._fan_out(lambda c: c.count_rows(sql, timeout, cancel_hook)))
+
+    def explain(self, sql, timeout=GUARD_TIMEOUT_SECONDS):
+        """The shards' estimates added up; None if any shard gives none."""
+        estimates = self._fan_out(lambda c: c.explain(sql, timeout))
+        if any(estimate is None for estimate in estimates):
+            return None
+        return sum(estimates[1:], estimates[0])
+
+    def iter_query(self, sql, chunk_size=FETCH_CHUNK_ROWS, **kwargs):
+        for columns, rows in self.iter_rows(sql, chunk_size, **kwargs):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def close(self):
+        for connector in self.connectors:
+            try:
+                connector.close()
+            except Exception as e:
+                logger.warning(f"Error closing {connector.label}: {e}")
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,142 @@
+# cost_guard.py
+"""
+Pre-flight check of a query against the planner's estimate.
+
+DBConnector.explain() runs EXPLAIN in JSON form (PostgreSQL: ``EXPLAIN
+(FORMAT JSON)``, MySQL: ``EXPLAIN FORMAT=JSON``) and turns the plan into an
+Estimate:
+
+- rows: the largest row count of any plan step, i.e. the biggest set of
+  rows the server expects to scan, join or return. A step under a LIMIT
+  counts only the rows the limit lets it produce;
+- cost: the planner's total cost, in the database's own units.
+
+The GUARD_* thresholds then decide between running the query as is, with a
+warning, as a preview (LIMITed, see sql_rewrite.py), or only after the user
+confirms. A threshold of 0 is off.
+"""
+from config import (GUARD_CONFIRM_COST, GUARD_CONFIRM_ROWS, GUARD_PREVIEW_COST, GUARD_PREVIEW_ROWS,
+                    GUARD_WARN_COST, GUARD_WARN_ROWS)
+
+LEVELS = (None, "warn", "preview", "confirm")
+
+
+def _over(value, threshold):
+    return bool(threshold) and value is not None and value >= threshold
+
+
+def short_number(number):
+    """2_100_000_000 -> '2.1B'."""
+    for size, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(number) >= size:
+            return f"{number / size:.1f}{suffix}"
+    return f"{number:,.0f}"
+
+
+class Estimate:
+    def __init__(self, rows, cost=None):
+        self.rows = rows
+        self.cost = cost
+
+    @property
+    def level(self):
+        """None, "warn", "preview" or "confirm": the strictest threshold reached."""
+        for level, max_rows, max_cost in (("confirm", GUARD_CONFIRM_ROWS, GUARD_CONFIRM_COST),
+                                          ("preview", GUARD_PREVIEW_ROWS, GUARD_PREVIEW_COST),
+                                          ("warn", GUARD_WARN_ROWS, GUARD_WARN_COST)):
+            if _over(self.rows, max_rows) or _over(self.cost, max_cost):
+                return level
+        return None
+
+    def describe(self):
+        """'≈2.1B rows · cost 3.4M'"""
+        text = f"≈{short_number(self.rows)} rows" if self.rows is not None else "rows unknown"
+        if self.cost is not None:
+            text += f" · cost {short_number(self.cost)}"
+        return text
+
+    def __add__(self, other):
+        """Two shards' estimates: the work of both."""
+        add = lambda a, b: None if a is None or b is None else a + b
+        return Estimate(add(self.rows, other.rows), add(self.cost, other.cost))
+
+
+# Nodes that read all of their input before returning a row: a LIMIT above them does not shorten their scan
+_BLOCKING = {"Sort", "Hash", "Materialize", "WindowAgg", "SetOp", "Unique"}
+
+
+def _postgres_rows(node, fraction=1.0):
+    """
+    Largest number of rows any node below ``node`` works through, with each
+    count scaled by the share of it a LIMIT above lets run (``fraction``).
+    """
+    rows = node.get("Plan Rows", 0)
+    largest = rows * fraction
+    children = node.get("Plans", ())
+    if node.get("Node Type") == "Limit" and children:
+        child_rows = max(child.get("Plan Rows", 0) for child in children)
+        if child_rows:
+            fraction = min(fraction, rows * fraction / child_rows)
+    elif node.get("Node Type") in _BLOCKING or (node.get("Node Type") == "Aggregate"
+                                                 and node.get("Strategy") != "Sorted"):
+        fraction = 1.0 if fraction > 0 else 0.0
+    for child in children:
+        largest = max(largest, _postgres_rows(child, fraction))
+    return largest
+
+
+def postgres_estimate(plan):
+    """
+    Estimate from ``EXPLAIN (FORMAT JSON)`` output: [{"Plan": {...}}].
+    Scans under a Limit count only the rows the limit lets them produce,
+    unless a sort, hash or aggregate in between has to read them all; the
+    root's Total Cost is prorated by PostgreSQL itself.
+    """
+    root = plan[0]["Plan"]
+    return Estimate(int(round(_postgres_rows(root))), root.get("Total Cost"))
+
+
+def _items(value):
+    """Every (key, value) pair of a nested JSON document."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield key, item
+            yield from _items(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _items(item)
+
+
+_MYSQL_ROW_KEYS = ("rows_examined_per_scan", "rows_produced_per_join", "estimated_rows")
+# Plan steps that read all rows before the LIMIT applies (format 1 keys, format 2 operations)
+_MYSQL_BLOCKING_KEYS = ("grouping_operation", "duplicates_removal", "windowing")
+_MYSQL_BLOCKING_FLAGS = ("using_filesort", "using_temporary_table")
+_MYSQL_BLOCKING_OPERATIONS = ("Sort", "Aggregate", "Group aggregate", "Materialize", "Temporary table", "Window")
+
+
+def _mysql_blocking(key, value):
+    return (key in _MYSQL_BLOCKING_KEYS
+            or (key in _MYSQL_BLOCKING_FLAGS and value is True)
+            or (key == "operation" and isinstance(value, str) and value.startswith(_MYSQL_BLOCKING_OPERATIONS)))
+
+
+def mysql_estimate(plan, limit=None):
+    """
+    Estimate from ``EXPLAIN FORMAT=JSON`` output (format versions 1 and 2).
+    MySQL reports scan rows and cost as if a LIMIT were not there, so with a
+    top-level ``limit`` (see sql_rewrite.top_level_limit) and nothing that
+    has to read every row first, rows and cost are scaled down to the limit.
+    """
+    rows, cost, blocking = 0, None, False
+    for key, value in _items(plan):
+        if key in _MYSQL_ROW_KEYS:
+            rows = max(rows, int(float(value)))
+        elif key in ("query_cost", "estimated_total_cost"):
+            cost = max(cost or 0.0, float(value))   # the whole query's is the largest
+        elif _mysql_blocking(key, value):
+            blocking = True
+    if limit is not None and not blocking and rows > limit:
+        if cost is not None:
+            cost *= limit / rows
+        rows = limit
+    return Estimate(rows, cost)
@@ -1,21 +1,161 @@
 # db_connector.py
+import importlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 import pandas as pd
-import psycopg2
-import mysql.connector
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+from config import (DB_POOL_MAX, DB_POOL_MIN, DB_POOL_RECYCLE_SECONDS, DB_POOL_TIMEOUT_SECONDS,
+                    FETCH_CHUNK_ROWS, GUARD_TIMEOUT_SECONDS, QUERY_TIMEOUT_SECONDS)
+from cost_guard import mysql_estimate, postgres_estimate
+from schema_model import build_schema
+from sql_rewrite import count_sql, statement_text, top_level_limit
+
+logger = logging.getLogger(__name__)
+
+
+class EditConflict(Exception):
+    """Rows changed (or vanished) in the database since they were read; nothing was saved."""
+
+    def __init__(self, keys):
+        super().__init__(f"{len(keys)} row(s) were changed by someone else since they were loaded")
+        self.keys = keys
+
+
+class QueryTimeout(Exception):
+    """The server stopped a query that ran longer than its time limit."""
+
+
+# DB-API driver per db_type, imported on first connect: only the one in use is ever loaded
+DRIVERS = {"postgresql": "psycopg2", "mysql": "mysql.connector", "sqlite": "sqlite3"}
+
+
+def load_driver(db_type):
+    """The driver module for ``db_type``, importing it if needed."""
+    if db_type not in DRIVERS:
+        raise ValueError(f"Unsupported DB type: {db_type}")
+    try:
+        return importlib.import_module(DRIVERS[db_type])
+    except ImportError as e:
+        raise ImportError(f"The {db_type} driver ({DRIVERS[db_type]}) is not installed: {e}") from e
+
+
+# MySQL "maximum statement execution time exceeded"; MariaDB's max_statement_time
+_MYSQL_TIMEOUT_ERRNOS = {3024, 1969}
+
+
+class _StatementCanceller:
+    """Cancels whatever statement runs on one connection, from any thread, until done()."""
+
+    def __init__(self, connector, conn):
+        self.connector = connector
+        self.raw = getattr(conn, "dbapi_connection", conn)   # unwrap a pooled connection
+        self.cancelled = False
+        self.expired = False    # cancelled by the query's deadline rather than by the user
+        self._active = True
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            if not self._active:
+                return
+            self.cancelled = True
+        # Reaching the server can block; keep it off the caller's (UI) thread
+        threading.Thread(target=self._send_cancel, daemon=True).start()
+
+    def expire(self):
+        """The query's time limit passed."""
+        self.expired = True
+        self.cancel()
+
+    def stop(self):
+        """Cancel the statement now, on the calling thread (the one consuming its rows)."""
+        self._send_cancel()
+
+    def _send_cancel(self):
+        # Holding the lock makes done() wait, so a late cancel can't hit the connection's next statement
+        with self._lock:
+            if not self._active:
+                return
+            try:
+                self.connector._cancel_statement(self.raw)
+            except Exception as e:
+                logger.warning(f"Could not cancel running query: {e}")
+
+    def done(self):
+        with self._lock:
+            self._active = False
+
+
+def _param_text(value):
+    """Edit values travel as text and are cast to the column type by the database."""
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        value = value.item()    # numpy scalar
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if value.is_integer():
+            # Integer columns holding NULLs come back from pandas as floats
+            return str(int(value))
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
 
 class DBConnector:
-    def __init__(self, db_type, host, port, db_name, username, password):
+    def __init__(self, db_type, host, port, db_name, username, password,
+                 pool_min=DB_POOL_MIN, pool_max=DB_POOL_MAX):
         self.db_type = db_type.lower()
         self.host = host
         self.port = port
         self.db_name = db_name
         self.username = username
         self.password = password
+        self.pool_min = pool_min
+        self.pool_max = pool_max
         self.conn = None
+        self.pool = None
+        # Without a pool, one raw connection is shared by every background job; serialize access
+        self._lock = threading.RLock()
 
     def connect(self):
+        """
+        Opens the connection pool (or the single shared connection when
+        pool_max is 0) and fails fast if the database is unreachable.
+        """
+        load_driver(self.db_type)
+        if self.pool_max <= 0:
+            self.conn = self._raw_connect()
+            return
+
+        pool_min = max(1, min(self.pool_min, self.pool_max))
+        self.pool = QueuePool(
+            self._raw_connect,
+            pool_size=pool_min,
+            max_overflow=self.pool_max - pool_min,
+            recycle=DB_POOL_RECYCLE_SECONDS,
+            timeout=DB_POOL_TIMEOUT_SECONDS,
+        )
+        event.listen(self.pool, "checkout", self._ping_on_checkout)
+        # Open the minimum number of connections up front
+        warm = [self.pool.connect() for _ in range(pool_min)]
+        for conn in warm:
+            conn.close()
+
+    def _raw_connect(self):
+        driver = load_driver(self.db_type)
         if self.db_type == "postgresql":
-            self.conn = psycopg2.connect(
+            return driver.connect(
                 host=self.host,
                 port=self.port,
                 dbname=self.db_name,
@@ -23,54 +163,643 @@ class DBConnector:
                 password=self.password
             )
         elif self.db_type == "mysql":
-            self.conn = mysql.connector.connect(
+            return driver.connect(
                 host=self.host,
                 port=self.port,
                 database=self.db_name,
                 user=self.username,
                 password=self.password
             )
-        else:
-            raise ValueError(f"Unsupported DB type: {self.db_type}")
+        elif self.db_type == "sqlite":
+            # db_name is the database file; pooled connections are used from worker threads
+            return driver.connect(self.db_name, check_same_thread=False)
+
+    @staticmethod
+    def _ping_on_checkout(dbapi_conn, connection_record, connection_proxy):
+        """Pre-ping: a dead connection is replaced by the pool instead of failing the query."""
+        try:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            dbapi_conn.rollback()
+        except Exception as e:
+            logger.warning(f"Discarding dead pooled connection: {e}")
+            raise exc.DisconnectionError() from e
+
+    @staticmethod
+    def _is_closed(conn):
+        if getattr(conn, "is_valid", True) is False:
+            return True     # a pooled connection that was invalidated
+        if hasattr(conn, "is_connected"):
+            return not conn.is_connected()    # mysql.connector
+        return bool(getattr(conn, "closed", False))
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks out a connection for the duration of the block. Pooled
+        connections are validated on checkout and rolled back on return; the
+        single shared connection is reopened if it was dropped.
+        """
+        if self.pool is not None:
+            conn = self.pool.connect()
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        with self._lock:
+            if self.conn is None or self._is_closed(self.conn):
+                logger.info("Reconnecting dropped database connection")
+                self.conn = self._raw_connect()
+            try:
+                yield self.conn
+            finally:
+                # One the block discarded is reopened on next use
+                if not self._is_closed(self.conn):
+                    try:
+                        self.conn.rollback()
+                    except Exception:
+                        logger.warning("Rollback failed; connection will be reopened on next use")
+
+    @property
+    def identity(self):
+        """Which database this connector points at (used as a cache key)."""
+        return (self.db_type, self.host, str(self.port), self.db_name)
+
+    @property
+    def label(self):
+        """Short human-readable name, e.g. 'sales@eu-db:5432'."""
+        if self.db_type == "sqlite":
+            return os.path.basename(self.db_name)
+        return f"{self.db_name}@{self.host}:{self.port}"
+
+    def get_schema_version(self):
+        """
+        Returns a cheap fingerprint of the catalog that changes whenever a
+        table or column is added, dropped, renamed or retyped.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            if self.db_type == "postgresql":
+                # pg_class/pg_attribute directly: far cheaper than information_schema views
+                cursor.execute("""
+                    SELECT count(*), md5(string_agg(
+                        c.oid::text || ':' || c.relname || ':' || a.attnum::text || ':' ||
+                        a.attname || ':' || a.atttypid::text, ',' ORDER BY c.oid, a.attnum))
+                    FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    JOIN pg_attribute a ON a.attrelid = c.oid
+                    WHERE n.nspname = 'public'
+                      AND c.relkind IN ('r', 'v', 'm', 'p', 'f')
+                      AND a.attnum > 0 AND NOT a.attisdropped
+                """)
+            elif self.db_type == "mysql":
+                # Checksum of the columns themselves: instant and in-place ALTERs leave CREATE_TIME as it was
+                cursor.execute("""
+                    SELECT COUNT(*), SUM(CRC32(CONCAT_WS(':', table_name, column_name, column_type,
+                                                         ordinal_position)))
+                    FROM information_schema.columns
+                    WHERE table_schema = %s
+                """, (self.db_name,))
+            elif self.db_type == "sqlite":
+                # Bumped by SQLite on every schema change
+                cursor.execute("PRAGMA schema_version")
+            else:
+                raise ValueError("Unsupported DB type for schema fetch")
+            row = cursor.fetchone()
+            cursor.close()
+        return "|".join(str(value) for value in row)
 
     def get_schema(self):
         """
-        Returns {table_name: [col1, col2, ...]} for all tables in the DB
+        The catalog as a schema_model.Schema: columns with types, primary and
+        foreign keys, indexes and approximate row counts, read with one
+        set-based query per kind rather than one per table.
         """
-        schema = {}
-        cursor = self.conn.cursor()
+        with self.connection() as conn:
+            cursor = conn.cursor()
 
-        if self.db_type == "postgresql":
-            cursor.execute("""
-                SELECT table_name, column_name
-                FROM information_schema.columns
-                WHERE table_schema = 'public'
-                ORDER BY table_name, ordinal_position
-            """)
-        elif self.db_type == "mysql":
-            cursor.execute("""
-                SELECT table_name, column_name
-                FROM information_schema.columns
-                WHERE table_schema = %s
-                ORDER BY table_name, ordinal_position
-            """, (self.db_name,))
-        else:
-            raise ValueError("Unsupported DB type for schema fetch")
+            if self.db_type == "postgresql":
+                cursor.execute("""
+                    SELECT c.relname, CASE WHEN c.relkind = 'v' THEN 'view' ELSE 'table' END,
+                           a.attname, format_type(a.atttypid, a.atttypmod), NOT a.attnotnull
+                    FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    JOIN pg_attribute a ON a.attrelid = c.oid
+                    WHERE n.nspname = 'public'
+                      AND c.relkind IN ('r', 'v', 'm', 'p', 'f')
+                      AND a.attnum > 0 AND NOT a.attisdropped
+                    ORDER BY c.relname, a.attnum
+                """)
+                columns = cursor.fetchall()
+                # unnest(conkey, confkey) pairs each key column with the column it references
+                cursor.execute("""
+                    SELECT c.relname, con.conname, con.contype = 'p', a.attname, f.relname, fa.attname
+                    FROM pg_constraint con
+                    JOIN pg_class c ON c.oid = con.conrelid
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, fattnum, seq)
+                    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+                    LEFT JOIN pg_class f ON f.oid = con.confrelid
+                    LEFT JOIN pg_attribute fa ON fa.attrelid = con.confrelid AND fa.attnum = k.fattnum
+                    WHERE n.nspname = 'public' AND con.contype IN ('p', 'f')
+                    ORDER BY c.relname, con.conname, k.seq
+                """)
+                keys = cursor.fetchall()
+                cursor.execute("""
+                    SELECT t.relname, i.relname, ix.indisunique, a.attname
+                    FROM pg_index ix
+                    JOIN pg_class t ON t.oid = ix.indrelid
+                    JOIN pg_class i ON i.oid = ix.indexrelid
+                    JOIN pg_namespace n ON n.oid = t.relnamespace
+                    CROSS JOIN LATERAL unnest(ix.indkey::int2[]) WITH ORDINALITY AS k(attnum, seq)
+                    LEFT JOIN pg_attribute a ON a.attrelid = ix.indrelid AND a.attnum = k.attnum
+                    WHERE n.nspname = 'public' AND k.seq <= ix.indnkeyatts
+                    ORDER BY t.relname, i.relname, k.seq
+                """)
+                indexes = cursor.fetchall()
+                # reltuples is -1 (or 0 before PostgreSQL 14) until the table is first analyzed
+                cursor.execute("""
+                    SELECT c.relname, CASE WHEN c.reltuples < 0 THEN NULL ELSE c.reltuples::bigint END
+                    FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'm', 'p', 'f')
+                """)
+                row_counts = dict(cursor.fetchall())
+            elif self.db_type == "mysql":
+                cursor.execute("""
+                    SELECT c.table_name, IF(t.table_type = 'VIEW', 'view', 'table'),
+                           c.column_name, c.column_type, c.is_nullable = 'YES', t.table_rows
+                    FROM information_schema.columns c
+                    JOIN information_schema.tables t
+                      ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+                    WHERE c.table_schema = %s
+                    ORDER BY c.table_name, c.ordinal_position
+                """, (self.db_name,))
+                columns = cursor.fetchall()
+                cursor.execute("""
+                    SELECT table_name, constraint_name, constraint_name = 'PRIMARY', column_name,
+                           referenced_table_name, referenced_column_name
+                    FROM information_schema.key_column_usage
+                    WHERE table_schema = %s
+                      AND (constraint_name = 'PRIMARY' OR referenced_table_name IS NOT NULL)
+                    ORDER BY table_name, constraint_name, ordinal_position
+                """, (self.db_name,))
+                keys = cursor.fetchall()
+                cursor.execute("""
+                    SELECT table_name, index_name, non_unique = 0, column_name
+                    FROM information_schema.statistics
+                    WHERE table_schema = %s
+                    ORDER BY table_name, index_name, seq_in_index
+                """, (self.db_name,))
+                indexes = cursor.fetchall()
+                # InnoDB's table_rows is an estimate, which is all the prompt needs
+                row_counts = {row[0]: row[5] for row in columns if row[1] == "table"}
+            elif self.db_type == "sqlite":
+                cursor.execute("""
+                    SELECT m.name, m.type, p.name, p.type, NOT p."notnull"
+                    FROM sqlite_master m
+                    JOIN pragma_table_info(m.name) p
+                    WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%'
+                    ORDER BY m.name, p.cid
+                """)
+                columns = cursor.fetchall()
+                cursor.execute("""
+                    SELECT m.name, 'PRIMARY', 1, p.name, NULL, NULL, p.pk
+                    FROM sqlite_master m
+                    JOIN pragma_table_info(m.name) p
+                    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%' AND p.pk > 0
+                    UNION ALL
+                    SELECT m.name, 'fk' || f.id, 0, f."from", f."table", f."to", f.seq
+                    FROM sqlite_master m
+                    JOIN pragma_foreign_key_list(m.name) f
+                    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+                    ORDER BY 1, 2, 7
+                """)
+                keys = cursor.fetchall()
+                cursor.execute("""
+                    SELECT m.name, il.name, il."unique", ii.name
+                    FROM sqlite_master m
+                    JOIN pragma_index_list(m.name) il
+                    JOIN pragma_index_info(il.name) ii
+                    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+                    ORDER BY m.name, il.name, ii.seqno
+                """)
+                indexes = cursor.fetchall()
+                # Row counts only exist after ANALYZE; the first number of a stat is the table's rows
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+                row_counts = {}
+                if cursor.fetchone():
+                    cursor.execute("SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl")
+                    row_counts = dict(cursor.fetchall())
+            else:
+                raise ValueError("Unsupported DB type for schema fetch")
 
-        for table, column in cursor.fetchall():
-            schema.setdefault(table, []).append(column)
+            cursor.close()
+        return build_schema(columns, keys, indexes, row_counts)
 
-        cursor.close()
-        return schema
+    def get_primary_key(self, table):
+        """Primary-key column names of ``table`` in key order ([] if it has none)."""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            if self.db_type == "postgresql":
+                cursor.execute("""
+                    SELECT a.attname
+                    FROM pg_index i
+                    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                    WHERE i.indrelid = %s::regclass AND i.indisprimary
+                    ORDER BY array_position(i.indkey::int2[], a.attnum)
+                """, (table,))
+            elif self.db_type == "mysql":
+                cursor.execute("""
+                    SELECT column_name
+                    FROM information_schema.key_column_usage
+                    WHERE table_schema = %s AND table_name = %s AND constraint_name = 'PRIMARY'
+                    ORDER BY ordinal_position
+                """, (self.db_name, table))
+            elif self.db_type == "sqlite":
+                cursor.execute("SELECT name FROM pragma_table_info(?) WHERE pk > 0 ORDER BY pk", (table,))
+            else:
+                raise ValueError(f"Unsupported DB type: {self.db_type}")
+            columns = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        return columns
+
+    def apply_edits(self, table, key_columns, edits):
+        """
+        Saves cell edits in one transaction. ``edits`` is a list of
+        (key_values, {column: (old_value, new_value)}).
+
+        Rows that edit the same set of columns are written by a single
+        statement (a VALUES list joined to the table), so thousands of edits
+        cost a handful of round trips. A row is only updated while its
+        edited columns still hold ``old_value``; if any row fails that check
+        the whole transaction is rolled back and EditConflict lists the keys.
+        Returns the number of rows updated.
+        """
+        groups = {}
+        for key, changes in edits:
+            columns = tuple(sorted(changes))
+            row = [_param_text(v) for v in key]
+            row += [_param_text(changes[c][0]) for c in columns]
+            row += [_param_text(changes[c][1]) for c in columns]
+            groups.setdefault(columns, []).append(tuple(row))
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                conflicts = []
+                for columns, rows in groups.items():
+                    if self.db_type == "postgresql":
+                        updated = self._update_rows_postgresql(cursor, table, key_columns, columns, rows)
+                    elif self.db_type == "mysql":
+                        updated = self._update_rows_mysql(cursor, table, key_columns, columns, rows)
+                    elif self.db_type == "sqlite":
+                        updated = self._update_rows_sqlite(cursor, table, key_columns, columns, rows)
+                    else:
+                        raise ValueError(f"Unsupported DB type: {self.db_type}")
+                    n_keys = len(key_columns)
+                    conflicts += [row[:n_keys] for row in rows if row[:n_keys] not in updated]
+                if conflicts:
+                    raise EditConflict(conflicts)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        logger.info(f"Saved {len(edits)} edited row(s) in {table} ({len(groups)} statement group(s))")
+        return len(edits)
+
+    def _update_rows_postgresql(self, cursor, table, key_columns, columns, rows):
+        """One UPDATE ... FROM (VALUES ...) RETURNING; returns the keys it updated."""
+        from psycopg2 import sql as pgsql
+        from psycopg2.extras import execute_values
+
+        cursor.execute("""
+            SELECT attname, format_type(atttypid, NULL)
+            FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        """, (table,))
+        types = dict(cursor.fetchall())
+
+        def cast(alias, column):
+            return pgsql.SQL("v.{}::{}").format(pgsql.Identifier(alias), pgsql.SQL(types[column]))
+
+        keys = [f"k{i}" for i in range(len(key_columns))]
+        olds = [f"o{i}" for i in range(len(columns))]
+        news = [f"n{i}" for i in range(len(columns))]
+        query = pgsql.SQL(
+            "UPDATE {table} AS t SET {assignments} FROM (VALUES %s) AS v ({aliases}) "
+            "WHERE {key_match} AND {unchanged} RETURNING {returned}"
+        ).format(
+            table=pgsql.Identifier(*table.split(".")),
+            assignments=pgsql.SQL(", ").join(
+                pgsql.SQL("{} = {}").format(pgsql.Identifier(c), cast(n, c)) for c, n in zip(columns, news)),
+            aliases=pgsql.SQL(", ").join(pgsql.Identifier(a) for a in keys + olds + news),
+            key_match=pgsql.SQL(" AND ").join(
+                pgsql.SQL("t.{} = {}").format(pgsql.Identifier(c), cast(k, c)) for c, k in zip(key_columns, keys)),
+            unchanged=pgsql.SQL(" AND ").join(
+                pgsql.SQL("t.{} IS NOT DISTINCT FROM {}").format(pgsql.Identifier(c), cast(o, c))
+                for c, o in zip(columns, olds)),
+            returned=pgsql.SQL(", ").join(pgsql.SQL("v.{}").format(pgsql.Identifier(k)) for k in keys),
+        )
+        # page_size = all rows: a single statement and a single round trip
+        returned = execute_values(cursor, query.as_string(cursor), rows,
+                                  page_size=len(rows), fetch=True)
+        return {tuple(row) for row in returned}
+
+    def _update_rows_mysql(self, cursor, table, key_columns, columns, rows):
+        """
+        MySQL has no UPDATE ... RETURNING: lock and check the rows with one
+        SELECT ... FOR UPDATE, then write them with one multi-table UPDATE.
+        """
+        def quote(name):
+            return "`" + name.replace("`", "``") + "`"
 
-    def execute_query(self, sql):
+        n_keys = len(key_columns)
+        keys = [f"k{i}" for i in range(n_keys)]
+        olds = [f"o{i}" for i in range(len(columns))]
+        news = [f"n{i}" for i in range(len(columns))]
+        width = n_keys + 2 * len(columns)
+        first = "SELECT " + ", ".join(f"%s AS {alias}" for alias in keys + olds + news)
+        rest = "SELECT " + ", ".join(["%s"] * width)
+        derived = " UNION ALL ".join([first] + [rest] * (len(rows) - 1))
+        params = [value for row in rows for value in row]
+        target = ".".join(quote(part) for part in table.split("."))
+        key_match = " AND ".join(f"t.{quote(c)} = v.{k}" for c, k in zip(key_columns, keys))
+
+        unchanged = " AND ".join(f"t.{quote(c)} <=> v.{o}" for c, o in zip(columns, olds))
+        cursor.execute(
+            f"SELECT {', '.join('v.' + k for k in keys)} FROM {target} AS t "
+            f"JOIN ({derived}) AS v ON {key_match} AND {unchanged} FOR UPDATE",
+            params,
+        )
+        matched = {tuple(row) for row in cursor.fetchall()}
+        if len(matched) < len(rows):
+            return matched
+
+        assignments = ", ".join(f"t.{quote(c)} = v.{n}" for c, n in zip(columns, news))
+        cursor.execute(f"UPDATE {target} AS t JOIN ({derived}) AS v ON {key_match} SET {assignments}", params)
+        return matched
+
+    def _update_rows_sqlite(self, cursor, table, key_columns, columns, rows):
+        """SQLite runs in-process, so one statement per row costs no round trips."""
+        def quote(name):
+            return '"' + name.replace('"', '""') + '"'
+
+        n_keys = len(key_columns)
+        query = (
+            f"UPDATE {quote(table)} SET {', '.join(f'{quote(c)} = ?' for c in columns)} "
+            f"WHERE {' AND '.join(f'{quote(c)} = ?' for c in key_columns)} "
+            f"AND {' AND '.join(f'{quote(c)} IS ?' for c in columns)}"
+        )
+        updated = set()
+        for row in rows:
+            key, olds, news = row[:n_keys], row[n_keys:n_keys + len(columns)], row[n_keys + len(columns):]
+            cursor.execute(query, news + key + olds)
+            if cursor.rowcount:
+                updated.add(key)
+        return updated
+
+    def execute_query(self, sql, timeout=QUERY_TIMEOUT_SECONDS):
         """
         Executes a SQL SELECT query and returns results as a Pandas DataFrame
         """
-        df = pd.read_sql(sql, self.conn)
+        with self.connection() as conn, self._statement_timeout(conn, timeout):
+            try:
+                df = pd.read_sql(sql, getattr(conn, "dbapi_connection", conn))
+            except Exception as e:
+                self._raise_if_timeout(e, timeout)
+                raise
         return df
 
+    def iter_rows(self, sql, chunk_size=FETCH_CHUNK_ROWS, timeout=QUERY_TIMEOUT_SECONDS, cancel_hook=None):
+        """
+        Executes a SQL SELECT query on a server-side cursor and yields
+        (columns, rows) tuples with at most ``chunk_size`` rows each, so the
+        full result set is never held in client memory.
+
+        The query is stopped after ``timeout`` seconds (QueryTimeout). The
+        server's statement timeout only covers one statement, and PostgreSQL
+        runs each chunk of a server-side cursor as a FETCH of its own, so a
+        client-side deadline from the first execute cancels it as a whole.
+        ``cancel_hook`` is called with a function that cancels the running
+        query from another thread, e.g. ``job.add_cancel_callback``.
+
+        The generator holds the connection until it is exhausted or closed;
+        consume it from a single thread.
+        """
+        with self.connection() as conn, self._statement_timeout(conn, timeout):
+            canceller = _StatementCanceller(self, conn)
+            if cancel_hook is not None:
+                cancel_hook(canceller.cancel)
+            cursor = self._server_side_cursor(conn, chunk_size)
+            exhausted = False
+            deadline = threading.Timer(timeout, canceller.expire) if timeout else None
+            try:
+                if deadline is not None:
+                    deadline.daemon = True
+                    deadline.start()
+                cursor.execute(sql)
+                columns = None
+                while True:
+                    if canceller.expired:
+                        # The deadline passed between fetches, with no statement running to cancel
+                        raise QueryTimeout(f"Query ran longer than {timeout}s and was stopped")
+                    rows = cursor.fetchmany(chunk_size)
+                    if columns is None and cursor.description:
+                        # Named psycopg2 cursors only describe after the first fetch
+                        columns = [desc[0] for desc in cursor.description]
+                    if not rows:
+                        exhausted = True
+                        break
+                    yield columns, rows
+            except QueryTimeout:
+                raise
+            except Exception as e:
+                if canceller.expired:
+                    raise QueryTimeout(f"Query ran longer than {timeout}s and was stopped") from e
+                if not canceller.cancelled:
+                    self._raise_if_timeout(e, timeout)
+                raise
+            finally:
+                if deadline is not None:
+                    deadline.cancel()
+                if self.db_type == "mysql" and not exhausted:
+                    # Stopped early: have the server stop sending rows instead of reading them all
+                    canceller.stop()
+                canceller.done()
+                self._close_server_side_cursor(conn, cursor, exhausted)
+
+    def count_rows(self, sql, timeout=QUERY_TIMEOUT_SECONDS, cancel_hook=None):
+        """
+        Number of rows ``sql`` returns, counted on the server with COUNT(*).
+        ``cancel_hook`` works as for iter_rows().
+        """
+        rows_iter = self.iter_rows(count_sql(sql), timeout=timeout, cancel_hook=cancel_hook)
+        try:
+            return sum(int(row[0]) for _, rows in rows_iter for row in rows)
+        finally:
+            rows_iter.close()
+
+    def explain(self, sql, timeout=GUARD_TIMEOUT_SECONDS):
+        """
+        The planner's Estimate for ``sql`` (see cost_guard.py), or None where
+        EXPLAIN gives no row estimates (SQLite). Raises like the query itself
+        would for unknown tables or columns, without running it.
+        """
+        if self.db_type == "sqlite":
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("EXPLAIN QUERY PLAN " + statement_text(sql))
+                    cursor.fetchall()
+                finally:
+                    cursor.close()
+            return None
+        prefix = "EXPLAIN (FORMAT JSON) " if self.db_type == "postgresql" else "EXPLAIN FORMAT=JSON "
+        with self.connection() as conn, self._statement_timeout(conn, timeout):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(prefix + statement_text(sql))
+                plan = cursor.fetchone()[0]
+            except Exception as e:
+                self._raise_if_timeout(e, timeout)
+                raise
+            finally:
+                cursor.close()
+        if isinstance(plan, (str, bytes, bytearray)):
+            plan = json.loads(plan)     # psycopg2 parses json columns itself, MySQL drivers don't
+        if self.db_type == "postgresql":
+            return postgres_estimate(plan)
+        return mysql_estimate(plan, top_level_limit(sql))
+
+    def iter_query(self, sql, chunk_size=FETCH_CHUNK_ROWS, **kwargs):
+        """
+        Same as iter_rows() but yields Pandas DataFrame chunks
+        """
+        for columns, rows in self.iter_rows(sql, chunk_size, **kwargs):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    @contextmanager
+    def _statement_timeout(self, conn, timeout):
+        """Server-side time limit for the statements run inside the block (0 = none)."""
+        if not timeout:
+            yield
+            return
+        if self.db_type == "sqlite":
+            # No server to enforce it: abort from the VM's progress callback once the deadline passes
+            deadline = time.monotonic() + timeout
+            conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+            try:
+                yield
+            finally:
+                conn.set_progress_handler(None, 0)
+            return
+        ms = int(timeout * 1000)
+        cursor = conn.cursor()
+        if self.db_type == "postgresql":
+            # LOCAL: reverts when the transaction ends, i.e. when the connection is handed back
+            cursor.execute("SET LOCAL statement_timeout = %s", (ms,))
+            cursor.close()
+            yield
+            return
+        try:
+            cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (ms,))
+        except Exception as e:
+            logger.warning(f"Server has no MAX_EXECUTION_TIME; running without a timeout: {e}")
+            cursor.close()
+            yield
+            return
+        cursor.close()
+        try:
+            yield
+        finally:
+            # Session settings outlive the statement on a pooled connection (unless it was discarded)
+            if not self._is_closed(conn):
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute("SET SESSION MAX_EXECUTION_TIME = 0")
+                    cursor.close()
+                except Exception as e:
+                    logger.warning(f"Could not reset MAX_EXECUTION_TIME: {e}")
+
+    def _raise_if_timeout(self, error, timeout):
+        if self.db_type == "postgresql":
+            from psycopg2.errors import QueryCanceled
+
+            timed_out = isinstance(error, QueryCanceled)
+        elif self.db_type == "sqlite":
+            timed_out = "interrupted" in str(error)
+        else:
+            timed_out = getattr(error, "errno", None) in _MYSQL_TIMEOUT_ERRNOS
+        if timed_out:
+            raise QueryTimeout(f"Query ran longer than {timeout}s and was stopped") from error
+
+    def _cancel_statement(self, raw_conn):
+        """Interrupt the statement running on ``raw_conn`` (called from another thread)."""
+        if self.db_type == "postgresql":
+            raw_conn.cancel()
+            return
+        if self.db_type == "sqlite":
+            raw_conn.interrupt()
+            return
+        # KILL QUERY has to come from a second connection; it leaves the first one usable
+        side = self._raw_connect()
+        try:
+            cursor = side.cursor()
+            cursor.execute(f"KILL QUERY {int(raw_conn.connection_id)}")
+            cursor.close()
+        finally:
+            side.close()
+        logger.info(f"Sent KILL QUERY for MySQL connection {raw_conn.connection_id}")
+
+    def _server_side_cursor(self, conn, chunk_size):
+        if self.db_type == "postgresql":
+            # A named cursor keeps the result set on the server
+            cursor = conn.cursor(name=f"nl2sql_{uuid.uuid4().hex}")
+            cursor.itersize = chunk_size
+            return cursor
+        if self.db_type == "mysql":
+            # Unbuffered: rows are read off the socket as they are fetched
+            return conn.cursor(buffered=False)
+        if self.db_type == "sqlite":
+            # SQLite cursors already step through the result lazily
+            return conn.cursor()
+        raise ValueError(f"Unsupported DB type: {self.db_type}")
+
+    def _close_server_side_cursor(self, conn, cursor, exhausted):
+        try:
+            if self.db_type == "mysql" and not exhausted:
+                # Closing the cursor would read the unread rows off the socket to free the
+                # connection; drop the connection instead, whatever is left of the result with it
+                self._discard_connection(conn)
+                return
+            cursor.close()
+        finally:
+            if self.db_type == "postgresql":
+                # Named cursors live inside a transaction; end it
+                conn.rollback()
+
+    @staticmethod
+    def _discard_connection(conn):
+        """Close ``conn`` for good rather than handing it back for the next query."""
+        if hasattr(conn, "invalidate"):
+            conn.invalidate()   # pooled: the pool opens a fresh connection in its place
+            return
+        try:
+            conn.close()        # the shared connection: connection() reopens it
+        except Exception as e:
+            logger.warning(f"Could not close interrupted connection: {e}")
+
     def close(self):
+        if self.pool is not None:
+            self.pool.dispose()
+            self.pool = None
         if self.conn:
             self.conn.close()
             self.conn = None
@@ -0,0 +1,68 @@
+# edit_buffer.py
+"""
+Pending inline edits for one result set.
+
+Edits are grouped per row and remember the value the row had when it was
+read, which DBConnector.apply_edits() uses as an optimistic-concurrency
+check when the buffer is flushed.
+"""
+
+
+class EditBuffer:
+    def __init__(self, table, key_columns):
+        self.table = table
+        self.key_columns = list(key_columns)
+        self._rows = {}     # result position -> {"key": tuple, "changes": {column: (original, new)}}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def cell_count(self):
+        return sum(len(row["changes"]) for row in self._rows.values())
+
+    def record(self, position, key, column, current, new):
+        """Note that ``column`` of the row at ``position`` now holds ``new``."""
+        row = self._rows.setdefault(position, {"key": tuple(key), "changes": {}})
+        original = row["changes"].get(column, (current, None))[0]
+        if str(new) == str(original):
+            # Edited back to what the database has: nothing to save for this cell
+            row["changes"].pop(column, None)
+            if not row["changes"]:
+                del self._rows[position]
+            return
+        row["changes"][column] = (original, new)
+
+    def is_dirty(self, position):
+        return position in self._rows
+
+    def originals(self):
+        """(position, column, original value) for every edited cell, to undo them on screen."""
+        for position, row in self._rows.items():
+            for column, (original, _) in row["changes"].items():
+                yield position, column, original
+
+    def edits(self):
+        """[(key_values, {column: (original, new)})] as DBConnector.apply_edits() expects."""
+        return [(row["key"], dict(row["changes"])) for row in self._rows.values()]
+
+    def mark_saved(self, saved):
+        """Forget edits that were written, keeping any made while the save was running."""
+        saved = {key: changes for key, changes in saved}
+        for position, row in list(self._rows.items()):
+            written = saved.get(row["key"])
+            if not written:
+                continue
+            for column, (_, new) in written.items():
+                if column not in row["changes"]:
+                    continue
+                latest = row["changes"][column][1]
+                if str(latest) == str(new):
+                    del row["changes"][column]
+                else:
+                    # Edited again meanwhile: the saved value is now the database's value
+                    row["changes"][column] = (new, latest)
+            if not row["changes"]:
+                del self._rows[position]
+
+    def clear(self):
+        self._rows.clear()
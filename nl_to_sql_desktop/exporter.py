@@ -0,0 +1,116 @@
+# exporter.py
+"""
+Incremental CSV / XLSX writers. Rows are written as they arrive, so an
+export runs in constant memory whatever the size of the result.
+"""
+import csv
+import datetime
+import math
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+# Hard limit of an Excel worksheet, header row included
+XLSX_MAX_ROWS = 1_048_576
+
+
+class CsvChunkWriter:
+    def __init__(self, file_path):
+        self._file = open(file_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._header_written = False
+
+    def write(self, columns, rows):
+        if not self._header_written:
+            self._writer.writerow(columns)
+            self._header_written = True
+        self._writer.writerows([_csv_value(v) for v in row] for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxChunkWriter:
+    """openpyxl write-only workbook: rows are streamed to disk, not kept as cells."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._workbook = Workbook(write_only=True)
+        self._sheet = None
+        self._sheet_rows = 0
+        self._columns = None
+
+    def _new_sheet(self):
+        number = len(self._workbook.worksheets) + 1
+        self._sheet = self._workbook.create_sheet(title="Sheet1" if number == 1 else f"Sheet{number}")
+        self._sheet.append(self._columns)
+        self._sheet_rows = 1
+
+    def write(self, columns, rows):
+        if self._columns is None:
+            self._columns = list(columns)
+            self._new_sheet()
+        for row in rows:
+            if self._sheet_rows >= XLSX_MAX_ROWS:
+                # Spill onto another sheet instead of producing a corrupt file
+                self._new_sheet()
+            self._sheet.append([_excel_value(v) for v in row])
+            self._sheet_rows += 1
+
+    def close(self):
+        if self._sheet is None:
+            self._workbook.create_sheet(title="Sheet1")
+        self._workbook.save(self.file_path)
+
+
+WRITERS = {"csv": CsvChunkWriter, "excel": XlsxChunkWriter}
+
+
+def _is_missing(value):
+    return value is None or value is pd.NaT or value is pd.NA or (isinstance(value, float) and math.isnan(value))
+
+
+def _csv_value(value):
+    return "" if _is_missing(value) else value
+
+
+def _excel_value(value):
+    if _is_missing(value):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()    # numpy scalar -> Python scalar
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        # Excel has no time zones; openpyxl rejects aware datetimes
+        value = value.replace(tzinfo=None)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        value = bytes(value).hex()
+    return value
+
+
+def frame_rows(chunks):
+    """Adapt an iterable of DataFrames to (columns, rows) pairs."""
+    for chunk in chunks:
+        yield list(chunk.columns), chunk.itertuples(index=False, name=None)
+
+
+def export_rows(row_chunks, file_path, format_type, progress=None, cancelled=None):
+    """
+    Write (columns, rows) chunks to ``file_path``. ``progress(rows_written)`` is
+    called after each chunk; ``cancelled()`` is polled between chunks.
+    Returns the number of data rows written.
+    """
+    writer = WRITERS[format_type](file_path)
+    written = 0
+    try:
+        for columns, rows in row_chunks:
+            if cancelled is not None and cancelled():
+                break
+            rows = list(rows)
+            writer.write(columns, rows)
+            written += len(rows)
+            if progress is not None:
+                progress(written)
+    finally:
+        writer.close()
+    return written
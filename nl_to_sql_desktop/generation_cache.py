@@ -0,0 +1,109 @@
+# generation_cache.py
+"""
+Memoizes NL -> SQL generations.
+
+The key is the normalized question plus a hash of the exact schema text and
+model that were sent, so a schema change or a different prompt context never
+returns stale SQL. Entries live in an in-memory LRU and, optionally, in a
+SQLite file so they survive restarts; both hold at most max_entries.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import CACHE_DIR, GENERATION_CACHE_PERSIST, GENERATION_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+# A quoted literal ('Smith', "NY"); the apostrophe in "customer's" does not open one
+_QUOTED = re.compile(r"""((?<!\w)(?:'[^']*'|"[^"]*")(?!\w))""")
+
+
+def normalize_question(text):
+    """
+    '  Top 10 customers   by revenue?' -> 'top 10 customers by revenue'.
+    Quoted literals keep their case: 'Smith' and 'SMITH' can select different rows.
+    """
+    parts = _QUOTED.split(text.strip())
+    # split() puts the quoted literals at the odd positions
+    parts[::2] = [re.sub(r"\s+", " ", part.lower()) for part in parts[::2]]
+    return "".join(parts).rstrip(" ?.!;")
+
+
+class GenerationCache:
+    def __init__(self, max_entries=GENERATION_CACHE_SIZE,
+                 db_path=os.path.join(CACHE_DIR, "generations.sqlite3") if GENERATION_CACHE_PERSIST else None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("""
+                    CREATE TABLE IF NOT EXISTS generations (
+                        key TEXT PRIMARY KEY,
+                        sql TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Generation cache is memory-only: {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(question, schema_text, model):
+        schema_hash = hashlib.sha256(schema_text.encode("utf-8")).hexdigest()
+        raw = "\0".join([model, schema_hash, normalize_question(question)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT sql FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key, sql):
+        with self._lock:
+            self._remember(key, sql)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO generations (key, sql, created_at) VALUES (?, ?, ?)",
+                    (key, sql, time.time()),
+                )
+                # Keep the file as small as the memory tier: drop the oldest beyond max_entries
+                self._db.execute("""
+                    DELETE FROM generations WHERE key NOT IN (
+                        SELECT key FROM generations ORDER BY created_at DESC, rowid DESC LIMIT ?
+                    )
+                """, (self.max_entries,))
+                self._db.commit()
+
+    def _remember(self, key, sql):
+        self._memory[key] = sql
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM generations")
+                self._db.commit()
@@ -0,0 +1,181 @@
+# job_executor.py
+"""
+Background job executor for the Tk UI.
+
+Jobs run on a thread pool; everything they want to tell the UI (progress,
+result, error) goes through a queue that is drained on the Tk main thread
+with ``after()``, so callbacks can touch widgets safely.
+"""
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import JOB_POLL_MS, JOB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job has been cancelled."""
+
+
+class Job:
+    """Handle shared between the worker thread and the UI."""
+
+    def __init__(self, job_id, name, executor):
+        self.id = job_id
+        self.name = name
+        self.message = name
+        self._executor = executor
+        self._cancel_event = threading.Event()
+        self._cancel_callbacks = []
+        self._lock = threading.Lock()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Request cancellation and run any registered cancel callbacks."""
+        with self._lock:
+            if self._cancel_event.is_set():
+                return
+            self._cancel_event.set()
+            callbacks = list(self._cancel_callbacks)
+        logger.info(f"Cancelling job #{self.id} ({self.name})")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception(f"Cancel callback failed for job #{self.id}")
+
+    def add_cancel_callback(self, callback):
+        """Run ``callback`` on cancel (immediately if already cancelled)."""
+        with self._lock:
+            if not self._cancel_event.is_set():
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(self.name)
+
+    def report(self, payload=None, message=None):
+        """
+        Send progress to the UI thread (called from the worker). ``payload``
+        goes to on_progress; ``message`` only updates the job's status text.
+        """
+        if message is not None:
+            self.message = message
+        if self._executor is not None:   # a job run directly (scripts, benchmarks) has no UI to tell
+            self._executor._events.put(("progress", self, payload))
+
+
+class JobExecutor:
+    """Thread pool whose results are delivered back on the Tk main loop."""
+
+    def __init__(self, widget, max_workers=JOB_WORKERS, poll_ms=JOB_POLL_MS, on_change=None):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.on_change = on_change
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nl2sql-job")
+        self._events = queue.Queue()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._poll_scheduled = False
+        self._closed = False
+
+    def submit(self, name, fn, *args, on_done=None, on_error=None, on_progress=None,
+               on_cancel=None, **kwargs):
+        """
+        Run ``fn(job, *args, **kwargs)`` in the pool.
+
+        ``on_done(result)``, ``on_error(exc)``, ``on_progress(payload)`` and
+        ``on_cancel()`` are always invoked on the Tk main thread.
+        """
+        if self._closed:
+            raise RuntimeError("Job executor has been shut down")
+        job = Job(next(self._ids), name, self)
+        self._jobs[job.id] = (job, on_done, on_error, on_progress, on_cancel)
+        job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        logger.debug(f"Submitted job #{job.id} ({name})")
+        self._notify()
+        self._schedule_poll()
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            job.check_cancelled()
+            result = fn(job, *args, **kwargs)
+            job.check_cancelled()
+            self._events.put(("done", job, result))
+        except JobCancelled:
+            self._events.put(("cancelled", job, None))
+        except Exception as e:
+            if job.cancelled:
+                # Errors caused by tearing down a cancelled call are expected
+                self._events.put(("cancelled", job, None))
+            else:
+                logger.exception(f"Job #{job.id} ({job.name}) failed")
+                self._events.put(("error", job, e))
+
+    def _schedule_poll(self):
+        if not self._poll_scheduled and not self._closed:
+            self._poll_scheduled = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_scheduled = False
+        while True:
+            try:
+                kind, job, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self._dispatch(kind, job, payload)
+        if self._jobs:
+            self._schedule_poll()
+
+    def _dispatch(self, kind, job, payload):
+        entry = self._jobs.get(job.id)
+        if entry is None:
+            return
+        _, on_done, on_error, on_progress, on_cancel = entry
+        if kind == "progress":
+            # Message-only reports just refresh the status via _notify()
+            callback, args = (on_progress if payload is not None else None), (payload,)
+        else:
+            del self._jobs[job.id]
+            logger.debug(f"Job #{job.id} ({job.name}) finished: {kind}")
+            callback, args = {
+                "done": (on_done, (payload,)),
+                "error": (on_error, (payload,)),
+                "cancelled": (on_cancel, ()),
+            }[kind]
+        try:
+            if callback is not None and (kind == "progress" or not self._closed):
+                callback(*args)
+        except Exception:
+            logger.exception(f"UI callback for job #{job.id} failed")
+        self._notify()
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change(self.running())
+
+    def running(self):
+        """Jobs that have been submitted and not yet delivered."""
+        return [entry[0] for entry in self._jobs.values()]
+
+    def cancel_all(self):
+        for job in self.running():
+            job.cancel()
+
+    def shutdown(self):
+        """Cancel everything and stop accepting work (does not block)."""
+        self.cancel_all()
+        self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
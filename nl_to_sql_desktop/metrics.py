@@ -0,0 +1,134 @@
+# metrics.py
+"""
+Per-stage timing for one user-visible operation (generate, query, export).
+
+Worker code records stages either sequentially with lap() or around a block
+with stage(); the UI thread adds its own stages (rendering) to the same
+object. When the operation ends, summary() gives the one-line breakdown for
+the status bar and emit() appends a JSON record to METRICS_FILE so runs can
+be aggregated offline. Once the file passes METRICS_MAX_MB it is moved to
+METRICS_FILE.1 and a new one is started, so at most twice that is kept.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICS_FILE, METRICS_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+_write_lock = threading.Lock()
+
+
+class Metrics:
+    def __init__(self, operation, **fields):
+        self.operation = operation
+        self.fields = fields
+        self.stages = {}        # stage name -> seconds, in first-seen order
+        self.counters = {}
+        self.status = None
+        self.elapsed = None
+        self._started = self._last = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def lap(self, name):
+        """Charge the time since the previous lap (or the start) to ``name``."""
+        now = time.perf_counter()
+        with self._lock:
+            seconds, self._last = now - self._last, now
+        self.add(name, seconds)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def timed(self, iterable, name, first=None):
+        """Yield from ``iterable``, charging the wait for each item to ``name``
+        (the wait for the first item to ``first`` when given)."""
+        iterator = iter(iterable)
+        stage = first or name
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - started)
+                return
+            self.add(stage, time.perf_counter() - started)
+            stage = name
+            yield item
+
+    def remainder(self, name):
+        """Charge whatever time no stage has accounted for yet to ``name``."""
+        with self._lock:
+            seconds = time.perf_counter() - self._started - sum(self.stages.values())
+        self.add(name, max(0.0, seconds))
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self, status="ok"):
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self._started
+            self.status = status
+        return self
+
+    def summary(self):
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self._started
+        stages = " · ".join(f"{name} {seconds:.2f}s" for name, seconds in self.stages.items())
+        text = f"⏱ {self.operation} {elapsed:.2f}s"
+        if stages:
+            text += f" ({stages})"
+        rows = self.counters.get("rows")
+        if rows:
+            text += f" · {rows:,} rows ({rows / max(elapsed, 1e-9):,.0f}/s)"
+        tokens = self.counters.get("tokens")
+        if tokens and self.stages.get("generate"):
+            text += f" · {tokens:,} tokens ({tokens / self.stages['generate']:.0f}/s)"
+        if self.counters.get("bytes"):
+            text += f" · {self.counters['bytes'] / (1024 * 1024):,.1f} MB"
+            if self.counters.get("compact_bytes"):
+                text += f" → {self.counters['compact_bytes'] / (1024 * 1024):,.1f} MB compacted"
+            if self.counters.get("spill_bytes"):
+                text += f" → {self.counters['spill_bytes'] / (1024 * 1024):,.1f} MB on disk"
+        return text
+
+    def record(self):
+        return {
+            "time": time.time(),
+            "operation": self.operation,
+            "status": self.status,
+            "total_seconds": round(self.elapsed, 6) if self.elapsed is not None else None,
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            **self.fields,
+        }
+
+    def emit(self, path=METRICS_FILE, max_bytes=METRICS_MAX_MB * 1024 * 1024):
+        """Log the summary and append the JSON record to ``path``."""
+        self.finish()
+        logger.info(self.summary())
+        if not path:
+            return
+        line = json.dumps(self.record(), default=str)
+        try:
+            with _write_lock:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                if max_bytes and os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+                    os.replace(path, path + ".1")
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write metrics record: {e}")
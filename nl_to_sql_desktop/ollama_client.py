@@ -0,0 +1,103 @@
+# ollama_client.py
+"""
+Thin Ollama HTTP client with a pooled keep-alive session and a cached
+health state, so a generation costs one request on a warm connection.
+"""
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (OLLAMA_CONNECT_TIMEOUT, OLLAMA_HEALTH_TTL, OLLAMA_KEEP_ALIVE, OLLAMA_MODEL,
+                    OLLAMA_POOL_SIZE, OLLAMA_READ_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaClient:
+    def __init__(self, base_url, model=OLLAMA_MODEL, keep_alive=OLLAMA_KEEP_ALIVE,
+                 connect_timeout=OLLAMA_CONNECT_TIMEOUT, read_timeout=OLLAMA_READ_TIMEOUT,
+                 health_ttl=OLLAMA_HEALTH_TTL, pool_size=OLLAMA_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.health_ttl = health_ttl
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._healthy = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor = None
+
+    # ───── Health ─────
+    def check_health(self):
+        """GET /api/tags now and cache the answer."""
+        try:
+            r = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout[0])
+            healthy = r.status_code == 200
+            if not healthy:
+                logger.error(f"❌ Ollama connection failed: HTTP {r.status_code}")
+        except requests.RequestException as e:
+            logger.error(f"❌ Ollama connection error: {e}")
+            healthy = False
+        self._set_health(healthy)
+        return healthy
+
+    def _set_health(self, healthy):
+        with self._lock:
+            if healthy and self._healthy is not True:
+                logger.info("✅ Ollama server is reachable.")
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+
+    def is_healthy(self):
+        """
+        Cached health. A recent "healthy" answer is trusted; an unknown, stale
+        or unhealthy state is re-checked right away (a refused connection
+        fails fast, and the user may just have started Ollama).
+        """
+        with self._lock:
+            fresh = time.monotonic() - self._checked_at < self.health_ttl
+            if self._healthy and fresh:
+                return True
+        return self.check_health()
+
+    def start_health_monitor(self):
+        """Refresh the health state every ``health_ttl`` seconds in the background."""
+        if self._monitor is not None:
+            return
+
+        def run():
+            self.check_health()
+            while not self._stop.wait(self.health_ttl):
+                self.check_health()
+
+        self._monitor = threading.Thread(target=run, name="ollama-health", daemon=True)
+        self._monitor.start()
+
+    # ───── Generation ─────
+    def generate(self, prompt, stream=True, options=None):
+        """POST /api/generate on the pooled session. Returns the (streaming) response."""
+        payload = {"model": self.model, "prompt": prompt, "stream": stream, "keep_alive": self.keep_alive}
+        if options:
+            payload["options"] = options
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                         timeout=self.timeout, stream=stream)
+        except requests.ConnectionError:
+            self._set_health(False)
+            raise
+        self._set_health(True)
+        return response
+
+    def close(self):
+        self._stop.set()
+        self.session.close()
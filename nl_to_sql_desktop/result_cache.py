@@ -0,0 +1,206 @@
+# result_cache.py
+"""
+Two-tier cache of query results, keyed by the normalized SQL plus the
+identity of the connection (database and user) it ran against.
+
+Results live in memory as ResultStore objects, bounded by a byte budget.
+When that budget is exceeded the least recently used results are spilled to
+Parquet files under CACHE_DIR/results (bounded by a second budget) instead
+of being dropped, and read back chunk by chunk on a hit. Every entry expires
+RESULT_CACHE_TTL_SECONDS after it was stored. Spilled files only live for
+the session: they are wiped on start-up and by clear().
+"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import sqlparse
+
+from config import (CACHE_DIR, FETCH_CHUNK_ROWS, RESULT_CACHE_DISK_MB, RESULT_CACHE_MEMORY_MB,
+                    RESULT_CACHE_TTL_SECONDS)
+from result_store import ResultStore
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def normalize_sql(sql):
+    """Comments, keyword case, whitespace and a trailing ';' don't change the result."""
+    sql = sqlparse.format(sql, strip_comments=True, keyword_case="upper")
+    return " ".join(sql.split()).rstrip("; ")
+
+
+class _Entry:
+    def __init__(self, nbytes, expires_at, store=None, path=None):
+        self.nbytes = nbytes
+        self.expires_at = expires_at
+        self.store = store      # memory tier
+        self.path = path        # disk tier
+
+
+class ResultCache:
+    def __init__(self, memory_bytes=RESULT_CACHE_MEMORY_MB * MB, disk_bytes=RESULT_CACHE_DISK_MB * MB,
+                 ttl=RESULT_CACHE_TTL_SECONDS, spill_dir=os.path.join(CACHE_DIR, "results")):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "spills": 0, "evictions": 0}
+        self._remove_spill_dir()
+
+    @staticmethod
+    def make_key(sql, identity):
+        raw = "\0".join([str(part) for part in identity] + [normalize_sql(sql)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """The cached ResultStore for ``key``, or None."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._memory.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry.store
+            entry = self._disk.get(key)
+            if entry is not None and entry.expires_at > now:
+                store = self._read_spill(entry.path)
+                self._drop_disk(key)
+                if store is not None:
+                    # Promote: a result that is asked for again is likely to be asked for a third time
+                    self._remember(key, _Entry(entry.nbytes, entry.expires_at, store=store))
+                    self.stats["disk_hits"] += 1
+                    return store
+            self._expire(now)
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, store):
+        """Cache a complete result. Results larger than the whole memory budget are skipped."""
+        nbytes = store.nbytes()
+        if nbytes > self.memory_bytes:
+            logger.info(f"Result of {nbytes / MB:.1f} MB is too large to cache")
+            return False
+        with self._lock:
+            self._drop_memory(key)
+            self._drop_disk(key)
+            self._remember(key, _Entry(nbytes, time.monotonic() + self.ttl, store=store))
+        return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._drop_memory(key)
+            self._drop_disk(key)
+
+    def summary(self):
+        s = self.stats
+        return (f"Result cache: {s['memory_hits']} memory / {s['disk_hits']} disk hits, "
+                f"{s['misses']} misses, {self._memory_used / MB:.0f} MB in memory, "
+                f"{self._disk_used / MB:.0f} MB on disk")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._disk.clear()
+            self._memory_used = self._disk_used = 0
+            self._remove_spill_dir()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory_used += entry.nbytes
+        while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+            old_key, old = self._memory.popitem(last=False)
+            self._memory_used -= old.nbytes
+            self._spill(old_key, old)
+
+    def _drop_memory(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_used -= entry.nbytes
+
+    def _drop_disk(self, key):
+        entry = self._disk.pop(key, None)
+        if entry is None:
+            return
+        self._disk_used -= os.path.getsize(entry.path) if os.path.exists(entry.path) else 0
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+    def _expire(self, now):
+        for key in [k for k, e in self._memory.items() if e.expires_at <= now]:
+            self._drop_memory(key)
+        for key in [k for k, e in self._disk.items() if e.expires_at <= now]:
+            self._drop_disk(key)
+
+    def _spill(self, key, entry):
+        """Move an evicted result to disk; drop it if it can't be written or doesn't fit."""
+        if self.disk_bytes <= 0 or entry.expires_at <= time.monotonic():
+            self.stats["evictions"] += 1
+            return
+        path = os.path.join(self.spill_dir, f"{key}.parquet")
+        try:
+            self._write_spill(entry.store, path)
+        except Exception as e:
+            logger.warning(f"Could not spill cached result to disk: {e}")
+            if os.path.exists(path):
+                os.remove(path)
+            self.stats["evictions"] += 1
+            return
+        size = os.path.getsize(path)
+        self._disk[key] = _Entry(entry.nbytes, entry.expires_at, path=path)
+        self._disk_used += size
+        self.stats["spills"] += 1
+        while self._disk_used > self.disk_bytes and self._disk:
+            self._drop_disk(next(iter(self._disk)))
+            self.stats["evictions"] += 1
+
+    def _write_spill(self, store, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        writer = None
+        try:
+            for chunk in store.iter_chunks():
+                table = pa.Table.from_pandas(chunk, preserve_index=False,
+                                             schema=writer.schema if writer else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            if writer is None:
+                # Empty result: still remember the column names
+                table = pa.Table.from_pandas(store.to_frame(), preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _read_spill(self, path):
+        try:
+            import pyarrow.parquet as pq
+
+            parquet = pq.ParquetFile(path)
+            store = ResultStore(parquet.schema_arrow.names)
+            for batch in parquet.iter_batches(batch_size=FETCH_CHUNK_ROWS):
+                store.append(batch.to_pandas())
+            return store
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable spilled result {path}: {e}")
+            return None
+
+    def _remove_spill_dir(self):
+        if os.path.isdir(self.spill_dir):
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
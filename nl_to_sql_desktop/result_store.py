@@ -0,0 +1,128 @@
+# result_store.py
+"""
+Holds a query result as the list of DataFrame chunks it was fetched in,
+addressable by absolute row position. Nothing is ever concatenated into
+one big frame unless the caller asks for it.
+"""
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+
+class ResultStore:
+    def __init__(self, columns=None):
+        self.columns = list(columns) if columns is not None else []
+        self.chunks = []
+        self._starts = []   # absolute row position of each chunk's first row
+        self._rows = 0
+
+    @classmethod
+    def from_frame(cls, df):
+        store = cls(df.columns)
+        store.append(df)
+        return store
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, chunk):
+        if not self.columns:
+            self.columns = list(chunk.columns)
+        if chunk.empty:
+            return
+        index = chunk.index
+        if not (isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1):
+            chunk = chunk.reset_index(drop=True)
+        self.chunks.append(chunk)
+        self._starts.append(self._rows)
+        self._rows += len(chunk)
+
+    def _locate(self, position):
+        """(chunk index, row inside that chunk) for an absolute position."""
+        if not 0 <= position < self._rows:
+            raise IndexError(position)
+        i = bisect_right(self._starts, position) - 1
+        return i, position - self._starts[i]
+
+    def slice(self, start, stop):
+        """Rows [start, stop) as a DataFrame, touching only the chunks involved."""
+        start, stop = max(start, 0), min(stop, self._rows)
+        if start >= stop:
+            return pd.DataFrame(columns=self.columns)
+        first, _ = self._locate(start)
+        last, _ = self._locate(stop - 1)
+        parts = []
+        for i in range(first, last + 1):
+            lo = max(start - self._starts[i], 0)
+            hi = min(stop - self._starts[i], len(self.chunks[i]))
+            parts.append(self.chunks[i].iloc[lo:hi])
+        return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+
+    def rows(self, start, stop):
+        """Rows [start, stop) as plain tuples, ready for a Treeview."""
+        return list(self.slice(start, stop).itertuples(index=False, name=None))
+
+    def take(self, positions):
+        """Rows at arbitrary absolute ``positions`` as plain tuples, in the order given."""
+        positions = np.asarray(positions, dtype=np.int64)
+        rows = [None] * len(positions)
+        if not len(positions):
+            return rows
+        owners = np.searchsorted(self._starts, positions, side="right") - 1
+        for i in np.unique(owners):
+            slots = np.flatnonzero(owners == i)
+            part = self.chunks[i].iloc[positions[slots] - self._starts[i]]
+            for slot, row in zip(slots, part.itertuples(index=False, name=None)):
+                rows[slot] = row
+        return rows
+
+    def column(self, index):
+        """The ``index``-th column over all chunks as one Series (names may repeat, positions don't)."""
+        if not self.chunks:
+            return pd.Series([], dtype=object)
+        return pd.concat([chunk.iloc[:, index] for chunk in self.chunks], ignore_index=True)
+
+    def value(self, position, column):
+        i, row = self._locate(position)
+        return self.chunks[i].at[row, column]
+
+    def set_value(self, position, column, value):
+        i, row = self._locate(position)
+        chunk = self.chunks[i]
+        if chunk[column].dtype != object:
+            chunk[column] = chunk[column].astype(object)
+        chunk.at[row, column] = value
+
+    def replace_chunks(self, chunks):
+        """Swap in other chunks holding the same rows (e.g. a compacted copy)."""
+        chunks = list(chunks)
+        if sum(len(chunk) for chunk in chunks) != self._rows:
+            raise ValueError("Replacement chunks hold a different number of rows")
+        self.chunks, self._starts, self._rows = [], [], 0
+        for chunk in chunks:
+            self.append(chunk)
+
+    def iter_chunks(self):
+        yield from self.chunks
+
+    def nbytes(self):
+        """Approximate memory held by the chunks (strings included)."""
+        total, seen = 0, set()
+        for chunk in self.chunks:
+            for _, column in chunk.items():
+                if isinstance(column.dtype, pd.CategoricalDtype):
+                    # Compacted chunks share one set of categories; count it once
+                    total += column.cat.codes.nbytes
+                    categories = column.cat.categories
+                    if id(categories) not in seen:
+                        seen.add(id(categories))
+                        total += categories.memory_usage(deep=True)
+                else:
+                    total += column.memory_usage(index=False, deep=True)
+        return int(total)
+
+    def to_frame(self):
+        if not self.chunks:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(self.chunks, ignore_index=True)
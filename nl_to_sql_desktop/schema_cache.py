@@ -0,0 +1,100 @@
+# schema_cache.py
+"""
+Two-tier schema cache keyed by (db_type, host, port, db_name).
+
+The memory tier answers repeat lookups; the disk tier survives restarts.
+An entry is reused for as long as DBConnector.get_schema_version() (a cheap
+catalog fingerprint) still matches the one stored with it, and the
+fingerprint itself is re-checked at most every SCHEMA_CHECK_SECONDS.
+Approximate row counts are whatever they were when the schema was read; a
+refresh re-reads them.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from config import CACHE_DIR, SCHEMA_CHECK_SECONDS
+from schema_model import Schema
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the stored schema's shape changes, so older files read as misses
+SCHEMA_FORMAT = 2
+
+
+class SchemaCache:
+    def __init__(self, cache_dir=os.path.join(CACHE_DIR, "schema"), check_interval=SCHEMA_CHECK_SECONDS):
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_connector, refresh=False):
+        """Returns the schema_model.Schema, fetching it only when it changed."""
+        key = self._key(db_connector.identity)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and not refresh and time.monotonic() - entry["checked"] < self.check_interval:
+                return entry["schema"]
+
+            version = db_connector.get_schema_version()
+            if entry is None:
+                entry = self._load(key)
+            if entry and not refresh and entry["version"] == version:
+                logger.info(f"Schema cache hit for {db_connector.identity}")
+            else:
+                logger.info(f"Schema cache miss for {db_connector.identity}; reading catalog")
+                entry = {
+                    "format": SCHEMA_FORMAT,
+                    "identity": list(db_connector.identity),
+                    "version": version,
+                    "schema": db_connector.get_schema(),
+                }
+                self._save(key, entry)
+            entry["checked"] = time.monotonic()
+            self._memory[key] = entry
+            return entry["schema"]
+
+    def invalidate(self, db_connector):
+        key = self._key(db_connector.identity)
+        with self._lock:
+            self._memory.pop(key, None)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _key(identity):
+        return hashlib.sha1(json.dumps(list(identity)).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("format") != SCHEMA_FORMAT:
+                return None
+            entry["schema"] = Schema.from_dict(entry["schema"])
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable schema cache file: {e}")
+            return None
+
+    def _save(self, key, entry):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({k: v.to_dict() if k == "schema" else v
+                           for k, v in entry.items() if k != "checked"}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write schema cache: {e}")
@@ -0,0 +1,193 @@
+# schema_index.py
+"""
+Local lexical index over table/column names, used to send the LLM only the
+part of the schema that is relevant to the question.
+
+Tables are ranked with BM25 over identifier words (``customer_orders`` ->
+``customer``, ``order``); question words that match nothing exactly are
+mapped to schema words by trigram similarity, so typos and partial words
+still hit. The top-k tables plus their foreign-key neighbours are packed
+into a token budget.
+
+Each table goes into the prompt with its column types, keys, indexes and
+approximate row count (schema_model.Table.describe()), so the model can
+filter and join on indexed columns and knows which tables are large.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+TABLE_NAME_WEIGHT = 3       # a word in the table name counts as 3 column mentions
+TRIGRAM_MIN_SIMILARITY = 0.5
+
+_WORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "each", "for", "from", "get", "give",
+    "how", "i", "in", "is", "it", "list", "many", "me", "much", "of", "on", "or", "per",
+    "show", "the", "their", "them", "to", "what", "which", "who", "with", "all", "find",
+}
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English/SQL identifiers)."""
+    return max(1, len(text) // 4)
+
+
+def _stem(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def split_identifier(text):
+    """'CustomerOrders' / 'customer_orders' -> ['customer', 'order']"""
+    return [_stem(w.lower()) for w in _WORD_RE.findall(text or "")]
+
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def format_schema(schema, tables=None):
+    tables = list(schema) if tables is None else tables
+    return "\n".join(schema.tables[table].describe() for table in tables)
+
+
+class SchemaIndex:
+    def __init__(self, schema, comments=None, foreign_keys=None):
+        """
+        schema: a schema_model.Schema; comments: optional {table: text};
+        foreign_keys: optional {table: {referenced tables}}, by default the
+        declared ones. Without any, ``<name>_id`` columns are matched to a
+        table called ``<name>(s)``.
+        """
+        self.schema = schema
+        self._columns = schema.column_names()
+        self._docs = {}
+        for table, columns in self._columns.items():
+            words = split_identifier(table) * TABLE_NAME_WEIGHT
+            for col in columns:
+                words += split_identifier(col)
+            if comments and comments.get(table):
+                words += split_identifier(comments[table])
+            self._docs[table] = Counter(words)
+
+        self._avg_len = sum(sum(c.values()) for c in self._docs.values()) / max(1, len(self._docs))
+        doc_freq = Counter(word for counts in self._docs.values() for word in counts)
+        n = len(self._docs)
+        self._idf = {w: math.log((n - df + 0.5) / (df + 0.5) + 1) for w, df in doc_freq.items()}
+
+        self._trigram_index = defaultdict(set)
+        for word in self._idf:
+            for gram in _trigrams(word):
+                self._trigram_index[gram].add(word)
+
+        self._neighbours = self._build_neighbours(foreign_keys or schema.references() or None)
+
+    def _build_neighbours(self, foreign_keys):
+        neighbours = defaultdict(set)
+        if foreign_keys is None:
+            by_name = {t.lower(): t for t in self.schema}
+            foreign_keys = defaultdict(set)
+            for table, columns in self._columns.items():
+                for col in columns:
+                    base = col.lower()
+                    if not base.endswith("_id") or base == "id":
+                        continue
+                    base = base[:-3]
+                    for candidate in (base, base + "s", base + "es", base[:-1] + "ies"):
+                        if candidate in by_name and by_name[candidate] != table:
+                            foreign_keys[table].add(by_name[candidate])
+                            break
+        for table, referenced in foreign_keys.items():
+            for other in referenced:
+                if other in self.schema and other != table:
+                    neighbours[table].add(other)
+                    neighbours[other].add(table)
+        return neighbours
+
+    def _query_words(self, question):
+        words = []
+        for word in split_identifier(question):
+            if word in _STOP_WORDS or word.isdigit():
+                # Numbers in questions are values ("top 10"), not identifiers
+                continue
+            if word in self._idf:
+                words.append(word)
+                continue
+            # No exact hit: borrow the closest schema words by trigram overlap
+            grams = _trigrams(word)
+            candidates = Counter(w for g in grams for w in self._trigram_index.get(g, ()))
+            for candidate, shared in candidates.items():
+                similarity = shared / len(grams | _trigrams(candidate))
+                if similarity >= TRIGRAM_MIN_SIMILARITY:
+                    words.append(candidate)
+        return words
+
+    def rank(self, question):
+        """[(table, score)] for tables with a positive BM25 score, best first."""
+        words = self._query_words(question)
+        scores = {}
+        for table, counts in self._docs.items():
+            length = sum(counts.values())
+            score = 0.0
+            for word in words:
+                tf = counts.get(word)
+                if tf:
+                    norm = K1 * (1 - B + B * length / self._avg_len)
+                    score += self._idf[word] * tf * (K1 + 1) / (tf + norm)
+            if score > 0:
+                scores[table] = score
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def select_tables(self, question, top_k, token_budget):
+        """
+        Top-k tables for ``question`` followed by their foreign-key neighbours,
+        in that priority order, as long as they fit in ``token_budget``.
+        """
+        ranked = [table for table, _ in self.rank(question)[:top_k]]
+        candidates = list(ranked)
+        for table in ranked:
+            candidates += sorted(n for n in self._neighbours.get(table, ()) if n not in candidates)
+        return self._pack(candidates, token_budget)
+
+    def _pack(self, candidates, token_budget):
+        selected, used = [], 0
+        for table in candidates:
+            cost = estimate_tokens(format_schema(self.schema, [table])) + 1
+            if used + cost > token_budget:
+                continue
+            selected.append(table)
+            used += cost
+        return selected
+
+    def prompt_schema(self, question, top_k, token_budget):
+        """
+        Returns (schema_text, stats). The whole schema is sent when it already
+        fits in the budget; if nothing matches the question, tables are taken
+        in catalog order until the budget is used up.
+        """
+        full_text = format_schema(self.schema)
+        full_tokens = estimate_tokens(full_text)
+        if full_tokens <= token_budget:
+            tables, matched = list(self.schema), True
+        else:
+            tables = self.select_tables(question, top_k, token_budget)
+            matched = bool(tables)
+            if not matched:
+                tables = self._pack(list(self.schema), token_budget)
+        text = format_schema(self.schema, tables)
+        stats = {
+            "tables_sent": len(tables),
+            "tables_total": len(self.schema),
+            "tokens_sent": estimate_tokens(text),
+            "tokens_full": full_tokens,
+            "matched": matched,
+        }
+        return text, stats
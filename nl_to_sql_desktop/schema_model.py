@@ -0,0 +1,231 @@
+# schema_model.py
+"""
+The database catalog as one object shared by the prompt builder, the edit
+path and the schema sidebar.
+
+DBConnector.get_schema() reads it in a few set-based catalog queries (one
+each for columns, keys and indexes, not one per table) and hands the rows to
+build_schema(). Per table it knows the column types and nullability, the
+primary key, foreign keys, indexes and the planner's approximate row count
+(None when the database has no statistics for it).
+
+Schemas round-trip through to_dict()/from_dict() for the on-disk cache.
+"""
+from cost_guard import short_number
+
+
+class Column:
+    def __init__(self, name, type=None, nullable=True):
+        self.name = name
+        self.type = type
+        self.nullable = nullable
+
+
+class ForeignKey:
+    def __init__(self, columns, ref_table, ref_columns):
+        self.columns = list(columns)
+        self.ref_table = ref_table
+        self.ref_columns = list(ref_columns)
+
+
+class Index:
+    def __init__(self, name, columns, unique=False):
+        self.name = name
+        self.columns = list(columns)
+        self.unique = unique
+
+
+class Table:
+    def __init__(self, name, kind="table", columns=(), primary_key=(), foreign_keys=(), indexes=(),
+                 rows=None):
+        self.name = name
+        self.kind = kind
+        self.columns = list(columns)
+        self.primary_key = list(primary_key)
+        self.foreign_keys = list(foreign_keys)
+        self.indexes = list(indexes)
+        self.rows = rows
+
+    @property
+    def column_names(self):
+        return [c.name for c in self.columns]
+
+    def column(self, name):
+        for column in self.columns:
+            if column.name == name:
+                return column
+        return None
+
+    def indexed_columns(self):
+        """Columns that lead an index (the primary key's included): the ones a WHERE or JOIN can seek on."""
+        leading = {index.columns[0] for index in self.indexes if index.columns}
+        if self.primary_key:
+            leading.add(self.primary_key[0])
+        return leading
+
+    def describe(self):
+        """
+        The table for the prompt, e.g.
+        ``orders (~1.2M rows): id integer PK, customer_id integer → customers.id, ...``
+        plus a line listing its multi-column and unique indexes.
+        """
+        references = {}
+        for fk in self.foreign_keys:
+            for column, ref_column in zip(fk.columns, fk.ref_columns):
+                references[column] = f"{fk.ref_table}.{ref_column}"
+        indexed = self.indexed_columns()
+        parts = []
+        for column in self.columns:
+            text = f"{column.name} {column.type}" if column.type else column.name
+            if column.name in self.primary_key:
+                text += " PK"
+            elif column.name in indexed:
+                text += " indexed"
+            if column.name in references:
+                text += f" → {references[column.name]}"
+            parts.append(text)
+        header = self.name
+        if self.kind == "view":
+            header += " (view)"
+        elif self.rows is not None:
+            header += f" (~{short_number(self.rows)} rows)"
+        text = f"{header}: {', '.join(parts)}"
+        composite = [i for i in self.indexes
+                     if (len(i.columns) > 1 or i.unique) and i.columns != self.primary_key]
+        if composite:
+            text += "\n  indexes: " + ", ".join(
+                ("UNIQUE " if i.unique else "") + f"({', '.join(i.columns)})" for i in composite)
+        return text
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "columns": [[c.name, c.type, c.nullable] for c in self.columns],
+            "primary_key": self.primary_key,
+            "foreign_keys": [[fk.columns, fk.ref_table, fk.ref_columns] for fk in self.foreign_keys],
+            "indexes": [[i.name, i.columns, i.unique] for i in self.indexes],
+            "rows": self.rows,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["name"], data["kind"],
+            columns=[Column(*c) for c in data["columns"]],
+            primary_key=data["primary_key"],
+            foreign_keys=[ForeignKey(*fk) for fk in data["foreign_keys"]],
+            indexes=[Index(*i) for i in data["indexes"]],
+            rows=data["rows"],
+        )
+
+
+class Schema:
+    def __init__(self, tables=()):
+        self.tables = {table.name: table for table in tables}
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __contains__(self, name):
+        return name in self.tables
+
+    def table(self, name):
+        """The table called ``name``, matched case-insensitively if there is no exact match; or None."""
+        table = self.tables.get(name)
+        if table is None and name:
+            lowered = name.lower()
+            table = next((t for n, t in self.tables.items() if n.lower() == lowered), None)
+        return table
+
+    def column_names(self):
+        """{table: [column, ...]}"""
+        return {name: table.column_names for name, table in self.tables.items()}
+
+    def references(self):
+        """{table: {tables its foreign keys point at}}, declared keys only."""
+        return {name: {fk.ref_table for fk in table.foreign_keys}
+                for name, table in self.tables.items() if table.foreign_keys}
+
+    def merge(self, other):
+        """Add another shard's schema: tables and columns missing here are added, row counts summed."""
+        for name, table in other.tables.items():
+            mine = self.tables.get(name)
+            if mine is None:
+                self.tables[name] = table
+                continue
+            known = set(mine.column_names)
+            mine.columns += [c for c in table.columns if c.name not in known]
+            if mine.rows is not None and table.rows is not None:
+                mine.rows += table.rows
+            else:
+                mine.rows = None
+        return self
+
+    def to_dict(self):
+        return {"tables": [table.to_dict() for table in self.tables.values()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(Table.from_dict(t) for t in data["tables"])
+
+
+def build_schema(columns, keys=(), indexes=(), row_counts=None):
+    """
+    A Schema from catalog rows, each list already ordered:
+
+    - columns: (table, kind, column, type, nullable), kind "table" or "view";
+    - keys: (table, constraint, is_primary, column, ref_table, ref_column), one
+      row per key column; a ref_column of None means the referenced primary key;
+    - indexes: (table, index, unique, column), one row per index column; an
+      index with an expression column (None) is skipped;
+    - row_counts: {table: approximate rows}.
+
+    Extra trailing fields in a row (sort keys) are ignored.
+    """
+    tables = {}
+    for table, kind, column, type_, nullable in (row[:5] for row in columns):
+        entry = tables.get(table)
+        if entry is None:
+            entry = tables[table] = Table(table, "view" if kind == "view" else "table")
+        entry.columns.append(Column(column, type_, bool(nullable)))
+
+    foreign = {}
+    for table, constraint, primary, column, ref_table, ref_column in (row[:6] for row in keys):
+        if table not in tables:
+            continue
+        if primary:
+            tables[table].primary_key.append(column)
+        else:
+            fk = foreign.get((table, constraint))
+            if fk is None:
+                fk = foreign[(table, constraint)] = ForeignKey([], ref_table, [])
+                tables[table].foreign_keys.append(fk)
+            fk.columns.append(column)
+            fk.ref_columns.append(ref_column)
+    for fk in foreign.values():
+        referenced = tables.get(fk.ref_table)
+        for i, ref_column in enumerate(fk.ref_columns):
+            if ref_column is None and referenced is not None and i < len(referenced.primary_key):
+                fk.ref_columns[i] = referenced.primary_key[i]
+
+    # An expression key column comes back as None; without it the index would
+    # look like it leads with (or covers) columns it does not, so leave it out
+    expression = {(table, name) for table, name, _, column in (row[:4] for row in indexes) if column is None}
+    named = {}
+    for table, name, unique, column in (row[:4] for row in indexes):
+        if table not in tables or (table, name) in expression:
+            continue
+        index = named.get((table, name))
+        if index is None:
+            index = named[(table, name)] = Index(name, [], bool(unique))
+            tables[table].indexes.append(index)
+        index.columns.append(column)
+
+    for table, rows in (row_counts or {}).items():
+        if table in tables and rows is not None and rows >= 0:
+            tables[table].rows = int(rows)
+    return Schema(tables.values())
@@ -0,0 +1,85 @@
+# schema_search.py
+"""
+Name search over a schema for the sidebar.
+
+Table names and column names are each lowercased into one newline-separated
+string, so finding names that contain a query is a str.find() loop in C
+rather than a walk over tens of thousands of tree nodes; a bisect over the
+names' offsets turns a hit back into its table. The query is searched in
+order of match quality (exact, prefix ``"\\n" + q``, word start ``"_" + q``,
+anywhere) and the search stops as soon as enough tables are found, so a
+one-letter query costs no more than a precise one.
+"""
+from bisect import bisect_right
+
+SEARCH_LIMIT = 200      # tables returned at most
+
+
+class _Names:
+    """One kind of name (tables or columns), each owned by a table."""
+
+    def __init__(self, names, owners):
+        self.owners = owners
+        self.starts = []
+        offset = 1
+        for name in names:
+            self.starts.append(offset)
+            offset += len(name) + 1
+        self.text = "\n" + "\n".join(names) + "\n"
+        self.exact = {}
+        for name, owner in zip(names, owners):
+            self.exact.setdefault(name, []).append(owner)
+
+    def owners_of(self, pattern):
+        """Owning table of each name containing ``pattern``, in catalog order."""
+        text, starts = self.text, self.starts
+        # A prefix pattern starts with the separator in front of the name
+        lead = 1 if pattern[0] == "\n" else 0
+        at = text.find(pattern)
+        while at != -1:
+            i = bisect_right(starts, at + lead) - 1
+            yield self.owners[i]
+            # Next name, from its separator so a prefix match right there is found too
+            at = text.find(pattern, starts[i + 1] - lead) if i + 1 < len(starts) else -1
+
+
+class SchemaSearch:
+    def __init__(self, schema):
+        self._tables = list(schema.tables.values())
+        self._table_names = _Names([t.name.lower() for t in self._tables], list(range(len(self._tables))))
+        names, owners = [], []
+        for i, table in enumerate(self._tables):
+            for column in table.columns:
+                names.append(column.name.lower())
+                owners.append(i)
+        self._column_names = _Names(names, owners)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        [(table, [matching columns])] for the tables whose name or one of whose
+        column names contains ``query`` (case-insensitive). Tables matched by
+        name come first, then those matched by a column; within each, exact
+        before prefix before word start before anywhere, then catalog order.
+        """
+        needle = query.strip().lower()
+        if not needle or "\n" in needle:
+            return []
+        found = {}      # table number -> None, in rank order
+        for names in (self._table_names, self._column_names):
+            for owner in names.exact.get(needle, ()):
+                found.setdefault(owner)
+            for pattern in ("\n" + needle, "_" + needle, needle):
+                if len(found) >= limit:
+                    break
+                for owner in names.owners_of(pattern):
+                    found.setdefault(owner)
+                    if len(found) >= limit:
+                        break
+        results = []
+        for i in list(found)[:limit]:
+            table = self._tables[i]
+            results.append((table.name, [c.name for c in table.columns if needle in c.name.lower()]))
+        return results
@@ -0,0 +1,300 @@
+# spill_store.py
+"""
+A ResultStore look-alike for results larger than memory.
+
+Fetched chunks are written to Arrow IPC files ("segments") in a private
+directory under SPILL_DIR and read back through memory maps, so the rows
+cost page cache rather than Python heap. Only the segment being written is
+also held in memory. Reads slice the mapped record batches without copying
+and convert just the rows asked for to Python values.
+
+Inline edits are kept in memory on top of the files. The directory is
+removed by close(), when the store is garbage collected or at exit; ones
+left behind by a crashed session are removed when the next store is made.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+from config import SPILL_DIR, SPILL_MAX_MB, SPILL_SEGMENT_MB
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+# Without a way to ask whether the owning process still runs (Windows), a directory this old is stale
+STALE_SECONDS = 24 * 3600
+
+
+class SpillFull(Exception):
+    """The result outgrew SPILL_MAX_MB."""
+
+
+def _owner_alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True     # exists, owned by someone else
+    return True
+
+
+def remove_stale_spills(root=SPILL_DIR):
+    """Delete spill directories whose session is gone."""
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            alive = _owner_alive(int(name.split("-", 1)[0]))
+            if alive is None:
+                alive = time.time() - os.path.getmtime(path) < STALE_SECONDS
+        except (ValueError, OSError):
+            continue
+        if not alive:
+            logger.info(f"Removing stale spill directory {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class SpillStore:
+    def __init__(self, columns, max_bytes=SPILL_MAX_MB * MB, segment_bytes=SPILL_SEGMENT_MB * MB,
+                 root=SPILL_DIR):
+        remove_stale_spills(root)
+        self.columns = list(columns)
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.path = os.path.join(root, f"{os.getpid()}-{uuid.uuid4().hex[:12]}")
+        os.makedirs(self.path, exist_ok=True)
+        # Arrow wants unique field names; result columns may repeat ("id", "id")
+        self._names = [f"c{i}" for i in range(len(self.columns))]
+        self._pieces = []       # per appended chunk: the DataFrame until its segment is sealed, then a mapped batch
+        self._starts = []
+        self._rows = 0
+        self._overrides = {}    # (position, column index) -> edited value
+        self._sealed_bytes = 0
+        self._writer = None
+        self._sink = None
+        self._schema = None
+        self._segment_first = 0     # index into _pieces of the open segment's first chunk
+        self._segment_path = None
+        self._segments = 0
+        self._maps = []
+        self._closed = False
+        self._lock = threading.RLock()
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+
+    def __len__(self):
+        return self._rows
+
+    # ───── Writing (fetch worker) ─────
+    def append(self, chunk):
+        if chunk.empty:
+            return
+        chunk = chunk.reset_index(drop=True)
+        # Under the lock so the UI can close() a store it no longer shows while the fetch still writes
+        with self._lock:
+            if self._closed:
+                raise ValueError("Spill store is closed")
+            batch = self._to_batch(chunk)
+            if self.nbytes() + batch.nbytes > self.max_bytes:
+                raise SpillFull(f"Result is larger than the {self.max_bytes // MB:,} MB spill limit")
+            self._writer.write_batch(batch)
+            self._pieces.append(chunk)
+            self._starts.append(self._rows)
+            self._rows += len(chunk)
+            if self._sink.tell() >= self.segment_bytes:
+                self._seal()
+
+    def finish(self):
+        """Seal the last segment; everything is read from the maps from now on."""
+        self._seal()
+
+    def _to_batch(self, chunk):
+        import pyarrow as pa
+
+        frame = chunk.set_axis(self._names, axis=1)
+        if self._writer is not None:
+            try:
+                return pa.RecordBatch.from_pandas(frame, schema=self._schema, preserve_index=False)
+            except (pa.ArrowException, TypeError, ValueError):
+                # Types changed (a column that was all NULL so far, ints turning into floats…)
+                self._seal()
+        try:
+            batch = pa.RecordBatch.from_pandas(frame, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            # Mixed Python types in one column: keep them as text
+            frame = frame.apply(lambda c: c.astype(str).where(c.notna()) if c.dtype == object else c)
+            batch = pa.RecordBatch.from_pandas(frame, preserve_index=False)
+        self._open_segment(batch.schema)
+        return batch
+
+    def _open_segment(self, schema):
+        import pyarrow as pa
+
+        self._segment_path = os.path.join(self.path, f"{self._segments:05d}.arrow")
+        self._segments += 1
+        self._sink = pa.OSFile(self._segment_path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, schema)
+        self._schema = schema
+        self._segment_first = len(self._pieces)
+
+    def _seal(self):
+        import pyarrow as pa
+
+        with self._lock:
+            if self._writer is None:
+                return
+            self._writer.close()
+            self._sealed_bytes += self._sink.tell()
+            self._sink.close()
+            self._writer = self._sink = None
+            source = pa.memory_map(self._segment_path, "r")
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                self._pieces[self._segment_first + i] = reader.get_batch(i)
+            self._maps.append(source)
+
+    # ───── Reading (any thread) ─────
+    def _frame(self, piece, lo, hi):
+        frame = piece.iloc[lo:hi] if isinstance(piece, pd.DataFrame) else piece.slice(lo, hi - lo).to_pandas()
+        return frame.set_axis(self.columns, axis=1)
+
+    @staticmethod
+    def _tuples(piece, lo=None, hi=None, positions=None):
+        """Row tuples, the same values itertuples() gives for a ResultStore chunk."""
+        if isinstance(piece, pd.DataFrame):
+            frame = piece.iloc[positions] if positions is not None else piece.iloc[lo:hi]
+            return list(frame.itertuples(index=False, name=None))
+        import pyarrow as pa
+
+        batch = piece.take(pa.array(positions)) if positions is not None else piece.slice(lo, hi - lo)
+        # Column by column to Python is several times faster than going through pandas
+        return list(zip(*(column.to_pylist() for column in batch.columns)))
+
+    def _apply_overrides(self, rows, positions):
+        """Edited values over plain row tuples; ``positions`` are the rows' store positions."""
+        with self._lock:
+            overrides = dict(self._overrides)
+        if not overrides:
+            return rows
+        slots = {p: i for i, p in enumerate(positions)}
+        for (position, column), value in overrides.items():
+            i = slots.get(position)
+            if i is not None:
+                row = list(rows[i])
+                row[column] = value
+                rows[i] = tuple(row)
+        return rows
+
+    def _piece_len(self, i):
+        end = self._starts[i + 1] if i + 1 < len(self._starts) else self._rows
+        return end - self._starts[i]
+
+    def rows(self, start, stop):
+        start, stop = max(start, 0), min(stop, self._rows)
+        rows = []
+        if start >= stop:
+            return rows
+        with self._lock:
+            first = bisect_right(self._starts, start) - 1
+            last = bisect_right(self._starts, stop - 1) - 1
+            for i in range(first, last + 1):
+                piece_start = self._starts[i]
+                lo = max(start - piece_start, 0)
+                hi = min(stop - piece_start, self._piece_len(i))
+                rows.extend(self._tuples(self._pieces[i], lo, hi))
+        return self._apply_overrides(rows, range(start, stop))
+
+    def take(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        rows = [None] * len(positions)
+        if not len(positions):
+            return rows
+        with self._lock:
+            owners = np.searchsorted(self._starts, positions, side="right") - 1
+            for i in np.unique(owners):
+                slots = np.flatnonzero(owners == i)
+                part = self._tuples(self._pieces[i], positions=positions[slots] - self._starts[i])
+                for slot, row in zip(slots, part):
+                    rows[slot] = row
+        return self._apply_overrides(rows, positions.tolist())
+
+    def column(self, index):
+        """One column over the whole result, Arrow-backed: sorting it does not load the other columns."""
+        import pyarrow as pa
+
+        with self._lock:
+            edited = {p: v for (p, c), v in self._overrides.items() if c == index}
+            arrays = []
+            for piece in self._pieces:
+                if isinstance(piece, pd.DataFrame):
+                    arrays.append(pa.array(piece.iloc[:, index], from_pandas=True))
+                else:
+                    arrays.append(piece.column(index))
+        try:
+            values = pd.Series(pd.arrays.ArrowExtensionArray(pa.chunked_array(arrays)))
+        except (pa.ArrowException, TypeError):
+            # Segments disagree on the type: fall back to Python objects
+            values = pd.Series(np.concatenate([a.to_numpy(zero_copy_only=False) for a in arrays]), dtype=object)
+        if edited:
+            values = values.astype(object)
+            values.iloc[list(edited)] = list(edited.values())
+        return values
+
+    def value(self, position, column):
+        index = self.columns.index(column)
+        if (position, index) in self._overrides:
+            return self._overrides[(position, index)]
+        return self.take([position])[0][index]
+
+    def set_value(self, position, column, value):
+        if not 0 <= position < self._rows:
+            raise IndexError(position)
+        with self._lock:
+            self._overrides[(position, self.columns.index(column))] = value
+
+    def iter_chunks(self):
+        # A snapshot: inline edits on the UI thread go on while an export reads this
+        with self._lock:
+            pieces = list(zip(self._pieces, self._starts))
+            rows, overrides = self._rows, dict(self._overrides)
+        for i, (piece, start) in enumerate(pieces):
+            stop = pieces[i + 1][1] if i + 1 < len(pieces) else rows
+            frame = self._frame(piece, 0, stop - start).reset_index(drop=True)
+            for (position, column), value in overrides.items():
+                if start <= position < stop:
+                    if frame.dtypes.iloc[column] != object:
+                        frame.isetitem(column, frame.iloc[:, column].astype(object))
+                    frame.iat[position - start, column] = value
+            yield frame
+
+    def nbytes(self):
+        """Bytes written to the spill files."""
+        with self._lock:
+            return self._sealed_bytes + (self._sink.tell() if self._sink is not None else 0)
+
+    def close(self):
+        """Drop the data and delete the files. The store is empty afterwards."""
+        with self._lock:
+            self._closed = True
+            if self._writer is not None:
+                self._writer.close()
+                self._sink.close()
+                self._writer = self._sink = None
+            self._pieces, self._starts, self._rows = [], [], 0
+            for source in self._maps:
+                source.close()
+            self._maps = []
+        self._finalizer()
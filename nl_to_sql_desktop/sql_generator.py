@@ -0,0 +1,287 @@
+# sql_generator.py
+"""
+The NL -> SQL pipeline without any Tk: prune the schema to the question,
+consult the generation cache, stream the answer from Ollama and stop as
+soon as the JSON object is complete. HomeWindow runs it as a background
+job; the benchmarks call it directly.
+
+With GENERATION_CANDIDATES > 1 the question goes to Ollama several times at
+once, each with its own temperature and seed. Every answer is validated as
+soon as it is complete (one SELECT statement that the database can EXPLAIN)
+and the first valid one wins; the other streams are closed. Ollama only runs
+them side by side when the server allows it (OLLAMA_NUM_PARALLEL).
+"""
+import json
+import logging
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import sqlparse
+
+from config import (CANDIDATE_TEMPERATURES, GENERATION_CANDIDATES, PROMPT_TOKEN_BUDGET,
+                    PROMPT_TOP_K_TABLES)
+from generation_cache import GenerationCache
+from job_executor import Job, JobCancelled
+from metrics import Metrics
+from schema_cache import SchemaCache
+from schema_index import SchemaIndex, estimate_tokens
+from stream_parser import SqlStreamParser
+
+logger = logging.getLogger(__name__)
+
+
+class SqlGenerator:
+    def __init__(self, db_connector, ollama, schema_cache=None, generation_cache=None):
+        self.db_connector = db_connector
+        self.ollama = ollama
+        self.schema_cache = schema_cache if schema_cache is not None else SchemaCache()
+        self.generation_cache = generation_cache if generation_cache is not None else GenerationCache()
+        self.schema_index = None
+
+    @property
+    def schema(self):
+        """The last schema load_schema() read, or None."""
+        return self.schema_index.schema if self.schema_index is not None else None
+
+    def load_schema(self, refresh=False):
+        """Fetch (or reuse) the schema and its search index."""
+        schema = self.schema_cache.get(self.db_connector, refresh=refresh)
+        if self.schema_index is None or self.schema_index.schema is not schema:
+            self.schema_index = SchemaIndex(schema)
+        return schema
+
+    def prompt_schema(self, nl_query):
+        """Returns (schema_text, stats) with only the tables relevant to ``nl_query``."""
+        self.load_schema()
+        return self.schema_index.prompt_schema(nl_query, PROMPT_TOP_K_TABLES, PROMPT_TOKEN_BUDGET)
+
+    def generate(self, job, nl_query, use_cache=True, metrics=None, candidates=GENERATION_CANDIDATES):
+        """
+        Ask Ollama for SQL. Returns (sql, stats). ``job`` (a job_executor.Job)
+        receives the partial SQL as it streams and can cancel the request.
+        With ``candidates`` > 1, see generate_candidates().
+        """
+        metrics = metrics if metrics is not None else Metrics("generate")
+        job.report(message="Reading schema…")
+        schema_text, stats = self.prompt_schema(nl_query)
+        metrics.lap("schema")
+        metrics.count("prompt_tokens", stats["tokens_sent"])
+        logger.info(
+            f"Prompt schema: {stats['tables_sent']}/{stats['tables_total']} tables, "
+            f"~{stats['tokens_sent']} of ~{stats['tokens_full']} tokens"
+        )
+
+        # Same question against the same schema text: reuse the earlier answer
+        cache_key = GenerationCache.make_key(nl_query, schema_text, self.ollama.model)
+        stats["cached"] = False
+        if use_cache:
+            cached_sql = self.generation_cache.get(cache_key)
+            if cached_sql is not None:
+                logger.info(f"Generation cache hit: {cached_sql}")
+                stats["cached"] = True
+                metrics.fields["cached"] = True
+                metrics.lap("cache")
+                return cached_sql, stats
+        metrics.lap("cache")
+
+        # Step 1: Check connection before doing anything
+        job.report(message="Checking Ollama connection…")
+        if not self.ollama.is_healthy():
+            raise ConnectionError("Ollama server is not reachable.")
+        metrics.lap("health")
+        prompt = f"""
+    You are a SQL generator.
+    Given the following database schema:
+    {schema_text}
+
+    Row counts are approximate. On large tables, filter and join on indexed
+    (or PK) columns and do not wrap those columns in functions or casts.
+
+    And this request in natural language:
+    {nl_query}
+
+    Return ONLY a valid JSON object in this exact format:
+    {{"sql": "SELECT ..."}}
+    Do not include any explanations or extra text.
+        """.strip()
+        logger.debug(f"Prompt sent to Ollama: {prompt}")
+        metrics.lap("prompt")
+        if candidates > 1:
+            sql_generated = self.generate_candidates(job, prompt, candidates, stats, metrics)
+        else:
+            job.report(message="Waiting for Ollama…")
+            sql_generated = self._stream_sql(job, prompt, stats, metrics)
+            stats.update(self._prompt_eval_stats(stats.pop("prompt_eval_ns"), prompt, stats))
+        logger.info(f"Generated SQL: {sql_generated}")
+        self.generation_cache.put(cache_key, sql_generated)
+        return sql_generated, stats
+
+    def _stream_sql(self, job, prompt, stats, metrics, options=None, report=True):
+        """
+        One streamed answer -> cleaned SQL. Timings go into ``stats``;
+        ``report`` sends the partial SQL to the job's UI.
+        """
+        # Step 2: Stream response for safety
+        started = time.perf_counter()
+        response = self.ollama.generate(prompt, stream=True, options=options)
+        # Closing the response aborts the blocking read in iter_lines()
+        job.add_cancel_callback(response.close)
+        logger.info(f"Ollama HTTP status: {response.status_code}")
+        response.raise_for_status()
+
+        # Step 3: Render tokens as they arrive; hang up once the JSON object closes
+        parser = SqlStreamParser()
+        first_token_at = prompt_eval_ns = None
+        for line in response.iter_lines(decode_unicode=True):
+            job.check_cancelled()
+            if not line:
+                continue
+            # Set right away: candidates read it even when the answer is then rejected
+            stats.setdefault("first_byte_seconds", time.perf_counter() - started)
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Non-JSON line in Ollama stream: {line}")
+                continue
+            if obj.get("done"):
+                prompt_eval_ns = obj.get("prompt_eval_duration")
+            token = obj.get("response")
+            if token:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    metrics.lap("first token")
+                metrics.count("tokens")
+                complete = parser.feed(token)
+                if report:
+                    job.report(parser.partial_sql, message=f"Generating SQL… ({len(parser.text)} chars)")
+                if complete:
+                    break
+        stopped_early = parser.complete and prompt_eval_ns is None
+        response.close()
+        metrics.lap("generate")
+
+        stats["generation_seconds"] = time.perf_counter() - started
+        if first_token_at is not None:
+            stats["ttft_seconds"] = first_token_at - started
+        stats["prompt_eval_ns"] = prompt_eval_ns
+        if stopped_early:
+            logger.info("JSON object complete; closed the Ollama stream early")
+        logger.debug(f"Accumulated Ollama text: {parser.text}")
+
+        # Step 4: Extract JSON from raw text
+        if parser.complete:
+            data = parser.result()
+        else:
+            match = re.search(r"\{.*\}", parser.text, re.S)
+            if not match:
+                raise ValueError("No JSON object found in LLM response")
+            data = json.loads(match.group(0))
+
+        if "sql" not in data:
+            raise ValueError("No 'sql' key in LLM JSON output")
+
+        # Step 5: Clean & validate SQL
+        sql_generated = data["sql"].strip()
+        sql_generated = sql_generated.rstrip(';') + ';'  # Ensure single semicolon
+        if not sql_generated.lower().startswith("select"):
+            raise ValueError(f"Unexpected SQL output: {sql_generated}")
+        metrics.lap("parse")
+        return sql_generated
+
+    # ───── Speculative candidates ─────
+    def validate(self, sql):
+        """Raises unless ``sql`` is a single SELECT the database can plan (EXPLAIN)."""
+        statements = [s for s in sqlparse.parse(sql) if s.token_first(skip_cm=True) is not None]
+        if len(statements) != 1:
+            raise ValueError(f"Expected one statement, got {len(statements)}")
+        if statements[0].token_first(skip_cm=True).normalized != "SELECT":
+            raise ValueError("Not a SELECT statement")
+        # Unknown tables or columns fail here, without running the query
+        self.db_connector.explain(sql)
+
+    def generate_candidates(self, job, prompt, n, stats, metrics):
+        """
+        ``n`` generations of ``prompt`` at once; returns the first valid SQL and
+        cancels the rest. ``stats`` gets the wall-clock time and what retrying
+        one at a time would have cost: the wait for the first answer to start,
+        plus each failed attempt and the winner from their first response byte.
+        Time an attempt spent queued behind the others (OLLAMA_NUM_PARALLEL=1)
+        is not counted, so candidates the server ran one after another come
+        out no faster than retrying.
+        """
+        temperatures = CANDIDATE_TEMPERATURES
+        children = [Job(i, f"candidate {i + 1}", None) for i in range(n)]
+        for child in children:
+            job.add_cancel_callback(child.cancel)
+
+        served = [None] * n     # per attempt: (first response byte or None, end), perf_counter times
+
+        def attempt(i):
+            started = time.perf_counter()
+            options = {"temperature": temperatures[i % len(temperatures)], "seed": i + 1}
+            attempt_stats = {}
+            try:
+                sql = self._stream_sql(children[i], prompt, attempt_stats, Metrics("candidate"), options,
+                                       report=False)
+                self.validate(sql)
+                return sql
+            finally:
+                first_byte = attempt_stats.get("first_byte_seconds")
+                served[i] = (started + first_byte if first_byte is not None else None, time.perf_counter())
+
+        job.report(message=f"Generating {n} candidates…")
+        started = time.perf_counter()
+        failures = []
+        pool = ThreadPoolExecutor(max_workers=n, thread_name_prefix="candidate")
+        try:
+            pending = {pool.submit(attempt, i): i for i in range(n)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = pending.pop(future)
+                    try:
+                        sql = future.result()
+                    except JobCancelled:
+                        job.check_cancelled()
+                        continue
+                    except Exception as e:
+                        job.check_cancelled()   # a closed stream, not a bad answer
+                        logger.info(f"Candidate {i + 1} rejected: {e}")
+                        failures.append((i, e))
+                        job.report(message=f"Generating {n} candidates… ({len(failures)} rejected)")
+                        continue
+                    logger.info(f"Candidate {i + 1} of {n} won after {len(failures)} rejected")
+                    tried = [served[j] for j, _ in failures] + [served[i]]
+                    first = min((b for b, _ in tried if b is not None), default=started)
+                    stats.update(candidates=n, candidate_index=i + 1, candidates_rejected=len(failures),
+                                 generation_seconds=time.perf_counter() - started,
+                                 sequential_seconds=first - started + sum(end - b for b, end in tried
+                                                                          if b is not None))
+                    metrics.count("candidates_rejected", len(failures))
+                    return sql
+            job.check_cancelled()
+            raise ValueError(f"All {n} candidates were rejected; last error: {failures[-1][1]}")
+        finally:
+            for child in children:
+                child.cancel()      # losers hang up on Ollama; their threads end on the closed stream
+            pool.shutdown(wait=False)
+            metrics.lap("generate")
+
+    @staticmethod
+    def _prompt_eval_stats(prompt_eval_ns, prompt, stats):
+        """
+        Estimate prompt-processing time saved by pruning. Uses Ollama's own
+        timing when the stream ran to the end, otherwise time-to-first-token.
+        """
+        if prompt_eval_ns:
+            seconds = prompt_eval_ns / 1e9
+        elif "ttft_seconds" in stats:
+            seconds = stats["ttft_seconds"]
+        else:
+            return {}
+        skipped = stats["tokens_full"] - stats["tokens_sent"]
+        return {
+            "prompt_eval_seconds": seconds,
+            "seconds_saved": seconds * skipped / estimate_tokens(prompt),
+        }
@@ -0,0 +1,143 @@
+# sql_rewrite.py
+"""
+Rewrites of a user's SELECT for preview mode: the same statement bounded by
+a LIMIT, and a COUNT(*) around the unchanged statement for the total.
+
+Only the top level of the statement is looked at, so a LIMIT inside a
+subquery or CTE stays as it is. A trailing semicolon or comment is dropped
+before anything is appended, and a new LIMIT goes in front of a locking
+clause (FOR UPDATE, LOCK IN SHARE MODE), which has to come last.
+"""
+import re
+
+import sqlparse
+from sqlparse import tokens as T
+from sqlparse.sql import Comment, Identifier, Parenthesis, Where
+
+# What may follow a top-level LIMIT: "LIMIT n", "LIMIT ALL", "LIMIT offset, n"
+_LIMIT_CLAUSE = re.compile(r"LIMIT\s+(?:\d+\s*,\s*)?(\d+|ALL)\b", re.IGNORECASE)
+
+
+def _is_trailer(token):
+    return (token.is_whitespace or token.ttype in T.Comment or isinstance(token, Comment)
+            or token.match(T.Punctuation, ";"))
+
+
+def statement_text(text):
+    """The first statement of ``text`` without its trailing semicolon and comments."""
+    statements = sqlparse.parse(text.strip())
+    if not statements:
+        return ""
+    tokens = list(statements[0].tokens)
+    while tokens and _is_trailer(tokens[-1]):
+        tokens.pop()
+    return "".join(str(token) for token in tokens)
+
+
+def _top_level_keyword(statement, keyword):
+    """Character offset of the last top-level ``keyword`` (e.g. "LIMIT"), or None."""
+    offset, found = 0, None
+    for token in statement.tokens:
+        if token.ttype in T.Keyword and token.normalized == keyword:
+            found = offset
+        offset += len(str(token))
+    return found
+
+
+# The word after FOR / LOCK that makes it a row locking clause
+_LOCKING = {"FOR": {"UPDATE", "SHARE", "NO", "KEY"}, "LOCK": {"IN"}}
+
+
+def _locking_clause(statement):
+    """Character offset of a top-level FOR UPDATE / FOR SHARE / LOCK IN SHARE MODE, or None."""
+    offset = 0
+    for i, token in enumerate(statement.tokens):
+        if isinstance(token, Where):
+            # sqlparse lets a WHERE run on over a trailing FOR UPDATE
+            inner = _locking_clause(token)
+            if inner is not None:
+                return offset + inner
+        elif token.ttype in T.Keyword and token.normalized in _LOCKING:
+            _, following = statement.token_next(i)
+            if following is not None and following.normalized in _LOCKING[token.normalized]:
+                return offset
+        offset += len(str(token))
+    return None
+
+
+def limit_sql(sql, limit):
+    """
+    ``sql`` returning at most ``limit`` rows, in the same order; None when it
+    already can't return more (its own LIMIT is as small).
+    """
+    text = statement_text(sql)
+    statement = sqlparse.parse(text)[0]
+    if _top_level_keyword(statement, "FETCH") is not None:
+        # FETCH FIRST n ROWS ONLY: bound it from outside rather than rewrite it
+        return f"SELECT * FROM (\n{text}\n) AS nl2sql_preview LIMIT {limit}"
+    at = _top_level_keyword(statement, "LIMIT")
+    if at is None:
+        lock = _locking_clause(statement)
+        if lock is not None:
+            return f"{text[:lock]}LIMIT {limit}\n{text[lock:]}"
+        return f"{text}\nLIMIT {limit}"
+    match = _LIMIT_CLAUSE.match(text, at)
+    if match is None:
+        # LIMIT with an expression or placeholder
+        return f"SELECT * FROM (\n{text}\n) AS nl2sql_preview LIMIT {limit}"
+    count = match.group(1)
+    if count.upper() != "ALL" and int(count) <= limit:
+        return None
+    return text[:match.start(1)] + str(limit) + text[match.end(1):]
+
+
+def top_level_limit(sql):
+    """The row count of the statement's own LIMIT, or None (no LIMIT, LIMIT ALL or an expression)."""
+    text = statement_text(sql)
+    at = _top_level_keyword(sqlparse.parse(text)[0], "LIMIT") if text else None
+    match = _LIMIT_CLAUSE.match(text, at) if at is not None else None
+    if match is None or match.group(1).upper() == "ALL":
+        return None
+    return int(match.group(1))
+
+
+# Top-level keywords after which result rows no longer map one-to-one onto rows of the FROM table
+_NOT_ROW_FOR_ROW = {"DISTINCT", "GROUP BY", "HAVING", "UNION", "UNION ALL", "INTERSECT", "EXCEPT", "MINUS"}
+
+
+def single_table(sql):
+    """
+    The table a SELECT reads row for row (``schema.table`` when qualified),
+    or None for joins (including ``FROM a, b``), grouping, DISTINCT, set
+    operations, subqueries and CTEs.
+    """
+    text = statement_text(sql)
+    if not text:
+        return None
+    tokens = [t for t in sqlparse.parse(text)[0].tokens if not _is_trailer(t)]
+    if not tokens[0].match(T.DML, "SELECT"):
+        return None
+    from_at = None
+    for i, token in enumerate(tokens):
+        if token.ttype in T.DML and i:
+            return None     # a second SELECT: set operation
+        if token.ttype in T.Keyword:
+            if "JOIN" in token.normalized or token.normalized in _NOT_ROW_FOR_ROW:
+                return None
+            if token.normalized == "FROM":
+                from_at = i
+    if from_at is None or from_at + 1 >= len(tokens):
+        return None
+    source = tokens[from_at + 1]
+    if not isinstance(source, Identifier) or any(isinstance(t, Parenthesis) for t in source.tokens):
+        return None
+    following = tokens[from_at + 2] if from_at + 2 < len(tokens) else None
+    if following is not None and str(following).startswith(","):
+        return None
+    schema = source.get_parent_name()
+    return f"{schema}.{source.get_real_name()}" if schema else source.get_real_name()
+
+
+def count_sql(sql):
+    """SELECT COUNT(*) over the rows ``sql`` returns."""
+    return f"SELECT COUNT(*) FROM (\n{statement_text(sql)}\n) AS nl2sql_count"
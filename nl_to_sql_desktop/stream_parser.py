@@ -0,0 +1,91 @@
+# stream_parser.py
+"""
+Incremental parser for streamed LLM output of the form {"sql": "..."}.
+
+It is fed token by token, knows the moment the first JSON object closes (so
+the HTTP stream can be dropped instead of waiting for the model to stop
+talking), and can decode the "sql" string value while it is still arriving.
+"""
+import json
+import re
+
+_SQL_VALUE_RE = re.compile(r'"sql"\s*:\s*"')
+
+
+class SqlStreamParser:
+    def __init__(self):
+        self.text = ""
+        self.complete = False
+        self._start = None      # index of the opening brace of the first object
+        self._end = None        # index just past its closing brace
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, fragment):
+        """Add streamed text. Returns True once the first JSON object is complete."""
+        if self.complete:
+            return True
+        offset = len(self.text)
+        self.text += fragment
+        for i, ch in enumerate(fragment, start=offset):
+            if self._start is None:
+                if ch == "{":
+                    self._start, self._depth = i, 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end = i + 1
+                    self.complete = True
+                    return True
+        return False
+
+    @property
+    def object_text(self):
+        return self.text[self._start:self._end] if self.complete else None
+
+    def result(self):
+        """The parsed object once complete."""
+        return json.loads(self.object_text)
+
+    @property
+    def partial_sql(self):
+        """The "sql" value decoded so far ('' until it starts)."""
+        if self._start is None:
+            return ""
+        match = _SQL_VALUE_RE.search(self.text, self._start)
+        if not match:
+            return ""
+        raw = []
+        escaped = False
+        last_escape = None
+        for ch in self.text[match.end():]:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+                last_escape = len(raw)
+            elif ch == '"':
+                break
+            raw.append(ch)
+        # Drop an escape sequence that is cut in half by the stream
+        if last_escape is not None and (
+                escaped or (raw[last_escape + 1] == "u" and len(raw) - last_escape < 6)):
+            raw = raw[:last_escape]
+        value = "".join(raw)
+        try:
+            return json.loads(f'"{value}"')
+        except json.JSONDecodeError:
+            return value
@@ -0,0 +1,41 @@
+# export_tools_frame.py
+import tkinter as tk
+from tkinter import ttk
+
+
+class ExportToolsFrame(ttk.Frame):
+    """Export buttons plus a progress bar for long-running exports."""
+
+    def __init__(self, master, on_export, **kwargs):
+        super().__init__(master, **kwargs)
+        ttk.Button(self, text="💾 Export CSV", command=lambda: on_export("csv")).pack(side=tk.LEFT, padx=3)
+        ttk.Button(self, text="📊 Export Excel", command=lambda: on_export("excel")).pack(side=tk.LEFT, padx=3)
+
+        self._total = None
+        self.progress = ttk.Progressbar(self, length=200)
+        self.progress_var = tk.StringVar()
+        self.progress_label = ttk.Label(self, textvariable=self.progress_var)
+
+    def start(self, total=None):
+        """Show the progress bar; determinate when the row count is known."""
+        if total:
+            self.progress.config(mode="determinate", maximum=total, value=0)
+        else:
+            self.progress.config(mode="indeterminate")
+            self.progress.start(15)
+        self._total = total
+        self.progress.pack(side=tk.LEFT, padx=(12, 4))
+        self.progress_label.pack(side=tk.LEFT)
+        self.progress_var.set("Starting export…")
+
+    def update_progress(self, rows_written):
+        if self._total:
+            self.progress.config(value=rows_written)
+            self.progress_var.set(f"{rows_written:,} / {self._total:,} rows")
+        else:
+            self.progress_var.set(f"{rows_written:,} rows")
+
+    def finish(self):
+        self.progress.stop()
+        self.progress.pack_forget()
+        self.progress_label.pack_forget()
@@ -0,0 +1,41 @@
+# filter_bar.py
+import tkinter as tk
+from tkinter import ttk
+
+from result_view import FILTER_OPS
+
+
+class FilterBar(ttk.Frame):
+    """Filter the result on screen by column: contains, equals or a lo..hi range."""
+
+    def __init__(self, master, on_apply, on_clear, **kwargs):
+        super().__init__(master, **kwargs)
+        self._on_apply = on_apply
+        ttk.Label(self, text="🔎 Filter").pack(side=tk.LEFT, padx=(0, 4))
+        self.column_box = ttk.Combobox(self, state="readonly", width=18)
+        self.column_box.pack(side=tk.LEFT)
+        self.op_box = ttk.Combobox(self, state="readonly", width=9, values=FILTER_OPS)
+        self.op_box.set(FILTER_OPS[0])
+        self.op_box.pack(side=tk.LEFT, padx=3)
+        self.value_var = tk.StringVar()
+        value_entry = ttk.Entry(self, textvariable=self.value_var, width=24)
+        value_entry.pack(side=tk.LEFT)
+        value_entry.bind("<Return>", lambda e: self._apply())
+        ttk.Button(self, text="Apply", command=self._apply).pack(side=tk.LEFT, padx=3)
+        ttk.Button(self, text="✖ Clear", command=on_clear).pack(side=tk.LEFT)
+        # Active filters, e.g. "amount 10..20 · kind contains click"
+        self.summary_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.summary_var, foreground="#9CDCFE").pack(side=tk.LEFT, padx=8)
+
+    def set_columns(self, columns):
+        self.column_box.config(values=list(columns))
+        if columns:
+            self.column_box.current(0)
+        self.value_var.set("")
+        self.summary_var.set("")
+
+    def _apply(self):
+        """An empty value removes the filter on that column."""
+        index = self.column_box.current()
+        if index >= 0:
+            self._on_apply(index, self.op_box.get(), self.value_var.get().strip())
@@ -4,10 +4,27 @@ from tkinter import ttk, messagebox, filedialog, simpledialog
 from tkinter import scrolledtext
 import pandas as pd
 import sqlparse
-import requests
-import re
-import json
-from db_connector import DBConnector
+import os
+from db_connector import DBConnector, EditConflict, QueryTimeout
+from job_executor import JobExecutor
+from config import COMPACT_RESULTS, GUARD_ENABLED, MAX_RESULT_ROWS, PREVIEW_ROWS, SPILL_AFTER_MB
+from result_store import ResultStore
+from spill_store import MB, SpillFull, SpillStore
+from result_cache import ResultCache
+from result_view import ResultView
+from sql_rewrite import limit_sql, single_table
+from schema_search import SchemaSearch
+from compaction import compact_store
+from connector_group import SOURCE_COLUMN
+from edit_buffer import EditBuffer
+from metrics import Metrics
+from ollama_client import OllamaClient
+from sql_generator import SqlGenerator
+from exporter import export_rows, frame_rows
+from ui.result_view_frame import VirtualResultGrid
+from ui.export_tools_frame import ExportToolsFrame
+from ui.filter_bar import FilterBar
+from ui.schema_sidebar import SchemaSidebar
 import logging
 
 # Setup logging
@@ -25,7 +42,10 @@ class HomeWindow(tk.Frame):
         self.master = master
         self.db_connector = db_connector
         self.ollama_url = ollama_url
-        self.master.title("NL-to-SQL Workbench")
+        # Pooled keep-alive session; health is refreshed in the background
+        self.ollama = OllamaClient(ollama_url)
+        self.ollama.start_health_monitor()
+        self.master.title(f"NL-to-SQL Workbench — {db_connector.label}")
         self.master.geometry("1200x700")
         self.master.configure(bg="#1E1E1E")
 
@@ -40,20 +60,59 @@ class HomeWindow(tk.Frame):
                              fieldbackground="#2D2D2D", rowheight=25, font=("Consolas", 10))
         self.style.configure("Treeview.Heading", font=("Segoe UI", 10, "bold"), background="#0078D4", foreground="white")
 
+        # Every LLM / DB call runs as a background job so the window stays responsive
+        self.jobs = JobExecutor(self, on_change=self.update_job_status)
+        # Schema pruning, generation cache and Ollama streaming live outside the UI
+        self.generator = SqlGenerator(db_connector, self.ollama)
+        self.generation_job = None
+        self.idle_status = "Ready"
+        self.query_job = None
+        # Preview mode: the statement behind the LIMITed result on screen, and its total
+        self.preview_sql = None
+        self.count_job = None
+        self.preview_total = None
+        # Cost guard: EXPLAIN before running
+        self.estimate_job = None
+        self.result_store = ResultStore()
+        self.result_sql, self.result_complete = "", False
+        self.result_cache = ResultCache()
+        # Spill stores being exported; one replaced on screen is closed once its exports finish
+        self.export_stores = []
+        # Client-side sort / filter of the result on screen
+        self.result_view = ResultView(self.result_store)
+        self.results_title = "📋 Query Results"
+        self.view_job = None
+        self.edit_buffer = None
+        self.primary_keys = {}
+
         self.create_widgets()
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
         self.load_schema()
 
     
            
     def create_widgets(self):
+        # ───── BOTTOM: Status bar (packed first so it is never squeezed out) ─────
+        status_frame = ttk.Frame(self, padding=(6, 2))
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_var = tk.StringVar(value="Ready")
+        ttk.Label(status_frame, textvariable=self.status_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.cancel_jobs_btn = ttk.Button(status_frame, text="⏹ Cancel", command=self.jobs.cancel_all,
+                                          state=tk.DISABLED)
+        self.cancel_jobs_btn.pack(side=tk.RIGHT, padx=(4, 0))
+        self.job_progress = ttk.Progressbar(status_frame, mode="indeterminate", length=120)
+        self.job_progress.pack(side=tk.RIGHT)
+        # Stage breakdown of the last generate / query / export
+        self.metrics_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.metrics_var, foreground="#9CDCFE")\
+            .pack(side=tk.RIGHT, padx=(0, 8))
+
         main_pane = tk.PanedWindow(self, orient=tk.HORIZONTAL, sashwidth=4, bg="#1E1E1E")
         main_pane.pack(fill=tk.BOTH, expand=True)
 
         # ───── LEFT: Schema Sidebar ─────
-        schema_frame = ttk.LabelFrame(main_pane, text="📂 Database Schema", padding=3)
-        self.schema_tree = ttk.Treeview(schema_frame, selectmode="browse")
-        self.schema_tree.pack(fill=tk.BOTH, expand=True)
-        main_pane.add(schema_frame, width=260)
+        self.schema_sidebar = SchemaSidebar(main_pane, on_refresh=lambda: self.load_schema(refresh=True))
+        main_pane.add(self.schema_sidebar, width=260)
 
         # ───── RIGHT: Main workspace ─────
         right_frame = ttk.Frame(main_pane, padding=2)
@@ -71,8 +130,16 @@ class HomeWindow(tk.Frame):
                             undo=True
                         )
         self.nl_entry.pack(side=tk.LEFT, padx=2, pady=2, fill=tk.X, expand=True)
-        gen_sql_btn = ttk.Button(nl_frame, text="Generate SQL", command=self.generate_sql_from_nl)
-        gen_sql_btn.pack(side=tk.LEFT, padx=4,pady=2)
+        gen_frame = ttk.Frame(nl_frame)
+        gen_frame.pack(side=tk.LEFT, padx=4, pady=2)
+        gen_sql_btn = ttk.Button(gen_frame, text="Generate SQL", command=self.generate_sql_from_nl)
+        gen_sql_btn.pack(fill=tk.X)
+        self.stop_gen_btn = ttk.Button(gen_frame, text="⏹ Stop", command=self.stop_generation,
+                                       state=tk.DISABLED)
+        self.stop_gen_btn.pack(fill=tk.X, pady=(2, 0))
+        self.use_generation_cache = tk.BooleanVar(value=True)
+        ttk.Checkbutton(gen_frame, text="Use cache", variable=self.use_generation_cache).pack(anchor="w")
+        self.cached_badge = ttk.Label(gen_frame, text="⚡ cached", foreground="#FFD43B")
 
         # SQL Query Frame – now taller & resizable
         sql_frame = ttk.LabelFrame(right_frame, text="🛠 SQL Query", padding=4)
@@ -85,48 +152,106 @@ class HomeWindow(tk.Frame):
             undo=True
         )
         self.query_entry.pack(side=tk.LEFT, padx=3, pady=3, fill=tk.BOTH, expand=True)
-        run_btn = ttk.Button(sql_frame, text="Run Query", command=self.run_query)
-        run_btn.pack(side=tk.LEFT, padx=4, pady=3)
-
-        # Export buttons (tightened)
-        export_frame = ttk.Frame(right_frame)
-        export_frame.pack(fill=tk.X, pady=(0, 2), padx=4)
-        ttk.Button(export_frame, text="💾 Export CSV", command=lambda: self.export_data("csv")).pack(side=tk.LEFT, padx=3)
-        ttk.Button(export_frame, text="📊 Export Excel", command=lambda: self.export_data("excel")).pack(side=tk.LEFT, padx=3)
+        run_frame = ttk.Frame(sql_frame)
+        run_frame.pack(side=tk.LEFT, padx=4, pady=3, anchor="n")
+        run_btn = ttk.Button(run_frame, text="Run Query", command=self.run_query)
+        run_btn.pack(fill=tk.X)
+        self.cancel_query_btn = ttk.Button(run_frame, text="⏹ Cancel", command=self.cancel_query,
+                                           state=tk.DISABLED)
+        self.cancel_query_btn.pack(fill=tk.X, pady=(2, 0))
+        # Planner estimate of the query about to run (cost guard)
+        self.estimate_var = tk.StringVar()
+        self.estimate_label = ttk.Label(run_frame, textvariable=self.estimate_var)
+        self.estimate_label.pack(anchor="w")
+        # Unticked: always hit the database (the fresh result still refreshes the cache)
+        self.use_result_cache = tk.BooleanVar(value=True)
+        ttk.Checkbutton(run_frame, text="Use cache", variable=self.use_result_cache).pack(anchor="w")
+        # Ticked: show the first PREVIEW_ROWS rows at once and count the rest in the background
+        self.preview_mode = tk.BooleanVar(value=bool(PREVIEW_ROWS))
+        ttk.Checkbutton(run_frame, text=f"Preview ({PREVIEW_ROWS:,} rows)", variable=self.preview_mode,
+                        state=tk.NORMAL if PREVIEW_ROWS else tk.DISABLED).pack(anchor="w")
+        self.fetch_all_btn = ttk.Button(run_frame, text="⬇ Fetch all", command=self.fetch_all_results,
+                                        state=tk.DISABLED)
+        self.fetch_all_btn.pack(fill=tk.X, pady=(2, 0))
+        self.preview_var = tk.StringVar()
+        ttk.Label(run_frame, textvariable=self.preview_var, foreground="#9CDCFE").pack(anchor="w")
+
+        # Export buttons (tightened) + progress
+        self.export_tools = ExportToolsFrame(right_frame, on_export=self.export_data)
+        self.export_tools.pack(fill=tk.X, pady=(0, 2), padx=4)
 
         # Results Section (fills remaining space)
         results_frame = ttk.LabelFrame(right_frame, text="📋 Query Results", padding=4)
         results_frame.pack(fill=tk.BOTH, expand=True, pady=(1, 1), padx=4)
-
-        self.results_table = ttk.Treeview(results_frame)
-        self.results_table.pack(fill=tk.BOTH, expand=True)
-
-        vsb = ttk.Scrollbar(results_frame, orient="vertical", command=self.results_table.yview)
-        hsb = ttk.Scrollbar(results_frame, orient="horizontal", command=self.results_table.xview)
-        self.results_table.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        vsb.pack(side="right", fill="y")
-        hsb.pack(side="bottom", fill="x")
+        self.results_frame = results_frame
+
+        # Sort by clicking a header, filter here; neither re-runs the query
+        self.filter_bar = FilterBar(results_frame, on_apply=self.filter_results,
+                                    on_clear=self.clear_result_filters)
+        self.filter_bar.pack(fill=tk.X, pady=(0, 3))
+
+        # Virtual grid: only the visible rows exist as Treeview items
+        self.results_grid = VirtualResultGrid(results_frame)
+        self.results_grid.pack(fill=tk.BOTH, expand=True)
+        self.results_grid.on_heading = self.sort_results
+        self.results_table = self.results_grid.tree
+        self.results_table.tag_configure("edited", background="#5C4A00")
+
+        # Unsaved inline edits (only shown while there are some)
+        self.edit_bar = ttk.Frame(results_frame)
+        self.edit_status = tk.StringVar()
+        ttk.Label(self.edit_bar, textvariable=self.edit_status).pack(side=tk.LEFT)
+        ttk.Button(self.edit_bar, text="↩ Discard", command=self.discard_edits).pack(side=tk.RIGHT, padx=(4, 0))
+        ttk.Button(self.edit_bar, text="💾 Save changes", command=self.save_edits).pack(side=tk.RIGHT)
 
         self.pack(fill=tk.BOTH, expand=True)
 
             
             
-    def load_schema(self):
-        schema = self.db_connector.get_schema()
-        for table, columns in schema.items():
-            table_id = self.schema_tree.insert("", tk.END, text=table, open=True)
-            for col in columns:
-                self.schema_tree.insert(table_id, tk.END, text=col)
+    def update_job_status(self, jobs):
+        """Reflect running background jobs in the status bar."""
+        if jobs:
+            self.status_var.set(" | ".join(f"⏳ {job.message}" for job in jobs))
+            self.cancel_jobs_btn.config(state=tk.NORMAL)
+            self.job_progress.start(15)
+        else:
+            self.status_var.set(self.idle_status)
+            self.cancel_jobs_btn.config(state=tk.DISABLED)
+            self.job_progress.stop()
+
+    def on_close(self):
+        if not self.confirm_discard_edits():
+            return
+        self.jobs.shutdown()
+        self.ollama.close()
+        self.result_cache.clear()
+        for store in [self.result_store, *self.export_stores]:
+            if isinstance(store, SpillStore):
+                store.close()
+        self.db_connector.close()
+        self.master.destroy()
+
+    def load_schema(self, refresh=False):
+        self.jobs.submit(
+            "Loading schema",
+            lambda job: self._load_schema(refresh),
+            on_done=self.populate_schema_tree,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load schema: {e}"),
+        )
+
+    def _load_schema(self, refresh=False):
+        """Fetch (or reuse) the schema, its prompt index and the sidebar's name search. Worker thread."""
+        schema = self.generator.load_schema(refresh)
+        return schema, SchemaSearch(schema)
+
+    def populate_schema_tree(self, result):
+        schema, search = result
+        self.schema_sidebar.show(schema, search)
 
     # The rest of your methods (generate_sql_from_nl, run_query, etc.) remain unchanged.
     # ...
 
     def generate_sql_from_nl(self):
-        # Step 1: Check connection before doing anything
-        if not self.check_ollama_connection():
-            messagebox.showerror("Error", "Ollama server is not reachable.")
-            return
-
         # nl_query = self.nl_entry.get().strip()
         nl_query = self.nl_entry.get("1.0", "end-1c").strip()
 
@@ -136,165 +261,110 @@ class HomeWindow(tk.Frame):
             logger.warning("No NL query entered.")
             return
 
-        schema_text = self.format_schema_for_prompt()
-        prompt = f"""
-    You are a SQL generator.
-    Given the following database schema:
-    {schema_text}
-
-    And this request in natural language:
-    {nl_query}
-
-    Return ONLY a valid JSON object in this exact format:
-    {{"sql": "SELECT ..."}}
-    Do not include any explanations or extra text.
-        """.strip()
-        logger.debug(f"Prompt sent to Ollama: {prompt}")
-
-        try:
-            # Step 2: Stream response for safety
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={"model": "llama3", "prompt": prompt, "stream": True},
-                timeout=30,
-                stream=True
-            )
-            logger.info(f"Ollama HTTP status: {response.status_code}")
-            response.raise_for_status()
-
-            # Step 3: Accumulate chunks
-            raw_text_accumulated = ""
-            for line in response.iter_lines(decode_unicode=True):
-                if line:
-                    try:
-                        obj = json.loads(line)
-                        if "response" in obj:
-                            raw_text_accumulated += obj["response"]
-                    except json.JSONDecodeError:
-                        logger.warning(f"Non-JSON line in Ollama stream: {line}")
-
-            logger.debug(f"Accumulated Ollama text: {raw_text_accumulated}")
-
-            # Step 4: Extract JSON from raw text
-            match = re.search(r"\{.*\}", raw_text_accumulated, re.S)
-            if not match:
-                raise ValueError("No JSON object found in LLM response")
-
-            json_str = match.group(0)
-            data = json.loads(json_str)
-
-            if "sql" not in data:
-                raise ValueError("No 'sql' key in LLM JSON output")
+        self.cached_badge.pack_forget()
+        if self.generation_job is not None:
+            self.generation_job.cancel()
+        metrics = Metrics("generate", model=self.ollama.model)
+        job = self.jobs.submit(
+            "Generating SQL",
+            self._generate_sql,
+            nl_query,
+            self.use_generation_cache.get(),
+            metrics,
+            on_progress=lambda partial_sql: self._show_partial_sql(job, partial_sql, metrics),
+            on_done=lambda result: self._finish_generation(job, result, metrics=metrics),
+            on_error=lambda e: self._finish_generation(job, error=e, metrics=metrics),
+            on_cancel=lambda: self._finish_generation(job, cancelled=True, metrics=metrics),
+        )
+        self.generation_job = job
+        self.stop_gen_btn.config(state=tk.NORMAL)
 
-            # Step 5: Clean & validate SQL
-            sql_generated = data["sql"].strip()
-            sql_generated = sql_generated.rstrip(';') + ';'  # Ensure single semicolon
-            if not sql_generated.lower().startswith("select"):
-                raise ValueError(f"Unexpected SQL output: {sql_generated}")
+    def stop_generation(self):
+        """Abort the Ollama stream of the running generation."""
+        if self.generation_job is not None:
+            self.generation_job.cancel()
 
-            logger.info(f"Generated SQL: {sql_generated}")
+    def _generate_sql(self, job, nl_query, use_cache=True, metrics=None):
+        """Ask Ollama for SQL. Runs on a worker thread, so no Tk calls in here."""
+        return self.generator.generate(job, nl_query, use_cache, metrics)
 
-            # Step 6: Update GUI
+    def _show_partial_sql(self, job, partial_sql, metrics):
+        if job is not self.generation_job:
+            return
+        with metrics.stage("render"):
             self.query_entry.delete("1.0", tk.END)
-            self.query_entry.insert("1.0", sql_generated)
-
-        except Exception as e:
-            logger.exception("Error during SQL generation")
-            messagebox.showerror("Error", f"Failed to generate SQL: {e}")
+            self.query_entry.insert("1.0", partial_sql)
+            self.query_entry.see(tk.END)
 
-
-    def check_ollama_connection(self):
-        """Check if Ollama server is reachable."""
-        try:
-            r = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            if r.status_code == 200:
-                logger.info("✅ Ollama server is reachable.")
-                return True
-            else:
-                logger.error(f"❌ Ollama connection failed: HTTP {r.status_code}")
-                return False
-        except Exception as e:
-            logger.error(f"❌ Ollama connection error: {e}")
-            return False
-
-    def generate_sql_from_nl(self):
-        # nl_query = self.nl_entry.get().strip()
-        nl_query = self.nl_entry.get("1.0", "end-1c").strip()
-
-        logger.info(f"User NL query: {nl_query}")
-        if not nl_query:
-            messagebox.showwarning("Warning", "Please enter a natural language query.")
-            logger.warning("No NL query entered.")
+    def _finish_generation(self, job, result=None, error=None, cancelled=False, metrics=None):
+        if job is not self.generation_job:
+            return
+        self.generation_job = None
+        self.stop_gen_btn.config(state=tk.DISABLED)
+        if error is not None:
+            self.record_metrics(metrics, "error")
+            messagebox.showerror("Error", f"Failed to generate SQL: {error}")
+        elif cancelled:
+            self.record_metrics(metrics, "cancelled")
+            self.idle_status = "SQL generation stopped"
+            self.update_job_status(self.jobs.running())
+        else:
+            with metrics.stage("render"):
+                self._show_generated_sql(result)
+            self.record_metrics(metrics)
+
+    def record_metrics(self, metrics, status="ok"):
+        """Close ``metrics``, show its breakdown in the status bar and append it to the metrics file."""
+        metrics.finish(status)
+        metrics.emit()
+        self.metrics_var.set(metrics.summary())
+
+    def _show_generated_sql(self, result):
+        sql_generated, stats = result
+        # Step 6: Update GUI
+        self.query_entry.delete("1.0", tk.END)
+        self.query_entry.insert("1.0", sql_generated)
+        if GUARD_ENABLED and self.estimate_job is None and self.is_read_only(sql_generated):
+            # Not while a Run is waiting for its own estimate: that one must get through
+            self.estimate_query(sql_generated)
+
+        if stats["cached"]:
+            self.cached_badge.pack(anchor="w")
+            self.idle_status = "SQL loaded from generation cache"
+            self.update_job_status(self.jobs.running())
             return
 
-        schema_text = self.format_schema_for_prompt()
-        prompt = f"""
-You are a SQL generator.
-Given the following database schema:
-{schema_text}
-
-And this request in natural language:
-{nl_query}
-
-Return ONLY a valid JSON object in this exact format:
-{{"sql": "SELECT ..."}}
-Do not include any explanations or extra text.
-        """.strip()
-        logger.debug(f"Prompt sent to Ollama: {prompt}")
-        try:
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={"model": "llama3", "prompt": prompt},
-                timeout=20
-            )
-            
-            logger.info(f"Ollama HTTP status: {response.status_code}")
-            logger.debug(f"Ollama raw response text: {response.text}")
-
-            response.raise_for_status()
-
-            # Handle streaming JSON lines from Ollama
-            raw_text_accumulated = ""
-            for line in response.text.splitlines():
-                if not line.strip():
-                    continue
-                try:
-                    chunk = json.loads(line)
-                    if "response" in chunk:
-                        raw_text_accumulated += chunk["response"]
-                except json.JSONDecodeError:
-                    logger.warning(f"Skipping invalid JSON line: {line}")
-
-            # Now find the JSON object inside the accumulated string
-            match = re.search(r"\{.*\}", raw_text_accumulated, re.S)
-            if not match:
-                raise ValueError("No JSON object found in LLM response")
-
-            json_str = match.group(0)
-            data = json.loads(json_str)
-
-            if "sql" not in data:
-                raise ValueError("No 'sql' key in LLM JSON output")
-
-            sql_generated = data["sql"].strip()
-            logger.info(f"Generated SQL: {sql_generated}")
-            self.query_entry.delete("1.0", tk.END)
-            self.query_entry.insert("1.0", sql_generated)
+        status = (f"Prompt: ~{stats['tokens_sent']:,} tokens "
+                  f"(full schema ~{stats['tokens_full']:,}; "
+                  f"{stats['tables_sent']}/{stats['tables_total']} tables)")
+        if "seconds_saved" in stats:
+            status += f" · ~{stats['seconds_saved']:.1f}s prompt time saved"
+        if "ttft_seconds" in stats:
+            status += f" · first token {stats['ttft_seconds']:.2f}s"
+        status += f" · generated in {stats['generation_seconds']:.2f}s"
+        if "candidates" in stats:
+            # Speculative generation: compare with retrying one candidate at a time
+            status += (f" · candidate {stats['candidate_index']}/{stats['candidates']}, "
+                       f"{stats['candidates_rejected']} rejected (one at a time ≈{stats['sequential_seconds']:.2f}s)")
+        logger.info(status)
+        self.idle_status = status
+        self.update_job_status(self.jobs.running())
 
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate SQL: {e}")
-            messagebox.showerror("Error", f"Failed to generate SQL: {e}")
+    def check_ollama_connection(self):
+        """Check if Ollama server is reachable (cached; see OllamaClient.is_healthy)."""
+        return self.ollama.is_healthy()
 
-    def format_schema_for_prompt(self):
-        schema = self.db_connector.get_schema()
-        return "\n".join([f"{table}: {', '.join(cols)}" for table, cols in schema.items()])
+    def format_schema_for_prompt(self, nl_query):
+        """Returns (schema_text, stats) with only the tables relevant to ``nl_query``."""
+        return self.generator.prompt_schema(nl_query)
 
    
     
     
-    def run_query(self):
-        sql = self.query_entry.get("1.0", "end-1c").strip()  # Correct ScrolledText get()
+    def run_query(self, sql=None, fetch_all=False):
+        if sql is None:
+            sql = self.query_entry.get("1.0", "end-1c").strip()  # Correct ScrolledText get()
         if not sql:
             messagebox.showwarning("Warning", "Please enter or generate a SQL query.")
             return
@@ -302,26 +372,492 @@ Do not include any explanations or extra text.
             messagebox.showerror("Error", "Only SELECT queries are allowed.")
             return
 
-        try:
-            df = self.db_connector.execute_query(sql)
-            if df.empty:
-                messagebox.showinfo("Result", "Query executed successfully, but no data returned.")
+        if not self.confirm_discard_edits():
+            return
+        if not GUARD_ENABLED:
+            self._start_query(sql, fetch_all)
+            return
+        self.estimate_query(sql, then=lambda estimate: self._guard_query(sql, fetch_all, estimate))
+
+    def _guard_query(self, sql, fetch_all, estimate):
+        """Run, preview or ask first, depending on which GUARD_* threshold the estimate reaches."""
+        level = estimate.level if estimate is not None else None
+        preview = False
+        if level == "preview" and PREVIEW_ROWS and not fetch_all:
+            preview = True
+        elif level in ("preview", "confirm"):
+            question = f"The database expects {estimate.describe()} for this query."
+            if PREVIEW_ROWS:
+                answer = messagebox.askyesnocancel(
+                    "Expensive query", f"{question}\n\nYes: run it\nNo: only preview the first "
+                                       f"{PREVIEW_ROWS:,} rows\nCancel: don't run it")
+                if answer is None:
+                    return
+                preview = not answer
+            elif not messagebox.askyesno("Expensive query", f"{question}\n\nRun it anyway?"):
                 return
+        if preview:
+            logger.info(f"Cost guard: previewing a query estimated at {estimate.describe()}")
+        self._start_query(sql, fetch_all, preview, estimate)
+
+    def _start_query(self, sql, fetch_all=False, force_preview=False, estimate=None):
+        # Only one result set is on screen at a time
+        if self.query_job is not None:
+            self.query_job.cancel()
+        self._stop_count()
+        self.edit_buffer = None
+        self._update_edit_bar()
+        replaced, self.result_store = self.result_store, ResultStore()
+        self.result_view = ResultView(self.result_store)
+        self._retire_store(replaced)
+        self.preview_sql = None
+        if (self.preview_mode.get() or force_preview) and PREVIEW_ROWS and not fetch_all:
+            limited = limit_sql(sql, PREVIEW_ROWS)
+            if limited is not None:     # None: the statement's own LIMIT is already small
+                self.preview_sql, sql = sql, limited
+        self.result_sql, self.result_complete = sql, False
+        self.set_results_title("📋 Query Results")
+        metrics = Metrics("query", source=self.db_connector.label, preview=self.preview_sql is not None)
+        job = self.jobs.submit(
+            "Running query",
+            self._stream_query,
+            sql, self.use_result_cache.get(), metrics,
+            on_progress=lambda chunk: self._show_result_chunk(job, sql, chunk, metrics),
+            on_done=lambda summary: self._finish_query_result(job, summary, metrics),
+            on_error=lambda e: self._fail_query_result(job, e, metrics),
+            on_cancel=lambda: self._cancel_query_result(job, metrics),
+        )
+        self.query_job = job
+        self.cancel_query_btn.config(state=tk.NORMAL)
+        if self.preview_sql is None:
+            return
+        if estimate is not None and estimate.level in ("preview", "confirm"):
+            # Counting would scan as much as the full query: go by the estimate
+            self.preview_var.set(f"Total {estimate.describe()}")
+            self.fetch_all_btn.config(state=tk.NORMAL)
+            return
+        self._count_rows(self.preview_sql)
+
+    def fetch_all_results(self):
+        """Re-run the previewed statement without the LIMIT."""
+        if self.preview_sql is not None:
+            self.run_query(self.preview_sql, fetch_all=True)
+
+    # ───── Cost guard ─────
+    def estimate_query(self, sql, then=None):
+        """EXPLAIN ``sql`` in the background and show the estimate next to Run; then ``then(estimate)``."""
+        if self.estimate_job is not None:
+            self.estimate_job.cancel()
+        self.estimate_var.set("Estimating…")
+        self.estimate_label.config(foreground="white")
+        job = self.jobs.submit(
+            "Estimating cost",
+            lambda job: self.db_connector.explain(sql),
+            on_done=lambda estimate: self._show_estimate(job, estimate, then),
+            on_error=lambda e: self._fail_estimate(job, e, then),
+        )
+        self.estimate_job = job
+
+    def _show_estimate(self, job, estimate, then):
+        if job is not self.estimate_job:
+            return
+        self.estimate_job = None
+        if estimate is None:
+            self.estimate_var.set("No estimate")
+        else:
+            colors = {None: "#6A9955", "warn": "#DCDCAA", "preview": "#CE9178", "confirm": "#F44747"}
+            self.estimate_var.set(("⚠ " if estimate.level else "") + estimate.describe())
+            self.estimate_label.config(foreground=colors[estimate.level])
+        if then is not None:
+            then(estimate)
+
+    def _fail_estimate(self, job, error, then):
+        if job is not self.estimate_job:
+            return
+        self.estimate_job = None
+        # Never block a query on EXPLAIN itself failing (timeout, unsupported syntax…)
+        logger.warning(f"EXPLAIN failed; running without a cost check: {error}")
+        self.estimate_var.set("No estimate")
+        if then is not None:
+            then(None)
+
+    # ───── Preview total ─────
+    def _count_rows(self, sql):
+        """COUNT(*) of the previewed statement, in the background next to the preview itself."""
+        self.preview_total = None
+        self.preview_var.set("Counting rows…")
+        job = self.jobs.submit(
+            "Counting rows",
+            lambda job: self.db_connector.count_rows(sql, cancel_hook=job.add_cancel_callback),
+            on_done=lambda total: self._show_row_count(job, total),
+            on_error=lambda e: self._fail_row_count(job, e),
+        )
+        self.count_job = job
+
+    def _stop_count(self):
+        if self.count_job is not None:
+            self.count_job.cancel()
+            self.count_job = None
+        self.preview_total = None
+        self.preview_var.set("")
+        self.fetch_all_btn.config(state=tk.DISABLED)
+
+    def _show_row_count(self, job, total):
+        if job is not self.count_job:
+            return
+        self.count_job = None
+        self.preview_total = total
+        logger.info(f"Previewed statement returns {total:,} rows")
+        self._update_preview()
+
+    def _fail_row_count(self, job, error):
+        if job is not self.count_job:
+            return
+        self.count_job = None
+        logger.warning(f"Could not count rows of the previewed statement: {error}")
+        self.preview_var.set("Total unknown")
+        self.fetch_all_btn.config(state=tk.NORMAL)
+
+    def _update_preview(self):
+        """Once the preview and its count are both in: offer Fetch all, or adopt the preview as the full result."""
+        if self.preview_sql is None or self.query_job is not None or self.preview_total is None:
+            return
+        shown, total = len(self.result_store), self.preview_total
+        if total > shown:
+            self.preview_var.set(f"{shown:,} of {total:,} rows")
+            self.fetch_all_btn.config(state=tk.NORMAL)
+            return
+        # The preview already holds every row: exports can reuse it, nothing to fetch
+        self.preview_var.set(f"All {total:,} rows")
+        self.result_sql, self.preview_sql = self.preview_sql, None
+
+    def cancel_query(self):
+        """Stop the running query on the server, not just the fetch loop."""
+        if self.query_job is not None:
+            self.query_job.cancel()
+
+    def result_cache_key(self, sql):
+        """Same SQL against the same database as the same user -> same result."""
+        connector = self.db_connector
+        return ResultCache.make_key(sql, connector.identity + (connector.username,))
+
+    def _stream_query(self, job, sql, use_cache=True, metrics=None):
+        """
+        Fetch the result chunk by chunk (worker thread). Past MAX_RESULT_ROWS or
+        SPILL_AFTER_MB the rows move to a SpillStore on disk, capped at SPILL_MAX_MB.
+        Returns (rows, truncated, from_cache, compacted store or None).
+        """
+        metrics = metrics if metrics is not None else Metrics("query")
+        key = self.result_cache_key(sql)
+        with metrics.stage("cache"):
+            cached = self.result_cache.get(key) if use_cache else None
+        if cached is not None:
+            logger.info(f"Result cache hit: {len(cached):,} rows")
+            metrics.fields["cached"] = True
+            metrics.count("rows", len(cached))
+            for chunk in cached.iter_chunks():
+                job.check_cancelled()
+                job.report(chunk, message="Loading cached result…")
+            return len(cached), False, True, None
+
+        total, truncated = 0, False
+        fetched = ResultStore()
+        may_spill = bool(SPILL_AFTER_MB)
+        rows_iter = self.db_connector.iter_rows(sql, cancel_hook=job.add_cancel_callback)
+        try:
+            # "execute" is the wait for the first rows, "fetch" the wait for the rest
+            for columns, rows in metrics.timed(rows_iter, "fetch", first="execute"):
+                job.check_cancelled()
+                if may_spill and (total >= MAX_RESULT_ROWS
+                                  or metrics.counters.get("bytes", 0) >= SPILL_AFTER_MB * MB):
+                    may_spill = False
+                    fetched = self._spill_result(job, fetched, metrics)
+                spilled = isinstance(fetched, SpillStore)
+                if not spilled and total >= MAX_RESULT_ROWS:
+                    truncated = True
+                    break
+                with metrics.stage("frame"):
+                    chunk = pd.DataFrame.from_records(rows if spilled else rows[:MAX_RESULT_ROWS - total],
+                                                      columns=columns)
+                metrics.count("bytes", int(chunk.memory_usage(deep=True).sum()))
+                if spilled:
+                    try:
+                        with metrics.stage("spill"):
+                            fetched.append(chunk)
+                    except SpillFull as e:
+                        logger.warning(f"{e}; keeping the first {total:,} rows")
+                        truncated = True
+                        break
+                    except ValueError:
+                        job.check_cancelled()   # closed by the UI after a newer query replaced this one
+                        raise
+                    total += len(chunk)
+                    # The UI reads the spill store directly; the report just tells it to redraw
+                    job.report(fetched, message=f"Fetching rows… {total:,} (on disk)")
+                    continue
+                total += len(chunk)
+                fetched.append(chunk)
+                job.report(chunk, message=f"Fetching rows… {total:,}")
+        finally:
+            rows_iter.close()
+            if isinstance(fetched, SpillStore):
+                fetched.finish()
+        metrics.count("rows", total)
+        if isinstance(fetched, SpillStore):
+            metrics.count("spill_bytes", fetched.nbytes())
+            # Already columnar on disk; too large for the result cache anyway
+            return total, truncated, False, None
+        compacted = None
+        if COMPACT_RESULTS and total:
+            job.report(message="Compacting result…")
+            with metrics.stage("compact"):
+                compacted, _, after = compact_store(fetched, before=metrics.counters.get("bytes"))
+            metrics.count("compact_bytes", after)
+            fetched = compacted
+        if not truncated:
+            # Only complete results are cached; a truncated one would answer an export wrongly
+            with metrics.stage("cache"):
+                self.result_cache.put(key, fetched)
+        return total, truncated, False, compacted
+
+    def _spill_result(self, job, fetched, metrics):
+        """The rows fetched so far, moved to a SpillStore if they fit under SPILL_MAX_MB (worker thread)."""
+        job.report(message=f"Moving {len(fetched):,} rows to disk…")
+        spill = SpillStore(fetched.columns)
+        with metrics.stage("spill"):
+            try:
+                for chunk in fetched.iter_chunks():
+                    spill.append(chunk)
+            except SpillFull as e:
+                logger.warning(f"{e}; keeping the result in memory")
+                spill.close()
+                return fetched
+        logger.info(f"Result passed {len(fetched):,} rows in memory; continuing on disk in {spill.path}")
+        # From here the UI owns the spill and closes it when it is no longer needed
+        job.report(spill, message=f"Fetching rows… {len(spill):,} (on disk)")
+        return spill
+
+    def _show_result_chunk(self, job, sql, chunk, metrics):
+        if job is not self.query_job:
+            # A newer query has replaced this one
+            if isinstance(chunk, SpillStore):
+                self._retire_store(chunk)
+            return
+        with metrics.stage("render"):
+            if isinstance(chunk, SpillStore):
+                self._use_spilled(chunk)
+            else:
+                self._append_result_chunk(sql, chunk)
 
-            # Try to extract table name from SQL for editing
-            table_name = None
-            primary_key_col = None
-            tokens = sql.lower().split()
-            if "from" in tokens:
-                table_name = tokens[tokens.index("from") + 1]
-                # You can set your own PK here
-                primary_key_col = "id"  # change if needed
+    def _use_spilled(self, spill):
+        """The fetch moved to disk: read the rows from there, keeping edits made meanwhile."""
+        if spill is self.result_store:
+            self.results_grid.refresh()
+            return
+        store, buffer = self.result_store, self.edit_buffer
+        for position, column, _ in (buffer.originals() if buffer else []):
+            if position < len(spill):
+                spill.set_value(position, column, store.value(position, column))
+        self.result_store = spill
+        self.result_view = ResultView(spill)
+        self.results_grid.swap_source(spill)
+
+    def _retire_store(self, store):
+        """Delete the files of a SpillStore no longer on screen, unless an export still reads it."""
+        if (isinstance(store, SpillStore) and store is not self.result_store
+                and store not in self.export_stores):
+            store.close()
+
+    def _append_result_chunk(self, sql, chunk):
+        first_chunk = len(self.result_store) == 0
+        self.result_store.append(chunk)
+        if not first_chunk:
+            self.results_grid.refresh()
+            return
 
-            self.display_results(df, table_name, primary_key_col)
+        self.display_results(self.result_store)
+        # Editing needs the table's real primary key, read from the catalog
+        table_name = self.edit_target(sql)
+        if table_name:
+            store = self.result_store
+            self.jobs.submit(
+                "Reading primary key",
+                lambda job: self.primary_key(table_name),
+                on_done=lambda key_columns: self._enable_editing(store, sql, table_name, key_columns),
+                on_error=lambda e: logger.warning(f"Inline editing disabled for {table_name}: {e}"),
+            )
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to run query: {e}")
+    @staticmethod
+    def edit_target(sql):
+        """The table a result maps onto row for row, or None (joins, grouping, subqueries)."""
+        return single_table(sql)
+
+    def primary_key(self, table_name):
+        """Primary-key columns of ``table_name``: from the loaded schema, else the catalog (cached; worker thread)."""
+        table = self.generator.schema.table(table_name) if self.generator.schema is not None else None
+        if table is not None:
+            return table.primary_key
+        if table_name not in self.primary_keys:
+            self.primary_keys[table_name] = self.db_connector.get_primary_key(table_name)
+        return self.primary_keys[table_name]
+
+    def _enable_editing(self, store, sql, table_name, key_columns):
+        if store is not self.result_store:
+            return
+        if not key_columns:
+            logger.info(f"{table_name} has no primary key; inline editing disabled")
+            return
+        if SOURCE_COLUMN in store.columns:
+            # Edits would have to commit on several servers at once; there is no atomic way to do that
+            logger.info("Inline editing disabled for results merged from several databases")
+            return
+        missing = [c for c in key_columns if c not in store.columns]
+        if missing:
+            logger.info(f"Result lacks key column(s) {missing} of {table_name}; inline editing disabled")
+            return
+        self._bind_inline_edit(store, sql, table_name, key_columns)
 
+    def _finish_query_result(self, job, summary, metrics):
+        if job is not self.query_job:
+            return
+        self.query_job = None
+        self.cancel_query_btn.config(state=tk.DISABLED)
+        total, truncated, from_cache, compacted = summary
+        metrics.fields["truncated"] = truncated
+        if compacted is not None:
+            self._use_compacted(compacted)
+        self.record_metrics(metrics)
+        self.result_complete = not truncated
+        self.idle_status = self.result_cache.summary()
+        self.status_var.set(self.idle_status)
+        logger.info(self.idle_status)
+        if self.preview_sql is not None:
+            if total < PREVIEW_ROWS:
+                # Fewer rows than the LIMIT: this is the whole result
+                self._stop_count()
+                self.result_sql, self.preview_sql = self.preview_sql, None
+            else:
+                self._update_preview()
+        if total == 0:
+            messagebox.showinfo("Result", "Query executed successfully, but no data returned.")
+            return
+        note = f" (first {total:,} rows shown)" if truncated else ""
+        if from_cache:
+            note += " ⚡ cached"
+        self.set_results_title(f"📋 Query Results — {total:,} rows{note}")
+
+    def _use_compacted(self, compacted):
+        """Show the compacted chunks instead of the fetched ones, keeping edits made meanwhile."""
+        store, buffer = self.result_store, self.edit_buffer
+        if len(compacted) != len(store):
+            logger.warning("Compacted result does not match the rows on screen; keeping the original")
+            return
+        edited = [(p, c, store.value(p, c)) for p, c, _ in buffer.originals()] if buffer else []
+        store.replace_chunks(compacted.chunks)
+        for position, column, value in edited:
+            store.set_value(position, column, value)
+        if edited:
+            # The cached copy shares these chunks and now holds unsaved values
+            self.result_cache.invalidate(self.result_cache_key(self.result_sql))
+        self.result_view.invalidate()
+        self.results_grid.refresh()
+
+    def _fail_query_result(self, job, error, metrics):
+        if job is self.query_job:
+            self.query_job = None
+            self.cancel_query_btn.config(state=tk.DISABLED)
+            self._stop_count()
+        self.record_metrics(metrics, "timeout" if isinstance(error, QueryTimeout) else "error")
+        if isinstance(error, QueryTimeout):
+            messagebox.showerror("Timeout", str(error))
+            return
+        messagebox.showerror("Error", f"Failed to run query: {error}")
+
+    def _cancel_query_result(self, job, metrics):
+        if job is not self.query_job:
+            metrics.finish("cancelled").emit()   # replaced by a newer query; keep the status bar for that one
+            return
+        self.record_metrics(metrics, "cancelled")
+        self.query_job = None
+        self.cancel_query_btn.config(state=tk.DISABLED)
+        self._stop_count()
+        rows = len(self.result_store)
+        self.set_results_title(f"📋 Query Results — cancelled after {rows:,} rows")
+
+
+    def set_results_title(self, title):
+        self.results_title = title
+        self.results_frame.config(text=title)
+
+    # ───── Client-side sort / filter ─────
+    def view_ready(self):
+        if self.query_job is not None:
+            self.status_var.set("Sorting and filtering are available once the query has finished")
+            return False
+        return len(self.result_store) > 0
+
+    def sort_results(self, column_index):
+        """Header click: ascending, then descending, then back to the query's own order."""
+        if not self.view_ready():
+            return
+        view = self.result_view
+        if view.sort is None or view.sort[0] != column_index:
+            view.sort = (column_index, True)
+        elif view.sort[1]:
+            view.sort = (column_index, False)
+        else:
+            view.sort = None
+        self._apply_view()
+
+    def filter_results(self, column_index, op, text):
+        if not self.view_ready():
+            return
+        filters = self.result_view.filters
+        previous = dict(filters)
+        if text:
+            filters[column_index] = (op, text)
+        else:
+            filters.pop(column_index, None)
+        self._apply_view(previous)
+
+    def clear_result_filters(self):
+        if self.result_view.filters and self.view_ready():
+            self.result_view.filters.clear()
+            self._apply_view()
+
+    def _apply_view(self, previous_filters=None):
+        """Recompute the display order on a worker; only the visible rows are redrawn."""
+        if self.view_job is not None:
+            self.view_job.cancel()
+        view = self.result_view
+        metrics = Metrics("view", rows=len(view.store))
+        job = self.jobs.submit(
+            "Sorting / filtering results",
+            lambda job: view.order(metrics),
+            on_done=lambda order: self._show_view(job, view, order, metrics),
+            on_error=lambda e: self._fail_view(job, view, e, previous_filters, metrics),
+        )
+        self.view_job = job
+
+    def _show_view(self, job, view, order, metrics):
+        if job is not self.view_job or view is not self.result_view:
+            return
+        self.view_job = None
+        self.results_grid.set_order(order, view.sort)
+        self.filter_bar.summary_var.set(view.describe())
+        title = self.results_title
+        if view.filters:
+            title += f" · {len(order):,} match"
+        self.results_frame.config(text=title)
+        self.record_metrics(metrics)
+
+    def _fail_view(self, job, view, error, previous_filters, metrics):
+        if job is self.view_job:
+            self.view_job = None
+        if previous_filters is not None:
+            view.filters = previous_filters    # drop the filter that failed
+        self.record_metrics(metrics, "error")
+        messagebox.showwarning("Filter", str(error))
 
     def is_read_only(self, sql):
         parsed = sqlparse.parse(sql)
@@ -333,32 +869,16 @@ Do not include any explanations or extra text.
   
    
 
-    def display_results(self, df, table_name=None, primary_key_col=None):
-        # Remove old results if present
-        for widget in self.results_table.winfo_children():
-            widget.destroy()
-        self.results_table.pack_forget()
-
-        # Clear existing columns
-        self.results_table["columns"] = list(df.columns)
-        self.results_table["show"] = "headings"
-        for col in df.columns:
-            self.results_table.heading(col, text=col)
-            self.results_table.column(col, minwidth=100, width=140, anchor="center")
-
-        # Remove previous data
-        for item in self.results_table.get_children():
-            self.results_table.delete(item)
-
-        # Insert rows
-        for row in df.itertuples(index=False):
-            self.results_table.insert("", tk.END, values=row)
-
-        self.results_table.pack(fill=tk.BOTH, expand=True)
+    def display_results(self, data, table_name=None, primary_key_col=None):
+        """Show a DataFrame or ResultStore in the virtual results grid."""
+        store = data if isinstance(data, ResultStore) else ResultStore.from_frame(data)
+        self.results_grid.set_source(store)
+        self.result_view = ResultView(store)
+        self.filter_bar.set_columns(store.columns)
 
         # -- Place export buttons neatly below the table --
         if not hasattr(self, "results_export_frame"):
-            self.results_export_frame = ttk.Frame(self.results_table.master)
+            self.results_export_frame = ttk.Frame(self.results_frame)
             self.results_export_frame.pack(fill=tk.X, pady=8)
 
             csv_btn = ttk.Button(self.results_export_frame, text="💾 Export CSV",
@@ -375,55 +895,106 @@ Do not include any explanations or extra text.
 
         # --- Inline editing ---
         if table_name and primary_key_col:
-            def on_double_click(event):
-                selected_item = self.results_table.selection()
-                if not selected_item:
-                    return
-                selected_item = selected_item[0]
-
-                col_index = int(self.results_table.identify_column(event.x)[1:]) - 1
-                col_name = df.columns[col_index]
-                old_value = self.results_table.item(selected_item)["values"][col_index]
-
-                new_value = simpledialog.askstring("Edit Value", f"Enter new value for {col_name}:", initialvalue=old_value)
-                if new_value is not None and new_value != old_value:
-                    self.results_table.set(selected_item, column=col_name, value=new_value)
-
-                    # Find PK value safely
-                    try:
-                        cols_lower = [c.lower() for c in df.columns]
-                        pk_index = cols_lower.index(primary_key_col.lower())
-                        pk_value = self.results_table.item(selected_item, "values")[pk_index]
-                    except ValueError:
-                        messagebox.showerror("Error", f"Primary key column '{primary_key_col}' not found in results.")
-                        return
-
-                    # Update DB
-                    update_sql = f"UPDATE {table_name} SET {col_name} = ? WHERE {primary_key_col} = ?"
-                    try:
-                        self.db_connector.execute_query(update_sql, (new_value, pk_value))
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Failed to update DB: {e}")
-
-            self.results_table.bind("<Double-1>", on_double_click)
+            key_columns = [primary_key_col] if isinstance(primary_key_col, str) else list(primary_key_col)
+            self._bind_inline_edit(store, self.result_sql, table_name, key_columns)
+        else:
+            self.results_grid.row_tags = None
+            self.results_table.unbind("<Double-1>")
+
+    def _bind_inline_edit(self, store, sql, table_name, key_columns):
+        """Double-click a cell to edit it. Edits are buffered per row until Save."""
+        table = self.generator.schema.table(table_name) if self.generator.schema is not None else None
+        table_columns = set(table.column_names) if table is not None else set()
+        buffer = EditBuffer(table_name, key_columns)
+        self.edit_buffer = buffer
+        self.results_grid.row_tags = lambda position: ("edited",) if buffer.is_dirty(position) else ()
+
+        def on_double_click(event):
+            if self.results_table.identify_region(event.x, event.y) != "cell":
+                return
+            store = self.results_grid.source   # a SpillStore once a large result moved to disk
+            position = self.results_grid.position_of(self.results_table.identify_row(event.y))
+            if position is None:
+                return
+            col_name = store.columns[int(self.results_table.identify_column(event.x)[1:]) - 1]
+            if col_name in key_columns:
+                messagebox.showwarning("Edit", f"'{col_name}' is part of the primary key and can't be edited.")
+                return
+            if table_columns and col_name not in table_columns:
+                messagebox.showwarning("Edit", f"'{col_name}' is not a column of {table_name}.")
+                return
 
-    def execute_query(self, query, params=None):
-        try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
+            old_value = store.value(position, col_name)
+            new_value = simpledialog.askstring("Edit Value", f"Enter new value for {col_name}:",
+                                               initialvalue=old_value)
+            if new_value is None or new_value == str(old_value):
+                return
+            key = tuple(store.value(position, c) for c in key_columns)
+            buffer.record(position, key, col_name, old_value, new_value)
+            # Keep the edit in the store so it survives scrolling; the cached copy no longer matches the DB
+            store.set_value(position, col_name, new_value)
+            self.result_view.invalidate()
+            self.result_cache.invalidate(self.result_cache_key(sql))
+            self.results_grid.refresh()
+            self._update_edit_bar()
+
+        self.results_table.bind("<Double-1>", on_double_click)
+
+    def _update_edit_bar(self):
+        pending = self.edit_buffer.cell_count() if self.edit_buffer else 0
+        if pending:
+            self.edit_status.set(f"✏ {pending:,} unsaved edit(s) in {len(self.edit_buffer):,} row(s) "
+                                 f"of {self.edit_buffer.table}")
+            self.edit_bar.pack(fill=tk.X, pady=(0, 4), before=self.results_grid)
+        else:
+            self.edit_bar.pack_forget()
+
+    def confirm_discard_edits(self):
+        """False if the user wants to keep unsaved edits."""
+        if not self.edit_buffer or not len(self.edit_buffer):
+            return True
+        return messagebox.askyesno("Unsaved edits",
+                                   f"Discard {self.edit_buffer.cell_count():,} unsaved edit(s)?")
+
+    def save_edits(self):
+        buffer = self.edit_buffer
+        if not buffer or not len(buffer):
+            return
+        edits = buffer.edits()
+        self.jobs.submit(
+            f"Saving {len(edits):,} row(s) to {buffer.table}",
+            lambda job: self.db_connector.apply_edits(buffer.table, buffer.key_columns, edits),
+            on_done=lambda rows: self._finish_save(buffer, edits, rows),
+            on_error=self._fail_save,
+        )
 
-            try:
-                rows = self.cursor.fetchall()
-                cols = [desc[0] for desc in self.cursor.description]
-                return pd.DataFrame(rows, columns=cols)
-            except:
-                self.connection.commit()
-                return pd.DataFrame()
+    def _finish_save(self, buffer, edits, rows):
+        buffer.mark_saved(edits)
+        # Any cached result may hold the old values of these rows
+        self.result_cache.clear()
+        if buffer is self.edit_buffer:
+            self.results_grid.refresh()
+            self._update_edit_bar()
+        messagebox.showinfo("Saved", f"Saved {rows:,} row(s) to {buffer.table}.")
+
+    def _fail_save(self, error):
+        if isinstance(error, EditConflict):
+            sample = ", ".join(str(key[0] if len(key) == 1 else key) for key in error.keys[:10])
+            messagebox.showerror("Edit conflict", f"{error}. Nothing was saved.\n\nKeys: {sample}\n\n"
+                                                  "Discard your edits and re-run the query to reload them.")
+        else:
+            messagebox.showerror("Error", f"Failed to save edits: {error}")
 
-        except Exception as e:
-            raise Exception(f"Database error: {e}")
+    def discard_edits(self):
+        buffer = self.edit_buffer
+        if not buffer:
+            return
+        for position, column, original in list(buffer.originals()):
+            self.result_store.set_value(position, column, original)
+        buffer.clear()
+        self.result_view.invalidate()
+        self.results_grid.refresh()
+        self._update_edit_bar()
 
     
     
@@ -433,20 +1004,84 @@ Do not include any explanations or extra text.
         if not sql:
             messagebox.showwarning("Warning", "Run a query before exporting.")
             return
+        filetypes = [("CSV Files", "*.csv")] if format_type == "csv" else [("Excel Files", "*.xlsx")]
+        extension = ".csv" if format_type == "csv" else ".xlsx"
+        file_path = filedialog.asksaveasfilename(defaultextension=extension, filetypes=filetypes)
+        if not file_path:
+            return
+        # Reuse the result on screen when it is the complete result of this SQL
+        store = None
+        if self.result_complete and " ".join(sql.split()) == " ".join(self.result_sql.split()):
+            store = self.result_store
+            logger.info(f"Exporting {len(store):,} held rows without re-running the query")
+            self.export_stores.append(store)
+
+        self.export_tools.start(total=len(store) if store is not None else None)
+        metrics = Metrics("export", format=format_type, held=store is not None)
+        self.jobs.submit(
+            "Exporting",
+            self._export_query,
+            sql, format_type, file_path, store, metrics,
+            on_progress=self.export_tools.update_progress,
+            on_done=lambda path: self._show_export_result(path, metrics, store),
+            on_error=lambda e: self._fail_export(file_path, e, metrics, store),
+            on_cancel=lambda: self._fail_export(file_path, metrics=metrics, store=store),
+        )
+
+    def _export_query(self, job, sql, format_type, file_path, store=None, metrics=None):
+        """Write the result to disk (worker thread). Returns the path or None."""
+        metrics = metrics if metrics is not None else Metrics("export")
+        if store is None:
+            with metrics.stage("cache"):
+                store = self.result_cache.get(self.result_cache_key(sql))
+            if store is not None:
+                logger.info(f"Exporting {len(store):,} cached rows without re-running the query")
+        if store is not None:
+            # Export exactly what is on screen, without touching the database
+            row_chunks = frame_rows(store.iter_chunks())
+        else:
+            job.report(message="Exporting: running query…")
+            row_chunks = self.db_connector.iter_rows(sql, cancel_hook=job.add_cancel_callback)
         try:
-            df = self.db_connector.execute_query(sql)
-            if df.empty:
-                messagebox.showinfo("Export", "No data to export.")
-                return
-            filetypes = [("CSV Files", "*.csv")] if format_type == "csv" else [("Excel Files", "*.xlsx")]
-            extension = ".csv" if format_type == "csv" else ".xlsx"
-            file_path = filedialog.asksaveasfilename(defaultextension=extension, filetypes=filetypes)
-            if not file_path:
-                return
-            if format_type == "csv":
-                df.to_csv(file_path, index=False)
-            else:
-                df.to_excel(file_path, index=False)
+            total = export_rows(
+                metrics.timed(row_chunks, "fetch", first="execute") if store is None else row_chunks,
+                file_path, format_type,
+                progress=lambda rows: job.report(rows, message=f"Exporting… {rows:,} rows"),
+                cancelled=lambda: job.cancelled,
+            )
+        finally:
+            row_chunks.close()
+        # Everything not spent waiting on the database went into formatting and writing the file
+        metrics.remainder("write")
+        job.check_cancelled()
+        metrics.count("rows", total)
+        if not total:
+            os.remove(file_path)
+            return None
+        metrics.count("bytes", os.path.getsize(file_path))
+        return file_path
+
+    def _release_export(self, store):
+        if store is not None:
+            self.export_stores.remove(store)
+            self._retire_store(store)
+
+    def _fail_export(self, file_path, error=None, metrics=None, store=None):
+        self._release_export(store)
+        if metrics is not None:
+            self.record_metrics(metrics, "cancelled" if error is None else "error")
+        self.export_tools.finish()
+        # Don't leave a half-written file behind
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        if error is not None:
+            messagebox.showerror("Error", f"Export failed: {error}")
+
+    def _show_export_result(self, file_path, metrics, store=None):
+        self._release_export(store)
+        self.record_metrics(metrics)
+        self.export_tools.finish()
+        if file_path is None:
+            messagebox.showinfo("Export", "No data to export.")
+        else:
             messagebox.showinfo("Export", f"Data exported successfully to {file_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Export failed: {e}")
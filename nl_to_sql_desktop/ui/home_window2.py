@@ -101,7 +101,7 @@ class HomeWindow(tk.Frame):
         self.pack(fill=tk.BOTH, expand=True)
 
     def load_schema(self):
-        schema = self.db_connector.get_schema()
+        schema = self.db_connector.get_schema().column_names()
         for table, columns in schema.items():
             table_id = self.schema_tree.insert("", tk.END, text=table)
             for col in columns:
@@ -269,7 +269,7 @@ Do not include any explanations or extra text.
             messagebox.showerror("Error", f"Failed to generate SQL: {e}")
 
     def format_schema_for_prompt(self):
-        schema = self.db_connector.get_schema()
+        schema = self.db_connector.get_schema().column_names()
         return "\n".join([f"{table}: {', '.join(cols)}" for table, cols in schema.items()])
 
    
@@ -2,8 +2,9 @@ import platform
 import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import ImageTk, Image
-from db_connector import DBConnector
-from ui.home_window import HomeWindow
+import warmup
+
+WARMUP_POLL_MS = 100
 
 
 class LoginWindow(tk.Frame):
@@ -18,6 +19,7 @@ class LoginWindow(tk.Frame):
         else:
                 self.master.attributes('-zoomed', True)  # Works on Linux
         self.pack(fill=tk.BOTH, expand=True)
+        self._warmed_driver = None
 
         # self.bg_frame = Image.open('./assets/background1.png')
         # bg_photo = ImageTk.PhotoImage(self.bg_frame)
@@ -76,6 +78,8 @@ class LoginWindow(tk.Frame):
             tk.Canvas(self.lgn_frame, width=200, height=2, bg="#bdb9b1", highlightthickness=0)\
                 .place(x=720, y=322 + i * 45)
             self.entries[var] = entry
+        # Load the driver while the user fills in the rest of the form
+        self.entries["db_type"].bind("<FocusOut>", self._warm_driver)
 
        # Connect Button
         # btn_img = ImageTk.PhotoImage(Image.open('./assets/btn1.png'))
@@ -87,7 +91,7 @@ class LoginWindow(tk.Frame):
         #           cursor='hand2', activebackground='#3047ff',
         #           command=self.connect_db).place(x=20, y=10)
         
-        tk.Button(
+        self.connect_btn = tk.Button(
                 self.lgn_frame,
                 text='🚀 Connect',
                 font=("yu gothic ui", 13, "bold"),
@@ -98,13 +102,23 @@ class LoginWindow(tk.Frame):
                 cursor='hand2',
                 activebackground="#37ff30",
                 command=self.connect_db
-            ).place(x=550, y=600)
+            )
+        self.connect_btn.place(x=550, y=600)
 
         
         
         
         
 
+        # Import what the home window needs once this window is on screen
+        self.after(100, warmup.warm_up)
+
+    def _warm_driver(self, event=None):
+        db_type = self.entries["db_type"].get().strip().lower()   # connect_db() accepts "PostgreSQL" too
+        if db_type and db_type != self._warmed_driver:
+            self._warmed_driver = db_type
+            warmup.warm_driver(db_type)
+
     def resize_bg(self, event):
         # Resize background image to window size
         resized = self.original_bg.resize((event.width, event.height), Image.LANCZOS)
@@ -121,12 +135,32 @@ class LoginWindow(tk.Frame):
         password    = self.entries["password"].get().strip()
         ollama_url  = self.entries["ollama_url"].get().strip()
 
-        if not all([db_type, host, port, db_name, username, password, ollama_url]):
+        # SQLite only needs a file path (in the Database Name field)
+        required = [db_type, db_name, ollama_url]
+        if db_type.lower() != "sqlite":
+            required += [host, port, username, password]
+        if not all(required):
             messagebox.showerror("Error", "All fields are required")
             return
 
+        # Usually finished by now; otherwise wait instead of racing the warm-up through the same
+        # imports, polling so the window keeps drawing
+        if warmup.busy():
+            self.connect_btn.config(text="⏳ Loading…", state=tk.DISABLED)
+            self.after(WARMUP_POLL_MS, self.connect_db)
+            return
+        self.connect_btn.config(text="🚀 Connect", state=tk.NORMAL)
+        warmup.wait()
+        from db_connector import DBConnector
+        from connector_group import ConnectorGroup
+        from ui.home_window import HomeWindow
+
         try:
-            db_connector = DBConnector(db_type, host, port, db_name, username, password)
+            if "," in host:
+                # Several shards with the same schema: "eu-db, us-db:3307, postgresql://ap-db/sales"
+                db_connector = ConnectorGroup.from_login(db_type, host, port, db_name, username, password)
+            else:
+                db_connector = DBConnector(db_type, host, port, db_name, username, password)
             db_connector.connect()
             self.destroy()
             HomeWindow(self.master, db_connector, ollama_url)
@@ -0,0 +1,236 @@
+# result_view_frame.py
+"""
+Virtualized results grid.
+
+The Treeview only ever holds as many items as fit in the viewport. Scrolling
+moves a row offset into the backing ResultStore and rewrites the values of
+those same items, so render time and Tcl memory do not depend on the number
+of rows in the result.
+
+An optional order (NumPy array of store positions) sorts and/or filters what
+is shown without touching the store; positions handed out by the grid are
+always store positions.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+# Rows fetched above/below the viewport so small scrolls don't touch the store
+BUFFER_ROWS = 50
+
+
+class VirtualResultGrid(ttk.Frame):
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.source = None
+        self.top = 0                 # absolute row shown in the first item
+        self._items = []             # recycled Treeview item ids, top to bottom
+        self._detached = set()       # pool items not needed for a short result
+        self._window = (0, 0, [])    # cached (start, stop, rows) around the viewport
+        self._selected_position = None
+        self.row_tags = None         # optional callable: store position -> Treeview tags
+        self.on_heading = None       # optional callable: column index, when a header is clicked
+        self.order = None            # store positions in display order, None for the store's own
+
+        self.tree = ttk.Treeview(self, show="headings", selectmode="browse")
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hsb.set)
+        self.vsb.pack(side="right", fill="y")
+        self.hsb.pack(side="bottom", fill="x")
+        self.tree.pack(side="left", fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", lambda e: self._resize_pool())
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._page(-1))
+        self.tree.bind("<Next>", lambda e: self._page(1))
+        self.tree.bind("<Home>", lambda e: self._jump(0))
+        self.tree.bind("<End>", lambda e: self._jump(len(self)))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+    # ───── Data ─────
+    def __len__(self):
+        if self.order is not None:
+            return len(self.order)
+        return len(self.source) if self.source is not None else 0
+
+    def set_source(self, source, column_width=140):
+        """Show ``source`` (a ResultStore) from the top."""
+        self.source = source
+        self.order = None
+        self.top = 0
+        self._selected_position = None
+        self._window = (0, 0, [])
+        self.tree.selection_remove(self.tree.selection())
+        columns = list(source.columns)
+        self.tree["columns"] = columns
+        for i, col in enumerate(columns):
+            self.tree.heading(col, text=col, command=lambda i=i: self._on_heading(i))
+            self.tree.column(col, minwidth=100, width=column_width, anchor="center")
+        self.redraw()
+
+    def swap_source(self, source):
+        """Read the same rows from ``source`` from now on, keeping the scroll position."""
+        self.source = source
+        self.refresh()
+
+    def set_order(self, order, sort=None):
+        """Show the store positions in ``order`` (None: all rows, store order) from the top.
+        ``sort`` = (column index, ascending) puts an arrow on that header."""
+        self.order = order
+        self.top = 0
+        self._selected_position = None
+        self._window = (0, 0, [])
+        columns = list(self.source.columns) if self.source is not None else []
+        for i, col in enumerate(columns):
+            arrow = ""
+            if sort is not None and sort[0] == i:
+                arrow = " ▲" if sort[1] else " ▼"
+            self.tree.heading(col, text=col + arrow)
+        self.redraw()
+
+    def source_position(self, position):
+        """Store position of the row displayed at ``position``."""
+        return int(self.order[position]) if self.order is not None else position
+
+    def refresh(self):
+        """Call after rows were appended to the source."""
+        self._window = (0, 0, [])
+        self.redraw()
+
+    def position_of(self, item):
+        """Store position of the row displayed by Treeview ``item`` (or None)."""
+        position = self._view_position(item)
+        return self.source_position(position) if position is not None else None
+
+    def _view_position(self, item):
+        try:
+            position = self.top + self._items.index(item)
+        except ValueError:
+            return None
+        return position if position < len(self) else None
+
+    def selected_position(self):
+        if self._selected_position is None:
+            return None
+        return self.source_position(self._selected_position)
+
+    # ───── Rendering ─────
+    def _visible_rows(self):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        header = row_height
+        if self._items:
+            bbox = self.tree.bbox(self._items[0])
+            if bbox:
+                header = bbox[1]
+        return max(1, (self.tree.winfo_height() - header) // row_height)
+
+    def _resize_pool(self):
+        wanted = self._visible_rows()
+        while len(self._items) < wanted:
+            self._items.append(self.tree.insert("", tk.END, values=()))
+        while len(self._items) > wanted:
+            item = self._items.pop()
+            self._detached.discard(item)
+            self.tree.delete(item)
+        self.redraw()
+
+    def _rows(self, start, stop):
+        cached_start, cached_stop, cached = self._window
+        if cached_start <= start and stop <= cached_stop:
+            return cached[start - cached_start:stop - cached_start]
+        lo = max(0, start - BUFFER_ROWS)
+        hi = min(len(self), stop + BUFFER_ROWS)
+        if self.source is None:
+            rows = []
+        elif self.order is not None:
+            rows = self.source.take(self.order[lo:hi])
+        else:
+            rows = self.source.rows(lo, hi)
+        self._window = (lo, hi, rows)
+        return rows[start - lo:stop - lo]
+
+    def redraw(self):
+        total = len(self)
+        visible = len(self._items)
+        self.top = max(0, min(self.top, total - visible))
+        rows = self._rows(self.top, min(self.top + visible, total))
+        for i, item in enumerate(self._items):
+            if i < len(rows):
+                if item in self._detached:
+                    self.tree.move(item, "", i)
+                    self._detached.discard(item)
+                tags = self.row_tags(self.source_position(self.top + i)) if self.row_tags else ()
+                self.tree.item(item, values=rows[i], tags=tags)
+            elif item not in self._detached:
+                self.tree.detach(item)
+                self._detached.add(item)
+
+        selected = self._selected_position
+        if selected is not None and self.top <= selected < self.top + len(rows):
+            item = self._items[selected - self.top]
+            if self.tree.selection() != (item,):
+                self.tree.selection_set(item)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        if total:
+            self.vsb.set(self.top / total, min(1.0, (self.top + visible) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    # ───── Scrolling ─────
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, len(self._items) - 1)
+            self.top += step
+        self.redraw()
+
+    def scroll_rows(self, delta):
+        self.top += delta
+        self.redraw()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _page(self, direction):
+        return self.scroll_rows(direction * max(1, len(self._items) - 1))
+
+    def _jump(self, position):
+        self.top = position
+        self.redraw()
+        return "break"
+
+    def _on_heading(self, index):
+        if self.on_heading is not None:
+            self.on_heading(index)
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self._selected_position = self._view_position(selection[0])
+
+    def _move_selection(self, delta):
+        if not len(self):
+            return "break"
+        current = self._selected_position if self._selected_position is not None else self.top - delta
+        target = max(0, min(len(self) - 1, current + delta))
+        self._selected_position = target
+        if target < self.top:
+            self.top = target
+        elif target >= self.top + len(self._items):
+            self.top = target - len(self._items) + 1
+        self.redraw()
+        self.tree.focus(self._items[target - self.top])
+        return "break"
@@ -0,0 +1,122 @@
+# schema_sidebar.py
+import tkinter as tk
+from tkinter import ttk
+
+from cost_guard import short_number
+from schema_search import SEARCH_LIMIT
+
+TABLE_BATCH = 500       # table nodes inserted per Tk idle slot
+SEARCH_DELAY_MS = 150   # wait for typing to pause before searching
+PLACEHOLDER = "…"
+
+
+class SchemaSidebar(ttk.LabelFrame):
+    """
+    The schema tree. Only table nodes are inserted up front (in batches, so
+    the window stays responsive on huge catalogs); a table's columns are
+    inserted the first time it is expanded. The search box narrows the tree
+    to the tables a schema_search.SchemaSearch finds, opening the ones
+    matched by a column.
+    """
+
+    def __init__(self, master, on_refresh, **kwargs):
+        super().__init__(master, text="📂 Database Schema", padding=3, **kwargs)
+        ttk.Button(self, text="⟳ Refresh", command=on_refresh).pack(fill=tk.X, pady=(0, 3))
+        search_row = ttk.Frame(self)
+        search_row.pack(fill=tk.X, pady=(0, 3))
+        ttk.Label(search_row, text="🔎").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        ttk.Entry(search_row, textvariable=self.search_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(search_row, text="✖", width=2, command=lambda: self.search_var.set(""))\
+            .pack(side=tk.LEFT, padx=(2, 0))
+        self.count_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.count_var, foreground="#9CDCFE").pack(fill=tk.X)
+        self.tree = ttk.Treeview(self, selectmode="browse", show="tree")
+        self.tree.tag_configure("match", foreground="#DCDCAA")
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.bind("<<TreeviewOpen>>", lambda e: self._fill(self.tree.focus()))
+
+        self.schema = None
+        self.search = None
+        self._pending = {}      # table node -> table whose columns are not inserted yet
+        self._generation = 0    # bumped to stop batches of an older listing
+        self._search_after = None
+        self.search_var.trace_add("write", lambda *_: self._schedule_search())
+
+    def show(self, schema, search):
+        """A freshly loaded schema and its SchemaSearch."""
+        self.schema, self.search = schema, search
+        self._run_search()
+
+    # ───── Listing ─────
+    def _clear(self):
+        self._generation += 1
+        self._pending = {}
+        self.tree.delete(*self.tree.get_children())
+
+    def _list(self, tables, matches=None):
+        """Insert ``tables`` in batches; ``matches``: {table name: [matched columns]} to open and highlight."""
+        self._clear()
+        self._insert_batch(tables, 0, matches or {}, self._generation)
+
+    def _insert_batch(self, tables, start, matches, generation):
+        if generation != self._generation:
+            return
+        for table in tables[start:start + TABLE_BATCH]:
+            node = self.tree.insert("", tk.END, text=self._table_label(table))
+            self._pending[node] = table
+            if table.columns:
+                self.tree.insert(node, tk.END, text=PLACEHOLDER)
+            if matches.get(table.name):
+                self._fill(node, set(matches[table.name]))
+                self.tree.item(node, open=True)
+        if start + TABLE_BATCH < len(tables):
+            self.after(1, self._insert_batch, tables, start + TABLE_BATCH, matches, generation)
+
+    def _fill(self, node, matched=()):
+        """Replace the placeholder of a table node with its columns."""
+        table = self._pending.pop(node, None)
+        if table is None:
+            return
+        self.tree.delete(*self.tree.get_children(node))
+        referencing = {c for fk in table.foreign_keys for c in fk.columns}
+        indexed = table.indexed_columns()
+        for col in table.columns:
+            icon = "🔑 " if col.name in table.primary_key else "🔗 " if col.name in referencing else ""
+            text = f"{icon}{col.name}  {col.type or ''}"
+            if col.name in indexed and col.name not in table.primary_key:
+                text += "  ⚡"
+            self.tree.insert(node, tk.END, text=text.rstrip(), tags=("match",) if col.name in matched else ())
+
+    @staticmethod
+    def _table_label(table):
+        if table.kind == "view":
+            return f"{table.name}  (view)"
+        if table.rows is not None:
+            return f"{table.name}  (~{short_number(table.rows)} rows)"
+        return table.name
+
+    # ───── Search ─────
+    def _schedule_search(self):
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_after = None
+        if self.schema is None:
+            return
+        query = self.search_var.get().strip()
+        total = len(self.schema)
+        if not query:
+            self._list(list(self.schema.tables.values()))
+            self.count_var.set(f"{total:,} tables")
+            return
+        results = self.search.search(query)
+        self._list([self.schema.tables[name] for name, _ in results], dict(results))
+        if not results:
+            self.count_var.set("No matches")
+        elif len(results) >= SEARCH_LIMIT:
+            self.count_var.set(f"First {len(results):,} matches of {total:,} tables; type more to narrow")
+        else:
+            self.count_var.set(f"{len(results):,} of {total:,} tables match")
@@ -0,0 +1,70 @@
+# warmup.py
+"""
+Background imports for a fast first paint.
+
+Only Tk and PIL are imported before the login window draws. Once it is on
+screen, warm_up() imports what the home window needs (pandas, SQLAlchemy,
+sqlparse, requests, the UI modules) on a daemon thread while the user types
+credentials, and warm_driver() does the same for the DB driver as soon as
+the database type is filled in, once the imports already under way are
+done. connect_db() waits for them (polling busy() from the Tk loop) before
+it imports anything itself, so no two threads import the same module at once.
+"""
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HOME_MODULES = ("pandas", "sqlalchemy.pool", "sqlparse", "requests", "db_connector", "connector_group",
+                "ui.home_window")
+
+_threads = []
+
+
+def _start(name, target):
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    _threads.append(thread)
+    thread.start()
+    return thread
+
+
+def warm_up(modules=HOME_MODULES):
+    """Import ``modules`` on a background thread. Failures are left for the real import to report."""
+    def run():
+        started = time.perf_counter()
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                logger.debug(f"Warm-up import of {name} failed: {e}")
+        logger.debug(f"Warm-up imports took {time.perf_counter() - started:.2f}s")
+    return _start("warmup", run)
+
+
+def warm_driver(db_type):
+    """Import the driver for ``db_type`` on a background thread (nothing for an unknown type)."""
+    earlier = list(_threads)
+
+    def run():
+        # db_connector is among warm_up()'s modules: import it only after that thread is done
+        for thread in earlier:
+            thread.join()
+        try:
+            from db_connector import load_driver
+            load_driver(db_type)
+        except Exception as e:
+            logger.debug(f"Warm-up of the {db_type} driver failed: {e}")
+    return _start("warmup-driver", run)
+
+
+def busy():
+    """Whether a warm-up started so far is still importing."""
+    return any(thread.is_alive() for thread in _threads)
+
+
+def wait():
+    """Block until every warm-up started so far has finished."""
+    while _threads:
+        _threads.pop().join()
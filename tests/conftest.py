@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports its modules flat (``from db_connector import ...``), as main.py arranges
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nl_to_sql_desktop"))
@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+from db_connector import DBConnector, EditConflict
+from edit_buffer import EditBuffer
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "app.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE people (id INTEGER PRIMARY KEY, name TEXT NOT NULL, city TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO people VALUES (?, ?, ?, ?)",
+                     [(1, "Ann", "Oslo", 31), (2, "Bob", "Rome", 45), (3, "Cy", None, 27)])
+    conn.commit()
+    conn.close()
+    connector = DBConnector("sqlite", "", "", path, "", "")
+    connector.connect()
+    yield connector
+    connector.close()
+
+
+def _rows(db):
+    with db.connection() as conn:
+        return [list(row) for row in conn.execute("SELECT * FROM people ORDER BY id")]
+
+
+def test_multi_row_edit(db):
+    buffer = EditBuffer("people", ["id"])
+    buffer.record(0, [1], "city", "Oslo", "Bergen")
+    buffer.record(0, [1], "age", 31, 32)
+    buffer.record(1, [2], "city", "Rome", "Milan")
+    buffer.record(2, [3], "city", None, "Lima")
+    assert db.apply_edits("people", ["id"], buffer.edits()) == 3
+    assert _rows(db) == [[1, "Ann", "Bergen", 32], [2, "Bob", "Milan", 45], [3, "Cy", "Lima", 27]]
+
+
+def test_edit_to_null(db):
+    db.apply_edits("people", ["id"], [((2,), {"city": ("Rome", None)}), ((1,), {"age": (31, float("nan"))})])
+    assert _rows(db)[:2] == [[1, "Ann", "Oslo", None], [2, "Bob", None, 45]]
+
+
+def test_vanished_row_is_reported_and_nothing_saved(db):
+    with db.connection() as conn:
+        conn.execute("DELETE FROM people WHERE id = 2")
+        conn.commit()
+    edits = [((1,), {"city": ("Oslo", "Bergen")}), ((2,), {"city": ("Rome", "Milan")})]
+    with pytest.raises(EditConflict) as raised:
+        db.apply_edits("people", ["id"], edits)
+    assert raised.value.keys == [("2",)]
+    assert _rows(db) == [[1, "Ann", "Oslo", 31], [3, "Cy", None, 27]]
+
+
+def test_row_changed_since_read_is_a_conflict(db):
+    with pytest.raises(EditConflict) as raised:
+        db.apply_edits("people", ["id"], [((1,), {"city": ("Paris", "Bergen")})])
+    assert raised.value.keys == [("1",)]
+    assert _rows(db)[0] == [1, "Ann", "Oslo", 31]
+
+
+def test_failing_statement_rolls_back_the_whole_batch(db):
+    edits = [((1,), {"city": ("Oslo", "Bergen")}),
+             ((2,), {"age": (45, 46)}),
+             ((3,), {"name": ("Cy", None)})]    # NOT NULL
+    with pytest.raises(sqlite3.IntegrityError):
+        db.apply_edits("people", ["id"], edits)
+    assert _rows(db) == [[1, "Ann", "Oslo", 31], [2, "Bob", "Rome", 45], [3, "Cy", None, 27]]
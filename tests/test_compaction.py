@@ -0,0 +1,60 @@
+import decimal
+
+import numpy as np
+import pandas as pd
+
+from compaction import compact_column, compact_store
+from result_store import ResultStore
+
+
+def test_integers_downcast_only_as_far_as_the_range_allows():
+    assert compact_column(pd.Series([1, -5, 100], dtype=np.int64)).dtype == np.int8
+    assert compact_column(pd.Series([0, 40_000], dtype=np.int64)).dtype == np.int32
+    big = pd.Series([1, 2 ** 31, -(2 ** 40)], dtype=np.int64)
+    assert compact_column(big) is None
+
+
+def test_float_with_nan_keeps_every_value():
+    values = pd.Series([0.5, np.nan, 2.25, -1.0])
+    compact = compact_column(values)
+    assert compact.dtype == np.float32
+    assert np.array_equal(compact.to_numpy(np.float64), values.to_numpy(), equal_nan=True)
+    # 0.1 is not exact in float32
+    assert compact_column(pd.Series([0.1, np.nan])) is None
+
+
+def test_integer_column_with_nulls_becomes_nullable_integer():
+    compact = compact_column(pd.Series([3.0, np.nan, 70_000.0]), integer=True)
+    assert str(compact.dtype) == "Int32"
+    assert compact.tolist()[0] == 3 and compact.isna().tolist() == [False, True, False]
+    huge = pd.Series([2.0 ** 53 + 2, np.nan])
+    assert compact_column(huge, integer=True) is None
+
+
+def test_repeated_text_becomes_categorical():
+    values = pd.Series(["eu", "us", "eu", None] * 50, dtype=object)
+    compact = compact_column(values, arrow_dtypes=False, category_percent=10)
+    assert isinstance(compact.dtype, pd.CategoricalDtype)
+    assert compact.astype(object).where(compact.notna(), None).tolist() == values.tolist()
+
+
+def test_decimals():
+    short = pd.Series([decimal.Decimal("10.50"), decimal.Decimal("-3.25"), None], dtype=object)
+    assert compact_column(short, arrow_dtypes=False).tolist()[:2] == [10.5, -3.25]
+    wide = pd.Series([decimal.Decimal("12345678901234567.89")], dtype=object)
+    assert compact_column(wide, arrow_dtypes=False) is None
+    arrow = compact_column(wide, arrow_dtypes=True)
+    assert arrow.tolist() == [decimal.Decimal("12345678901234567.89")]
+
+
+def test_compact_store_keeps_rows_and_gives_chunks_one_dtype():
+    store = ResultStore(["id", "score", "region"])
+    store.append(pd.DataFrame({"id": [1, 2 ** 33], "score": [1.5, 2.5], "region": ["eu", "eu"]}))
+    store.append(pd.DataFrame({"id": [3, 4], "score": [np.nan, 0.25], "region": ["us", "eu"]}))
+    compacted, before, after = compact_store(store)
+    assert len(compacted) == 4
+    assert compacted.column(0).tolist() == [1, 2 ** 33, 3, 4]
+    assert np.array_equal(compacted.column(1).to_numpy(np.float64), [1.5, 2.5, np.nan, 0.25], equal_nan=True)
+    assert compacted.column(2).astype(object).tolist() == ["eu", "eu", "us", "eu"]
+    assert len({chunk.dtypes.iloc[1] for chunk in compacted.chunks}) == 1
+    assert after <= before
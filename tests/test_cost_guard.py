@@ -0,0 +1,56 @@
+from cost_guard import mysql_estimate, postgres_estimate
+from sql_rewrite import top_level_limit
+
+
+def _pg(node):
+    return [{"Plan": node}]
+
+
+def test_postgres_limit_over_scan_counts_limited_rows():
+    plan = _pg({"Node Type": "Limit", "Plan Rows": 10, "Total Cost": 0.05, "Plans": [
+        {"Node Type": "Seq Scan", "Plan Rows": 2_000_000_000, "Total Cost": 35_000_000.0},
+    ]})
+    estimate = postgres_estimate(plan)
+    assert estimate.rows == 10
+    assert estimate.level is None
+
+
+def test_postgres_limit_over_sort_counts_full_scan():
+    plan = _pg({"Node Type": "Limit", "Plan Rows": 10, "Total Cost": 90_000_000.0, "Plans": [
+        {"Node Type": "Sort", "Plan Rows": 2_000_000_000, "Plans": [
+            {"Node Type": "Seq Scan", "Plan Rows": 2_000_000_000},
+        ]},
+    ]})
+    assert postgres_estimate(plan).rows == 2_000_000_000
+
+
+def test_postgres_without_limit_is_largest_node():
+    plan = _pg({"Node Type": "Hash Join", "Plan Rows": 500, "Total Cost": 10.0, "Plans": [
+        {"Node Type": "Seq Scan", "Plan Rows": 40_000},
+        {"Node Type": "Hash", "Plan Rows": 300, "Plans": [{"Node Type": "Seq Scan", "Plan Rows": 300}]},
+    ]})
+    assert postgres_estimate(plan).rows == 40_000
+
+
+def test_mysql_limit_scales_streamed_scan():
+    plan = {"query_block": {"cost_info": {"query_cost": "200000000.0"},
+                            "table": {"table_name": "fact", "access_type": "ALL",
+                                      "rows_examined_per_scan": 2_000_000_000}}}
+    sql = "SELECT * FROM fact LIMIT 10"
+    estimate = mysql_estimate(plan, top_level_limit(sql))
+    assert estimate.rows == 10
+    assert estimate.level is None
+
+
+def test_mysql_limit_after_filesort_keeps_scan_rows():
+    plan = {"query_block": {"cost_info": {"query_cost": "200000000.0"},
+                            "ordering_operation": {"using_filesort": True,
+                                                   "table": {"rows_examined_per_scan": 2_000_000_000}}}}
+    assert mysql_estimate(plan, 10).rows == 2_000_000_000
+
+
+def test_top_level_limit():
+    assert top_level_limit("SELECT * FROM t LIMIT 10;") == 10
+    assert top_level_limit("SELECT * FROM t LIMIT 5, 20") == 20
+    assert top_level_limit("SELECT * FROM (SELECT * FROM t LIMIT 3) s") is None
+    assert top_level_limit("SELECT * FROM t LIMIT ALL") is None
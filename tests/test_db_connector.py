@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_connector import DBConnector
+
+# Rows without end: only stopping the query ends the stream
+ENDLESS = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT i FROM n"
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    connector = DBConnector("sqlite", "", "", str(tmp_path / "app.db"), "", "")
+    connector.connect()
+    yield connector
+    connector.close()
+
+
+def test_cancelled_stream_stops_promptly(sqlite_db):
+    cancels = []
+    rows_iter = sqlite_db.iter_rows(ENDLESS + " WHERE i < 0", cancel_hook=cancels.append)
+    threading.Timer(0.2, lambda: cancels[0]()).start()
+    started = time.monotonic()
+    with pytest.raises(sqlite3.OperationalError):
+        next(rows_iter)
+    assert time.monotonic() - started < 2
+
+
+def test_stream_stopped_after_first_chunk(sqlite_db):
+    rows_iter = sqlite_db.iter_rows(ENDLESS, chunk_size=100)
+    columns, rows = next(rows_iter)
+    assert columns == ["i"] and len(rows) == 100
+    rows_iter.close()
+    assert sqlite_db.execute_query("SELECT 1 AS x")["x"].tolist() == [1]
+
+
+class _FakeMySQLCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(sql)
+        if sql.startswith("SELECT"):
+            self.description = [("i",)]
+            self.conn.unread_result = True
+
+    def fetchmany(self, size):
+        return [(i,) for i in range(size)]
+
+    def close(self):
+        if self.conn.unread_result:
+            self.conn.consume_results()
+
+
+class _FakeMySQLConnection:
+    """An unbuffered mysql.connector connection with a result too large to read to the end."""
+    connection_id = 7
+
+    def __init__(self):
+        self.statements = []
+        self.unread_result = False
+        self.drained = False
+        self.closed = False
+
+    def cursor(self, buffered=None):
+        return _FakeMySQLCursor(self)
+
+    def consume_results(self):
+        self.drained = True
+        self.unread_result = False
+
+    def is_connected(self):
+        return not self.closed
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_mysql_stream_stopped_early_kills_the_query():
+    connector = DBConnector("mysql", "db", 3306, "app", "user", "secret", pool_max=0)
+    connector.conn, side = _FakeMySQLConnection(), _FakeMySQLConnection()
+    connector._raw_connect = lambda: side    # KILL QUERY goes over a second connection
+    rows_iter = connector.iter_rows("SELECT i FROM big", chunk_size=10, timeout=0)
+    next(rows_iter)
+    rows_iter.close()
+    assert side.statements == ["KILL QUERY 7"]
+    # Dropped rather than drained; the next query gets a new connection
+    main = connector.conn
+    assert main.closed and not main.drained
+    connector._raw_connect = _FakeMySQLConnection
+    with connector.connection() as conn:
+        assert conn is not main
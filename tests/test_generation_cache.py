@@ -0,0 +1,24 @@
+from generation_cache import GenerationCache, normalize_question
+
+
+def test_normalize_question_folds_case_and_spacing():
+    assert normalize_question("  Top 10 customers   by revenue?") == "top 10 customers by revenue"
+    assert normalize_question("Show the customer's ORDERS.") == "show the customer's orders"
+
+
+def test_normalize_question_keeps_quoted_literals():
+    assert normalize_question("Orders for customer 'Smith'") == "orders for customer 'Smith'"
+    assert normalize_question("Orders for customer 'Smith'") != normalize_question("orders for customer 'SMITH'")
+    assert normalize_question('Users in  "New  York"?') == 'users in "New  York"'
+
+
+def test_persistent_store_keeps_max_entries(tmp_path):
+    path = str(tmp_path / "generations.sqlite3")
+    cache = GenerationCache(max_entries=3, db_path=path)
+    for i in range(5):
+        cache.put(f"k{i}", f"SELECT {i};")
+    assert cache._db.execute("SELECT COUNT(*) FROM generations").fetchone()[0] == 3
+
+    reopened = GenerationCache(max_entries=3, db_path=path)
+    assert reopened.get("k0") is None
+    assert reopened.get("k4") == "SELECT 4;"
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from job_executor import JobCancelled, JobExecutor
+
+
+class FakeWidget:
+    """Stands in for the Tk widget: after() only queues the poll, the test runs it."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+
+def _drain(executor, widget, *jobs):
+    """Run the main loop's polls until ``jobs`` are finished and delivered."""
+    for job in jobs:
+        job.future.result(timeout=5)
+    while widget.scheduled:
+        widget.scheduled.pop(0)()
+        if not any(job in executor.running() for job in jobs):
+            break
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+@pytest.fixture
+def executor(changes):
+    executor = JobExecutor(FakeWidget(), max_workers=2, poll_ms=1, on_change=changes.append)
+    yield executor
+    executor.shutdown()
+
+
+def test_result_and_progress_are_delivered_on_the_draining_thread(executor, changes):
+    seen = []
+
+    def work(job, n):
+        for i in range(n):
+            job.report(i, message=f"step {i}")
+        job.report(message="almost done")    # status only, no payload for on_progress
+        return n * 10
+
+    job = executor.submit("work", work, 3,
+                          on_progress=lambda p: seen.append(("progress", p, threading.get_ident())),
+                          on_done=lambda r: seen.append(("done", r, threading.get_ident())))
+    assert executor.running() == [job]
+    _drain(executor, executor.widget, job)
+    me = threading.get_ident()
+    assert seen == [("progress", 0, me), ("progress", 1, me), ("progress", 2, me), ("done", 30, me)]
+    assert job.message == "almost done"
+    assert executor.running() == []
+    assert changes[0] == [job] and changes[-1] == []
+
+
+def test_error_goes_to_on_error(executor):
+    errors, done = [], []
+
+    def fail(job):
+        raise ValueError("bad SQL")
+
+    job = executor.submit("fail", fail, on_error=errors.append, on_done=done.append)
+    _drain(executor, executor.widget, job)
+    assert [str(e) for e in errors] == ["bad SQL"] and not done
+
+
+def test_cancel_runs_callbacks_and_reports_cancelled(executor):
+    started, hung_up = threading.Event(), threading.Event()
+    outcome = []
+
+    def wait_for_cancel(job):
+        job.add_cancel_callback(hung_up.set)    # e.g. closing the HTTP response
+        started.set()
+        hung_up.wait(5)
+        raise ConnectionError("stream closed")  # what tearing down the call looks like
+
+    job = executor.submit("slow", wait_for_cancel,
+                          on_done=lambda r: outcome.append("done"),
+                          on_error=lambda e: outcome.append("error"),
+                          on_cancel=lambda: outcome.append("cancelled"))
+    started.wait(5)
+    job.cancel()
+    _drain(executor, executor.widget, job)
+    assert outcome == ["cancelled"]
+    with pytest.raises(JobCancelled):
+        job.check_cancelled()
+
+
+def test_jobs_finish_independently(executor):
+    release = threading.Event()
+    results = []
+    slow = executor.submit("slow", lambda job: release.wait(5) and "slow", on_done=results.append)
+    fast = executor.submit("fast", lambda job: "fast", on_done=results.append)
+    _drain(executor, executor.widget, fast)
+    assert results == ["fast"] and executor.running() == [slow]
+    release.set()
+    _drain(executor, executor.widget, slow)
+    assert results == ["fast", "slow"]
+
+
+def test_shutdown_cancels_and_refuses_new_work(executor):
+    started = threading.Event()
+
+    def hold(job):
+        started.set()
+        while True:
+            job.check_cancelled()
+            threading.Event().wait(0.01)
+
+    job = executor.submit("hold", hold)
+    started.wait(5)
+    executor.shutdown()
+    assert job.cancelled
+    job.future.result(timeout=5)
+    with pytest.raises(RuntimeError):
+        executor.submit("late", lambda job: None)
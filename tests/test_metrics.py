@@ -0,0 +1,28 @@
+import json
+
+from metrics import Metrics
+
+
+def test_emit_appends_a_record(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    metrics = Metrics("query", held=True)
+    metrics.add("execute", 0.5)
+    metrics.count("rows", 10)
+    metrics.emit(path)
+    Metrics("export").emit(path)
+    records = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert [r["operation"] for r in records] == ["query", "export"]
+    assert records[0]["stages"] == {"execute": 0.5}
+    assert records[0]["counters"] == {"rows": 10} and records[0]["held"] is True
+
+
+def test_emit_rotates_a_full_file(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    for _ in range(30):
+        Metrics("query").emit(str(path), max_bytes=1000)
+    backup = tmp_path / "metrics.jsonl.1"
+    assert backup.exists()
+    assert path.stat().st_size < 1000 + 500 and backup.stat().st_size < 1000 + 500
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["metrics.jsonl", "metrics.jsonl.1"]
+    lines = path.read_text(encoding="utf-8").splitlines() + backup.read_text(encoding="utf-8").splitlines()
+    assert all(json.loads(line)["operation"] == "query" for line in lines)
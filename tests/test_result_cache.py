@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import result_cache
+from result_cache import ResultCache
+from result_store import ResultStore
+
+
+def _store(n, offset=0):
+    return ResultStore.from_frame(pd.DataFrame({"id": range(offset, offset + n),
+                                                "name": [f"row {i}" for i in range(offset, offset + n)]}))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _cache(tmp_path, entries=2, disk_bytes=0, ttl=60):
+    # A memory budget of ``entries`` stores of 100 rows (the later rows' names are longer)
+    return ResultCache(memory_bytes=entries * _store(100, offset=100).nbytes(), disk_bytes=disk_bytes,
+                       ttl=ttl, spill_dir=str(tmp_path / "results"))
+
+
+def test_hit_and_miss(tmp_path, clock):
+    cache = _cache(tmp_path)
+    store = _store(100)
+    assert cache.get("a") is None
+    assert cache.put("a", store)
+    assert cache.get("a") is store
+    assert cache.stats["memory_hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_make_key_ignores_formatting_but_not_the_database():
+    key = ResultCache.make_key("select * from t -- all\n;", ("sqlite", "", "", "a.db"))
+    assert key == ResultCache.make_key("SELECT *   FROM t", ("sqlite", "", "", "a.db"))
+    assert key != ResultCache.make_key("SELECT * FROM t", ("sqlite", "", "", "b.db"))
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = _cache(tmp_path, ttl=60)
+    cache.put("a", _store(100))
+    clock[0] += 59
+    assert cache.get("a") is not None
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert cache._memory_used == 0
+
+
+def test_least_recently_used_is_evicted_first(tmp_path, clock):
+    cache = _cache(tmp_path, entries=2)
+    cache.put("a", _store(100))
+    cache.put("b", _store(100))
+    cache.get("a")      # now "b" is the least recently used
+    cache.put("c", _store(100))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats["evictions"] == 1
+
+
+def test_result_larger_than_memory_budget_is_not_cached(tmp_path, clock):
+    cache = _cache(tmp_path, entries=1)
+    assert not cache.put("big", _store(1000))
+    assert cache.get("big") is None
+
+
+def test_evicted_result_is_spilled_and_read_back(tmp_path, clock):
+    cache = _cache(tmp_path, entries=1, disk_bytes=10 * 1024 * 1024)
+    first = _store(100)
+    cache.put("a", first)
+    cache.put("b", _store(100, offset=100))     # pushes "a" to disk
+    assert cache.stats["spills"] == 1
+    assert len(list((tmp_path / "results").iterdir())) == 1
+
+    reloaded = cache.get("a")
+    assert reloaded is not first
+    assert reloaded.columns == ["id", "name"]
+    pd.testing.assert_frame_equal(reloaded.to_frame(), first.to_frame())
+    assert cache.stats["disk_hits"] == 1
+    # Promoted back to memory, which spilled "b" in its place
+    assert cache.get("a") is not None and cache.stats["memory_hits"] == 1
+    assert cache.get("b").rows(0, 1) == [(100, "row 100")]
+
+
+def test_spilled_entries_expire_and_clear_removes_files(tmp_path, clock):
+    cache = _cache(tmp_path, entries=1, disk_bytes=10 * 1024 * 1024, ttl=60)
+    cache.put("a", _store(100))
+    cache.put("b", _store(100))
+    clock[0] += 61
+    assert cache.get("a") is None
+    assert not list((tmp_path / "results").iterdir())
+    cache.put("c", _store(100))
+    cache.put("d", _store(100))
+    cache.clear()
+    assert not (tmp_path / "results").exists()
+    assert cache.get("c") is None
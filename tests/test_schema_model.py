@@ -0,0 +1,10 @@
+from schema_model import build_schema
+
+
+def test_build_schema_skips_expression_indexes():
+    columns = [("t", "table", "a", "int", False), ("t", "table", "b", "text", True)]
+    indexes = [("t", "t_a_lower_b", False, "a"), ("t", "t_a_lower_b", False, None),
+               ("t", "t_b", True, "b")]
+    table = build_schema(columns, indexes=indexes).tables["t"]
+    assert [(i.name, i.columns, i.unique) for i in table.indexes] == [("t_b", ["b"], True)]
+    assert table.indexed_columns() == {"b"}
@@ -0,0 +1,27 @@
+from schema_model import Column, Schema, Table
+from schema_search import SchemaSearch
+
+
+def _search(*tables):
+    return SchemaSearch(Schema(Table(name, columns=[Column(c) for c in columns]) for name, columns in tables))
+
+
+def test_adjacent_prefix_matches_are_all_found():
+    search = _search(("apayment", []), ("payment_1", []), ("payment_2", []), ("payment_3", []))
+    assert [t for t, _ in search.search("payment")] == ["payment_1", "payment_2", "payment_3", "apayment"]
+    assert [t for t, _ in search.search("payment", limit=2)] == ["payment_1", "payment_2"]
+
+
+def test_adjacent_prefix_matches_in_columns():
+    search = _search(("a", ["id", "idx"]), ("b", ["name"]), ("c", ["id"]))
+    assert search.search("id") == [("a", ["id", "idx"]), ("c", ["id"])]
+
+
+def test_ranking_name_before_column_and_word_start_before_substring():
+    search = _search(("orders", ["id"]), ("big_orders", []), ("reorders", []), ("customers", ["order_id"]))
+    assert [t for t, _ in search.search("order")] == ["orders", "big_orders", "reorders", "customers"]
+    assert search.search("ORDER_ID") == [("customers", ["order_id"])]
+
+
+def test_empty_query():
+    assert _search(("orders", [])).search("  ") == []
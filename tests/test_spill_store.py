@@ -0,0 +1,98 @@
+import os
+
+import pandas as pd
+import pytest
+
+from spill_store import SpillFull, SpillStore
+
+
+def _chunk(start, n=100):
+    return pd.DataFrame({"id": range(start, start + n), "name": [f"row {i}" for i in range(start, start + n)]})
+
+
+@pytest.fixture
+def spill(tmp_path):
+    # Segments of a few KB: every couple of chunks starts a new file
+    store = SpillStore(["id", "name"], segment_bytes=4096, root=str(tmp_path))
+    for start in range(0, 1000, 100):
+        store.append(_chunk(start))
+    store.finish()
+    yield store
+    store.close()
+
+
+def _segments(store):
+    return sorted(name for name in os.listdir(store.path) if name.endswith(".arrow"))
+
+
+def test_segments_roll_over(spill):
+    assert len(spill) == 1000
+    assert len(_segments(spill)) > 1
+    assert spill.nbytes() == sum(os.path.getsize(os.path.join(spill.path, name)) for name in _segments(spill))
+
+
+def test_reads_across_segment_boundaries(spill):
+    assert spill.rows(0, 1000) == [(i, f"row {i}") for i in range(1000)]
+    assert spill.rows(95, 305) == [(i, f"row {i}") for i in range(95, 305)]
+    assert spill.take([999, 0, 450, 99, 100]) == [(i, f"row {i}") for i in (999, 0, 450, 99, 100)]
+    assert spill.column(0).tolist() == list(range(1000))
+    frames = list(spill.iter_chunks())
+    assert sum(len(f) for f in frames) == 1000
+    assert pd.concat(frames, ignore_index=True)["id"].tolist() == list(range(1000))
+
+
+def test_rows_before_finish_come_from_the_open_segment(tmp_path):
+    store = SpillStore(["id", "name"], root=str(tmp_path))
+    store.append(_chunk(0))
+    assert store.rows(98, 102) == [(98, "row 98"), (99, "row 99")]
+    store.close()
+
+
+def test_type_change_starts_a_new_segment(tmp_path):
+    store = SpillStore(["x"], root=str(tmp_path))
+    store.append(pd.DataFrame({"x": [1, 2]}))
+    store.append(pd.DataFrame({"x": [2.5, None]}))
+    store.finish()
+    assert len(_segments(store)) == 2
+    assert store.rows(0, 3) == [(1,), (2,), (2.5,)]
+    store.close()
+
+
+def test_edits_override_the_files(spill):
+    spill.set_value(150, "name", "edited")
+    assert spill.value(150, "name") == "edited"
+    assert spill.rows(149, 152)[1] == (150, "edited")
+    assert spill.take([150])[0] == (150, "edited")
+    assert spill.column(1)[150] == "edited"
+    assert pd.concat(spill.iter_chunks(), ignore_index=True).at[150, "name"] == "edited"
+    with pytest.raises(IndexError):
+        spill.set_value(1000, "name", "x")
+
+
+def test_export_reads_a_snapshot_of_the_edits(spill):
+    chunks = spill.iter_chunks()
+    first = next(chunks)
+    # An inline edit while an export is under way neither breaks it nor shows up halfway through
+    for position in range(0, 1000, 7):
+        spill.set_value(position, "name", "late")
+    rest = list(chunks)
+    assert "late" not in set(first["name"]) | set(pd.concat(rest)["name"])
+    assert spill.value(700, "name") == "late"
+
+
+def test_spill_limit(tmp_path):
+    store = SpillStore(["id", "name"], max_bytes=4096, root=str(tmp_path))
+    with pytest.raises(SpillFull):
+        for start in range(0, 10_000, 100):
+            store.append(_chunk(start))
+    store.close()
+
+
+def test_close_removes_the_files(spill):
+    path = spill.path
+    spill.close()
+    assert not os.path.exists(path)
+    assert len(spill) == 0 and spill.rows(0, 10) == []
+    with pytest.raises(ValueError):
+        spill.append(_chunk(0))
+    spill.close()     # closing twice is harmless
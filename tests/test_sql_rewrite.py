@@ -0,0 +1,28 @@
+from sql_rewrite import limit_sql, single_table
+
+
+def test_single_table():
+    assert single_table("SELECT * FROM orders WHERE id > 3;") == "orders"
+    assert single_table('select id from public."Users" u order by id') == "public.Users"
+    assert single_table("select * from t where id in (select id from u)") == "t"
+
+
+def test_single_table_rejects_joins_and_grouping():
+    for sql in ("SELECT * FROM a, b WHERE a.x = b.y",
+                "SELECT * FROM a ,b",
+                "SELECT * FROM a JOIN b ON a.id = b.id",
+                "select distinct x from t",
+                "select x, count(*) from t group by x",
+                "select * from (select 1) s",
+                "with c as (select 1) select * from c",
+                "select * from t union all select * from u"):
+        assert single_table(sql) is None, sql
+
+
+def test_limit_sql_goes_before_a_locking_clause():
+    assert limit_sql("SELECT * FROM t WHERE a = 1 FOR UPDATE", 50) == "SELECT * FROM t WHERE a = 1 LIMIT 50\nFOR UPDATE"
+    assert limit_sql("select * from t order by id for share nowait;", 50) == \
+        "select * from t order by id LIMIT 50\nfor share nowait"
+    assert limit_sql("select * from t lock in share mode", 50) == "select * from t LIMIT 50\nlock in share mode"
+    assert limit_sql("select * from t limit 500 for update", 50) == "select * from t limit 50 for update"
+    assert limit_sql("select * from t", 50) == "select * from t\nLIMIT 50"
@@ -0,0 +1,58 @@
+import json
+
+from stream_parser import SqlStreamParser
+
+
+def _feed(fragments):
+    parser = SqlStreamParser()
+    for fragment in fragments:
+        if parser.feed(fragment):
+            break
+    return parser
+
+
+def test_object_completes_on_its_closing_brace():
+    parser = SqlStreamParser()
+    assert not parser.feed('Sure! {"sql": "SELECT 1')
+    assert parser.partial_sql == "SELECT 1"
+    assert parser.feed('"}')
+    assert parser.result() == {"sql": "SELECT 1"}
+
+
+def test_key_and_escape_split_across_chunks():
+    parser = SqlStreamParser()
+    for fragment in ['{"s', 'ql', '": "SELECT * FROM t WHERE a = \\', '"x\\', '"', ' AND b = \\u00', 'e9"}']:
+        parser.feed(fragment)
+        # Never shows half an escape sequence
+        assert "\\" not in parser.partial_sql
+    assert parser.complete
+    assert parser.result()["sql"] == 'SELECT * FROM t WHERE a = "x" AND b = é'
+
+
+def test_quotes_and_newlines_inside_the_sql():
+    sql = 'SELECT "Order Id", \'a}b\'\nFROM "t{1}"\\'
+    text = json.dumps({"sql": sql})
+    parser = _feed(text[i:i + 3] for i in range(0, len(text), 3))
+    assert parser.complete
+    assert parser.result()["sql"] == sql
+    assert parser.partial_sql == sql
+
+
+def test_text_after_the_object_is_ignored():
+    parser = _feed(['{"sql": "SELECT 1"}', ' I hope this helps! {"sql": "SELECT 2"}'])
+    assert parser.object_text == '{"sql": "SELECT 1"}'
+    assert parser.feed("more text")
+    assert parser.result() == {"sql": "SELECT 1"}
+
+
+def test_truncated_stream():
+    parser = _feed(['```json\n{"sql": "SELECT name', ' FROM users WHERE note = \\"'])
+    assert not parser.complete
+    assert parser.object_text is None
+    assert parser.partial_sql == 'SELECT name FROM users WHERE note = "'
+
+
+def test_no_object_at_all():
+    parser = _feed(["I cannot answer that."])
+    assert not parser.complete
+    assert parser.partial_sql == ""